@@ -0,0 +1,376 @@
+import json
+import os
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from filters import FILTERS_PATH, VOLATILE_FIELDS, save_json
+from history import CHANGE_1M, CHANGE_5M, CHANGE_15M, VOLATILITY, OI_CHANGE
+from metrics import Histogram
+from ticker_store import SPOT_FIELDS, FUT_FIELDS, BASIS, FUNDING_LEFT
+
+# Правила уведомлений: условие «поле op уровень» по символу или по всему рынку (spot/fut).
+# Правила проиндексированы по (рынок, поле) и символу: на тике проверяются только правила полей,
+# изменившихся у грязных символов; правила на весь рынок — векторно по строкам этих символов.
+# Срабатывание по фронту: условие стало истинным после ложного. Первое наблюдение только взводит:
+# значения из снимка тёплого старта и снапшоты после подписки старые, условие, истинное уже при запуске
+# (или при загрузке правил), сработает только после того, как побывает ложным.
+# Поля, меняющиеся по часам биржи без сообщений (отсчёт до фандинга), проверяются по всем символам
+# на каждом сдвиге часов хранилища, как VOLATILE_FIELDS фильтров. Повтор по тому же символу — не раньше cooldown. Доставка (окно, звук, журнал, webhook) отделена:
+# AlertDispatcher копит события и отдаёт их приёмникам не чаще заданного интервала.
+ALERTS_PATH = os.path.join(os.path.dirname(FILTERS_PATH), 'alerts.json')
+ALERT_COOLDOWN_MS = 60 * 1000
+MARKETS = ('spot', 'fut')
+# Поля, которые может проверять правило: колонки хранилища рынка и производные колонки
+ALERT_FIELDS = {
+    'spot': SPOT_FIELDS + (BASIS, CHANGE_1M, CHANGE_5M, CHANGE_15M, VOLATILITY),
+    'fut': FUT_FIELDS + (BASIS, FUNDING_LEFT, CHANGE_1M, CHANGE_5M, CHANGE_15M, VOLATILITY, OI_CHANGE),
+}
+OPS = ('>=', '<=', 'abs>=')
+MOVE_WINDOWS = {'1m': CHANGE_1M, '5m': CHANGE_5M, '15m': CHANGE_15M}
+MAX_PENDING = 1000  # событий в очереди приёмника; старые сверх этого отбрасываются
+WEBHOOK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+WEBHOOK_TIMEOUT = 2.0
+NEVER = -(1 << 62)  # время срабатывания «ещё не было»
+
+
+class AlertRule:
+    # Условие field op level; op 'abs>=' — по модулю (движение в обе стороны)
+
+    def __init__(self, field, op, level, market='fut', symbol=None, name=None):
+        if op not in OPS:
+            raise ValueError(f"неизвестное условие {op!r}; доступны: {', '.join(OPS)}")
+        if market not in MARKETS:
+            raise ValueError(f"неизвестный рынок {market!r}; доступны: {', '.join(MARKETS)}")
+        if field not in ALERT_FIELDS[market]:
+            # Опечатка в поле иначе дала бы правило, которое молча никогда не срабатывает
+            raise ValueError(f"неизвестное поле {field!r} для {market}; доступны: {', '.join(ALERT_FIELDS[market])}")
+        self.field = field
+        self.op = op
+        self.level = float(level)
+        self.market = market
+        self.symbol = symbol  # None — все символы рынка
+        self.name = name or self.describe()
+
+    def describe(self):
+        target = self.symbol or f"все {self.market}"
+        field = f"|{self.field}|" if self.op == 'abs>=' else self.field
+        op = '>=' if self.op == 'abs>=' else self.op
+        return f"{target}: {field} {op} {self.level:g}"
+
+    def hit(self, value):
+        # Одно значение (float)
+        if self.op == '>=':
+            return value >= self.level
+        if self.op == '<=':
+            return value <= self.level
+        return abs(value) >= self.level
+
+    def test(self, values):
+        # Векторно; NaN (нет значения) — условие ложно
+        with np.errstate(invalid='ignore'):
+            if self.op == '>=':
+                return values >= self.level
+            if self.op == '<=':
+                return values <= self.level
+            return np.abs(values) >= self.level
+
+
+def rule_from_dict(data):
+    # Правило из конфигурации. Проценты в конфигурации — в процентах (3 = 3%), в полях хранилища — доли
+    kind = data.get('kind', 'rule')
+    market = data.get('market', 'fut')
+    symbol = data.get('symbol')
+    name = data.get('name')
+    try:
+        if kind in ('above', 'below'):
+            # Пересечение уровня цены (или другого поля) вверх или вниз
+            op = '>=' if kind == 'above' else '<='
+            return AlertRule(data.get('field', 'lastPrice'), op, data['level'], market, symbol, name)
+        if kind == 'move':
+            window = data.get('window', '5m')
+            if window not in MOVE_WINDOWS:
+                raise ValueError(f"окно {window!r}; доступны: {', '.join(MOVE_WINDOWS)}")
+            return AlertRule(MOVE_WINDOWS[window], 'abs>=', data['pct'] / 100, market, symbol, name)
+        if kind == 'funding':
+            return AlertRule('fundingRate', 'abs>=', data['rate'] / 100, 'fut', symbol, name)
+        if kind == 'oi_spike':
+            return AlertRule(OI_CHANGE, '>=', data['pct'] / 100, 'fut', symbol, name)
+        if kind == 'rule':
+            return AlertRule(data['field'], data.get('op', '>='), data['level'], market, symbol, name)
+    except KeyError as e:
+        raise ValueError(f"правило {kind!r}: нет параметра {e.args[0]!r}") from None
+    raise ValueError(f"неизвестный вид правила {kind!r}")
+
+
+def load_alert_config(path=ALERTS_PATH):
+    # -> (правила, настройки доставки); нет файла — пусто. Ошибка в файле — ValueError
+    try:
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return [], {}
+    except (OSError, ValueError) as e:
+        raise ValueError(f"{path}: {e}") from None
+    return parse_alert_config(config)
+
+
+def save_alert_config(config, path=ALERTS_PATH):
+    parse_alert_config(config)  # не сохраняем то, что потом не загрузится
+    save_json(config, path)
+
+
+def parse_alert_config(config):
+    if not isinstance(config, dict):
+        raise ValueError("ожидается объект {\"rules\": [...], \"delivery\": {...}}")
+    rules = []
+    for i, data in enumerate(config.get('rules', [])):
+        try:
+            rules.append(rule_from_dict(data))
+        except (ValueError, TypeError, AttributeError) as e:
+            raise ValueError(f"правило {i + 1}: {e}") from None
+    return rules, config.get('delivery', {})
+
+
+class Alert:
+    # Одно срабатывание правила на тике: все символы, для которых условие стало истинным
+
+    def __init__(self, title, symbols, values=None, ts=None):
+        self.title = title
+        self.symbols = symbols
+        self.values = values or []
+        self.ts = ts or int(time.time() * 1000)
+
+    def as_dict(self):
+        return {'title': self.title, 'symbols': self.symbols, 'values': self.values, 'ts': self.ts}
+
+
+class _MarketRules:
+    # Правила одного рынка: по символу (скалярная проверка) и на весь рынок (состояние по строкам)
+
+    def __init__(self):
+        self.by_symbol = {}  # field -> symbol -> [rule]
+        self.wildcard = {}   # field -> [rule]
+        self.fields = set()
+        self.volatile = set()  # поля из VOLATILE_FIELDS с правилами
+        self.clock = None      # funding_now хранилища при последней проверке volatile
+        # Состояние по фронту: -1 ещё не наблюдали, 0 ложно, 1 истинно; время последнего срабатывания
+        self.state = {}      # rule -> int8 по строкам (на рынок) или int (по символу)
+        self.fired_at = {}   # rule -> int64 по строкам или int
+
+
+class AlertEngine:
+    # Проверка правил по грязным ячейкам тика; правила без изменившихся полей не трогаются
+
+    def __init__(self, stores, cooldown_ms=ALERT_COOLDOWN_MS):
+        self.stores = stores  # {'spot': TickerStore, 'fut': TickerStore}
+        self.cooldown_ms = cooldown_ms
+        self.rules = []
+        self.markets = {market: _MarketRules() for market in MARKETS}
+        self.fired = 0
+        self.evaluated = 0  # проверок правило x символ
+        self.eval_us = Histogram()
+
+    def set_rules(self, rules):
+        self.rules = list(rules)
+        self.markets = {market: _MarketRules() for market in MARKETS}
+        for rule in self.rules:
+            index = self.markets[rule.market]
+            index.fields.add(rule.field)
+            if rule.field in VOLATILE_FIELDS:
+                index.volatile.add(rule.field)
+            if rule.symbol is None:
+                index.wildcard.setdefault(rule.field, []).append(rule)
+                index.state[rule] = np.zeros(0, dtype=np.int8)
+                index.fired_at[rule] = np.zeros(0, dtype=np.int64)
+            else:
+                index.by_symbol.setdefault(rule.field, {}).setdefault(rule.symbol, []).append(rule)
+                index.state[rule] = -1
+                index.fired_at[rule] = NEVER
+
+    def evaluate(self, dirty_by_market, now):
+        # dirty_by_market: {'spot': {symbol: set(полей) или '*'}, 'fut': ...}; now — мс. -> [Alert]
+        if not self.rules:
+            return []
+        started = time.perf_counter()
+        alerts = []
+        for market, dirty in dirty_by_market.items():
+            index = self.markets[market]
+            if dirty and index.fields or index.volatile:
+                alerts.extend(self._evaluate_market(index, self.stores[market], dirty, now))
+        self.fired += len(alerts)
+        self.eval_us.observe((time.perf_counter() - started) * 1e6)
+        return alerts
+
+    def _evaluate_market(self, index, store, dirty, now):
+        # Символы, у которых изменилось поле с правилами, — по полям
+        touched = {field: [] for field in index.fields}
+        fields = index.fields
+        volatile = index.volatile
+        if volatile and store.funding_now != index.clock:
+            # Часы сдвинулись: отсчёт изменился у всех символов
+            index.clock = store.funding_now
+            for field in volatile:
+                touched[field] = list(store.keys())
+            fields = fields - volatile
+            volatile = ()
+        for symbol, keys in dirty.items():
+            # Без общих часов отсчёт идёт от ts строки и меняется с каждым её сообщением
+            for field in (fields if keys == '*' else fields.intersection(keys).union(volatile)):
+                touched[field].append(symbol)
+        alerts = []
+        for field, symbols in touched.items():
+            if not symbols:
+                continue
+            by_symbol = index.by_symbol.get(field)
+            if by_symbol:
+                for symbol in symbols:
+                    rules = by_symbol.get(symbol)
+                    if rules:
+                        alerts.extend(self._check_symbol(index, store, rules, field, symbol, now))
+            rules = index.wildcard.get(field)
+            if rules:
+                alerts.extend(self._check_market(index, store, rules, field, symbols, now))
+        return alerts
+
+    def _check_symbol(self, index, store, rules, field, symbol, now):
+        # Правила одного символа и поля: значение читается один раз
+        value = store.value(symbol, field) if symbol in store else None
+        self.evaluated += len(rules)
+        if value is None:
+            return ()
+        alerts = []
+        state, fired_at = index.state, index.fired_at
+        for rule in rules:
+            hit = rule.hit(value)
+            prev = state[rule]
+            state[rule] = int(hit)
+            if hit and prev == 0 and now - fired_at[rule] >= self.cooldown_ms:
+                fired_at[rule] = now
+                alerts.append(Alert(rule.name, [symbol], [value], now))
+        return alerts
+
+    def _check_market(self, index, store, rules, field, symbols, now):
+        n = len(store)
+        rows = store.positions(symbols)
+        values, valid = store.column(field)
+        values = np.where(valid[rows], values[rows], np.nan)
+        alerts = []
+        for rule in rules:
+            state = index.state[rule]
+            if len(state) < n:
+                # Новые символы: состояние «ещё не наблюдали»
+                state = index.state[rule] = np.concatenate([state, np.full(n - len(state), -1, dtype=np.int8)])
+                index.fired_at[rule] = np.concatenate([index.fired_at[rule], np.full(n - len(index.fired_at[rule]), NEVER, dtype=np.int64)])
+            fired_at = index.fired_at[rule]
+            hit = rule.test(values)
+            fire = hit & (state[rows] == 0) & (now - fired_at[rows] >= self.cooldown_ms)
+            # Нет значения — состояние не меняется
+            observed = ~np.isnan(values)
+            state[rows[observed]] = hit[observed]
+            self.evaluated += len(rows)
+            if fire.any():
+                fired_rows = rows[fire]
+                fired_at[fired_rows] = now
+                alerts.append(Alert(rule.name, [store.symbols[r] for r in fired_rows.tolist()], values[fire].tolist(), now))
+        return alerts
+
+
+class AlertSink:
+    # Приёмник с ограничением частоты: события копятся и уходят одним вызовом deliver(alerts)
+    # не чаще min_interval секунд
+
+    def __init__(self, deliver, min_interval=0.0, max_pending=MAX_PENDING):
+        self.deliver = deliver
+        self.min_interval = min_interval
+        self.max_pending = max_pending
+        self.pending = []
+        self.dropped = 0
+        self.delivered = 0
+        self._last = None
+
+    def submit(self, alerts):
+        self.pending.extend(alerts)
+        if len(self.pending) > self.max_pending:
+            self.dropped += len(self.pending) - self.max_pending
+            del self.pending[:len(self.pending) - self.max_pending]
+
+    def drain(self, now):
+        if not self.pending or self._last is not None and now - self._last < self.min_interval:
+            return 0
+        alerts, self.pending = self.pending, []
+        self._last = now
+        self.deliver(alerts)
+        self.delivered += len(alerts)
+        return len(alerts)
+
+
+class AlertDispatcher:
+    # Развязка проверки и доставки: submit() из тика, drain() — по таймеру или в том же цикле
+
+    def __init__(self):
+        self.sinks = {}
+
+    def add(self, name, deliver, min_interval=0.0):
+        self.sinks[name] = AlertSink(deliver, min_interval)
+        return self.sinks[name]
+
+    def submit(self, alerts):
+        if alerts:
+            for sink in self.sinks.values():
+                sink.submit(alerts)
+
+    def drain(self, now=None):
+        now = time.monotonic() if now is None else now
+        return sum(sink.drain(now) for sink in self.sinks.values())
+
+    def dropped(self):
+        return sum(sink.dropped for sink in self.sinks.values())
+
+    def close(self):
+        # Приёмники со своими потоками (WebhookSink) останавливаются; недоставленное отбрасывается
+        for sink in self.sinks.values():
+            close = getattr(sink.deliver, 'close', None)
+            if close is not None:
+                close()
+        self.sinks = {}
+
+
+class WebhookSink:
+    # POST JSON-списка событий на локальный адрес из отдельного потока: сеть не задерживает тик.
+    # Внешние адреса не принимаются: уведомления уходят только локальному обработчику
+
+    def __init__(self, url, timeout=WEBHOOK_TIMEOUT):
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or parsed.hostname not in WEBHOOK_HOSTS:
+            raise ValueError(f"webhook только на localhost, а не {url!r}")
+        self.url = url
+        self.timeout = timeout
+        self.sent = 0
+        self.errors = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='alert-webhook', daemon=True)
+        self._thread.start()
+
+    def __call__(self, alerts):
+        self._queue.put(json.dumps([alert.as_dict() for alert in alerts]).encode())
+
+    def close(self):
+        # Поток доотправляет уже поставленное в очередь и завершается
+        self._queue.put(None)
+
+    def _run(self):
+        import urllib.request  # только если webhook настроен
+        while True:
+            body = self._queue.get()
+            if body is None:
+                return
+            request = urllib.request.Request(self.url, body, {'Content-Type': 'application/json'})
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).close()
+                self.sent += 1
+            except OSError:
+                self.errors += 1
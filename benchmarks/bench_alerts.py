@@ -0,0 +1,76 @@
+# Проверка правил уведомлений (alerts.py) на синтетическом хранилище фьючерсов: тысячи правил по символам
+# (пересечение уровня цены) плюс правила на весь рынок; на тике меняется доля символов (dirty).
+# Сравнение: индекс по (поле, символ) против проверки каждого правила на каждом тике.
+# Запуск: python benchmarks/bench_alerts.py [--symbols 2000] [--rules 1000,5000,20000] [--market-rules 20] [--ticks 50]
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alerts import AlertEngine, AlertRule
+from ticker_store import TickerStore, SPOT_FIELDS, FUT_FIELDS
+
+DIRTY_SHARES = (0.01, 0.1)
+
+
+def naive(rules, store):
+    # Каждое правило по каждому символу, которого оно касается, без учёта изменившихся полей
+    fired = 0
+    for rule in rules:
+        if rule.symbol is None:
+            values, valid = store.column(rule.field)
+            fired += int(rule.test(np.where(valid, values, np.nan)).sum())
+        else:
+            value = store.value(rule.symbol, rule.field)
+            fired += value is not None and bool(rule.test(np.float64(value)))
+    return fired
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--rules', default='1000,5000,20000', help='правил по символам')
+    parser.add_argument('--market-rules', type=int, default=20, help='правил на весь рынок')
+    parser.add_argument('--ticks', type=int, default=50)
+    args = parser.parse_args()
+    rnd = random.Random(1)
+    symbols = [f"S{i:05d}USDT" for i in range(args.symbols)]
+    fut = TickerStore(FUT_FIELDS, 'futures', symbols)
+    spot = TickerStore(SPOT_FIELDS, 'spot')
+    for symbol in symbols:
+        fut.update(symbol, {'lastPrice': '100', 'fundingRate': '0.0001'})
+    for n_rules in map(int, args.rules.split(',')):
+        rules = [AlertRule('lastPrice', rnd.choice(('>=', '<=')), rnd.uniform(95, 105), 'fut', rnd.choice(symbols))
+                 for _ in range(n_rules)]
+        rules += [AlertRule(rnd.choice(('lastPrice', 'fundingRate')), 'abs>=', rnd.uniform(0.001, 200), 'fut')
+                  for _ in range(args.market_rules)]
+        engine = AlertEngine({'spot': spot, 'fut': fut})
+        engine.set_rules(rules)
+        line = [f"{n_rules:>6} правил по символам + {args.market_rules} на рынок"]
+        now = 0
+        for share in DIRTY_SHARES:
+            times = []
+            for _ in range(args.ticks):
+                dirty = {}
+                for symbol in rnd.sample(symbols, max(1, int(len(symbols) * share))):
+                    fut.update(symbol, {'lastPrice': str(rnd.uniform(94, 106))})
+                    dirty[symbol] = {'lastPrice'}
+                now += 1000
+                t0 = time.perf_counter()
+                engine.evaluate({'fut': dirty}, now)
+                times.append(time.perf_counter() - t0)
+            times.sort()
+            line.append(f"dirty {share:.0%}: {times[len(times) // 2] * 1000:6.2f} ms")
+        t0 = time.perf_counter()
+        naive(rules, fut)
+        line.append(f"все правила подряд: {(time.perf_counter() - t0) * 1000:6.2f} ms")
+        print(' | '.join(line))
+
+
+if __name__ == '__main__':
+    main()
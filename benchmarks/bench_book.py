@@ -0,0 +1,102 @@
+# Стакан и лента сделок (orderbook.py, trade_flow.py) на синтетических кадрах стенда (fake_bybit.py):
+# пропускная способность handle_frame по декодерам для orderbook.1/orderbook.50 и publicTrade,
+# стоимость публикации (верх изменившихся стаканов и суммы окон сделок) и, для сравнения,
+# стакан на dict с поиском лучших цен на каждом сообщении.
+# Запуск: python benchmarks/bench_book.py [--symbols 600] [--count 100000]
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_bybit import FakeBybit
+from ingest import IngestEngine
+from ws_decode import DECODERS, dict_book
+
+PUBLISH_EVERY = 1000  # сообщений между публикациями (~0.1 с при 10 000 сообщений/с)
+
+
+def make_frames(topics, count):
+    # Снапшот на каждую тему стакана, затем поток delta и сделок по случайным темам
+    fake = FakeBybit(1, 1)
+    books = {}
+    ts = int(time.time() * 1000)
+    frames = []
+    for topic in topics:
+        if topic.startswith('orderbook.'):
+            books[topic] = 1000
+            frames.append(fake.book_snapshot(topic, ts, 1000))
+    for _ in range(count):
+        ts += 1
+        frames.append(fake.frame('spot', random.choice(topics), ts, books))
+    return frames
+
+
+def run_engine(name, depth, trades, symbols, frames):
+    engine = IngestEngine(decoder=name, book_depth=depth, trades=trades, cache_path=None, snapshot_path=None)
+    engine._spot.add_symbols(symbols)
+    publish = []
+    t0 = time.perf_counter()
+    for i, raw in enumerate(frames, 1):
+        engine.handle_frame('spot', raw)
+        if not i % PUBLISH_EVERY:
+            p0 = time.perf_counter()
+            engine.publish()
+            publish.append(time.perf_counter() - p0)
+    elapsed = time.perf_counter() - t0
+    publish.sort()
+    return len(frames) / elapsed, publish[len(publish) // 2] * 1000 if publish else 0.0
+
+
+def dict_books(frames):
+    # Стакан — dict цена -> объём по сторонам, лучшие цены — max/min на каждом сообщении
+    books = {}
+    t0 = time.perf_counter()
+    for raw in frames:
+        frame = json.loads(raw)
+        if not frame['topic'].startswith('orderbook.'):
+            continue
+        symbol, bids, asks, _ = dict_book(frame['data'])
+        book = books.setdefault(symbol, ({}, {}))
+        if frame['type'] == 'snapshot':
+            book[0].clear()
+            book[1].clear()
+        for side, levels in zip(book, (bids, asks)):
+            for price, size in levels:
+                if float(size):
+                    side[float(price)] = float(size)
+                else:
+                    side.pop(float(price), None)
+        if book[0] and book[1]:
+            max(book[0]), min(book[1])
+    return len(frames) / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=600)
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args()
+    random.seed(1)
+    symbols = [f"C{i:04d}USDT" for i in range(args.symbols)]
+    cases = [
+        ('orderbook.1', 1, False, [f'orderbook.1.{s}' for s in symbols]),
+        ('orderbook.50', 50, False, [f'orderbook.50.{s}' for s in symbols]),
+        ('publicTrade', None, True, [f'publicTrade.{s}' for s in symbols]),
+    ]
+    for title, depth, trades, topics in cases:
+        frames = make_frames(topics, args.count)
+        line = [f"{title:>12}"]
+        for name in DECODERS:
+            rate, publish_ms = run_engine(name, depth, trades, symbols, frames)
+            line.append(f"{name} {rate:8.0f} сообщ./с, публикация {publish_ms:5.2f} мс")
+        if depth:
+            line.append(f"dict + max/min (json) {dict_books(frames):8.0f} сообщ./с")
+        print(' | '.join(line))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# Пропускная способность разбора кадров tickers.* по декодерам: json, orjson, msgspec.
+# Кадры — записанный файл (строки "category<TAB>json") или синтетические кадры в формате Bybit v5.
+# Запуск: python benchmarks/bench_decode.py [--frames FILE] [--count 100000]
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import IngestEngine
+from ws_decode import DECODERS
+
+
+def synthetic_frames(count, symbols=600):
+    frames = []
+    ts = int(time.time() * 1000)
+    for i in range(count):
+        ts += 3
+        price = random.uniform(0.001, 70000)
+        if i % 2:
+            symbol = f"T{random.randrange(symbols)}USDT"
+            # Полный набор полей спотового тикера Bybit v5
+            data = {
+                'symbol': symbol, 'lastPrice': f"{price:.4f}", 'highPrice24h': f"{price * 1.05:.4f}",
+                'lowPrice24h': f"{price * 0.95:.4f}", 'prevPrice24h': f"{price * 0.99:.4f}",
+                'volume24h': f"{random.uniform(0, 1e9):.4f}", 'turnover24h': f"{random.uniform(0, 1e9):.4f}",
+                'price24hPcnt': f"{random.uniform(-0.2, 0.2):.4f}", 'usdIndexPrice': f"{price:.6f}",
+            }
+            frames.append(('spot', json.dumps({'topic': 'tickers.' + symbol, 'ts': ts, 'type': 'snapshot', 'cs': i, 'data': data})))
+        else:
+            symbol = f"T{random.randrange(symbols)}USDT"
+            # delta линейного тикера: только часть полей
+            data = {
+                'symbol': symbol, 'tickDirection': 'PlusTick', 'lastPrice': f"{price:.4f}", 'markPrice': f"{price:.4f}",
+                'indexPrice': f"{price:.4f}", 'openInterest': f"{random.uniform(0, 1e7):.3f}",
+                'openInterestValue': f"{random.uniform(0, 1e8):.2f}", 'turnover24h': f"{random.uniform(0, 1e9):.4f}",
+                'volume24h': f"{random.uniform(0, 1e9):.4f}", 'fundingRate': '0.0001', 'nextFundingTime': str(ts + 3600000),
+                'bid1Price': f"{price:.4f}", 'bid1Size': '1.0', 'ask1Price': f"{price:.4f}", 'ask1Size': '2.0',
+            }
+            frames.append(('linear', json.dumps({'topic': 'tickers.' + symbol, 'type': 'delta', 'data': data, 'cs': i, 'ts': ts})))
+    return frames
+
+
+def load_frames(path):
+    frames = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            category, _, raw = line.rstrip('\n').partition('\t')
+            if raw:
+                frames.append((category, raw))
+    return frames
+
+
+def make_engine(name, frames):
+    engine = IngestEngine(decoder=name)
+    engine.latency.add_since = lambda ts: None  # синтетические ts в прошлом искажают статистику
+    symbols = {'spot': set(), 'linear': set()}
+    for category, raw in frames:
+        symbols[category].add(json.loads(raw).get('data', {}).get('symbol'))
+    engine._spot.add_symbols(sorted(s for s in symbols['spot'] if s))
+    engine._fut.add_symbols(sorted(s for s in symbols['linear'] if s))
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', help='файл с записанными кадрами')
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    random.seed(1)
+    frames = load_frames(args.frames) if args.frames else synthetic_frames(args.count)
+    encoded = [(c, raw.encode()) for c, raw in frames]
+    print(f"кадров: {len(frames)}")
+    print(f"{'декодер':10}{'только разбор':>18}{'разбор+хранилище':>20}")
+    for name in DECODERS:
+        # Лучший из нескольких прогонов: машина может быть зашумлена
+        decode_rate = full_rate = 0
+        for _ in range(args.repeat):
+            engine = make_engine(name, frames)
+            decoder = engine.decoder
+            getters = {c: decoder.ticker_getter(c) for c in ('spot', 'linear')}
+            t0 = time.perf_counter()
+            for category, raw in encoded:
+                topic, ts, type_, data, frame = decoder.frame(raw)
+                getters[category](data)
+            decode_rate = max(decode_rate, len(frames) / (time.perf_counter() - t0))
+            t0 = time.perf_counter()
+            for category, raw in encoded:
+                engine.handle_frame(category, raw)
+            full_rate = max(full_rate, len(frames) / (time.perf_counter() - t0))
+        print(f"{name:10}{decode_rate:14,.0f} /с{full_rate:16,.0f} /с")
+
+if __name__ == '__main__':
+    main()
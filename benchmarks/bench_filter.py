@@ -0,0 +1,73 @@
+# Стоимость фильтра строк (filters.py) на синтетических хранилищах, без сети и GUI:
+# разбор выражения, полный пересчёт маски, пересчёт только по изменившимся строкам
+# (доля dirty от числа строк) и отбор видимых строк в порядке сортировки, как в ScreenerTab.
+# Запуск: python benchmarks/bench_filter.py [--symbols 600,1200,10000] [--repeat 200]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filters import RowFilter
+from screener_core import sorted_keys
+from ticker_store import TickerStore, JoinedStores, SPOT_FIELDS, FUT_FIELDS
+
+EXPRESSION = 'turnover24h > 10M and abs(price24hPcnt) > 5% and (fundingRate > 0.01% or basis < -0.5%)'
+DIRTY_SHARES = (0.01, 0.1)
+
+
+def make_stores(n):
+    rnd = random.Random(1)
+    symbols = [f"S{i:05d}USDT" for i in range(n)]
+    spot = TickerStore(SPOT_FIELDS, 'spot', symbols)
+    fut = TickerStore(FUT_FIELDS, 'futures', symbols)
+    for store in (spot, fut):
+        for symbol in symbols:
+            data = {
+                'lastPrice': str(rnd.uniform(0.01, 1000)),
+                'price24hPcnt': str(rnd.gauss(0, 0.05)),
+                'turnover24h': str(10 ** rnd.uniform(4, 9)),
+            }
+            if store is fut:
+                data['fundingRate'] = str(rnd.gauss(0.0001, 0.0002))
+            store.update(symbol, data)
+    return spot, fut, JoinedStores([(spot, '_spot'), (fut, '_fut')])
+
+
+def best_us(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', default='600,1200,10000', help='символов в каждом хранилище (в «Все» вдвое больше строк)')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    print(f"выражение: {EXPRESSION}")
+    print(f"разбор и компиляция: {best_us(lambda: RowFilter(EXPRESSION), args.repeat):.0f} мкс")
+    for n in map(int, args.symbols.split(',')):
+        spot, fut, joined = make_stores(n)
+        rnd = random.Random(2)
+        for name, source in (('fut', fut), ('all', joined)):
+            keys = source.keys()
+            row_filter = RowFilter(EXPRESSION)
+            row_filter.update(source)
+            line = [f"{name:>3} {len(source):>6} строк: полный пересчёт {best_us(lambda: row_filter.update(source), args.repeat):7.0f} мкс"]
+            for share in DIRTY_SHARES:
+                dirty = {key: {'price24hPcnt'} for key in rnd.sample(keys, max(1, int(len(keys) * share)))}
+                line.append(f"dirty {share:.0%} {best_us(lambda: row_filter.update(source, dirty), args.repeat):6.0f} мкс")
+            order = sorted_keys(source, 'turnover24h')
+            line.append(f"видимые ({row_filter.count()}) {best_us(lambda: row_filter.select(source, order), args.repeat):6.0f} мкс")
+            print(' | '.join(line))
+
+
+if __name__ == '__main__':
+    main()
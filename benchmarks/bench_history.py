@@ -0,0 +1,50 @@
+# Стоимость истории тикеров (history.py) на синтетических хранилищах: выборка и пересчёт колонок
+# изменений за 1/5/15 минут, волатильности и OI раз в секунду по часам, при заполненном кольце,
+# плюс память буферов и выбранный под бюджет шаг выборки.
+# Запуск: python benchmarks/bench_history.py [--symbols 600,1200,10000] [--budget-mb 64] [--ticks 120]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import TickerHistory
+from ticker_store import TickerStore, FUT_FIELDS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', default='600,1200,10000', help='символов в хранилище фьючерсов')
+    parser.add_argument('--budget-mb', type=float, default=64 * 2 / 3, help='бюджет хранилища фьючерсов (2/3 общего)')
+    parser.add_argument('--ticks', type=int, default=120)
+    args = parser.parse_args()
+    rnd = random.Random(1)
+    for n in map(int, args.symbols.split(',')):
+        symbols = [f"S{i:05d}USDT" for i in range(n)]
+        store = TickerStore(FUT_FIELDS, 'futures', symbols)
+        for symbol in symbols:
+            store.update(symbol, {'lastPrice': str(rnd.uniform(1, 100)), 'openInterestValue': str(rnd.uniform(1e5, 1e8))})
+        history = TickerHistory(store, int(args.budget_mb * 1e6))
+        now = 1_700_000_000_000
+        history.update(now)
+        # Кольцо заполняется сразу: пропуск окна дописывает выборки текущими значениями
+        now += history.window_ms
+        history.update(now)
+        price = store.values['lastPrice'][:n]
+        times = []
+        for _ in range(args.ticks):
+            price *= 1 + 0.001 * (rnd.random() - 0.5)
+            now += 1000
+            t0 = time.perf_counter()
+            history.update(now)
+            times.append(time.perf_counter() - t0)
+        times.sort()
+        print(f"{n:>6} символов: шаг {history.period_ms / 1000:.0f} с, слотов {history.slots}, "
+              f"память {history.memory_bytes() / 1e6:5.1f} МБ | update median {times[len(times) // 2] * 1000:6.2f} ms, "
+              f"max {times[-1] * 1000:6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
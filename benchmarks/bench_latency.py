@@ -0,0 +1,120 @@
+# Задержка ts биржи -> обработка сообщения под синтетической нагрузкой:
+# прежний опрос asyncio по QTimer(100 мс) против QtAsyncioBridge.
+# Локальный WebSocket-сервер в отдельном потоке шлёт тикеры пачками.
+# Запуск: python benchmarks/bench_latency.py [--rate 2000] [--seconds 5]
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+from aiohttp import web
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+from metrics import LatencyStats, now_ms
+from qt_asyncio import QtAsyncioBridge
+
+
+def start_server(rate, burst):
+    # Сервер шлёт burst сообщений каждые burst/rate секунд, ts — момент отправки
+    ready = threading.Event()
+    state = {}
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        interval = burst / rate
+        i = 0
+        try:
+            while not ws.closed:
+                for _ in range(burst):
+                    i += 1
+                    await ws.send_str(json.dumps({
+                        'topic': 'tickers.T%dUSDT' % (i % 500), 'type': 'snapshot', 'ts': int(now_ms()),
+                        'data': {'symbol': 'T%dUSDT' % (i % 500), 'lastPrice': '1.2345', 'price24hPcnt': '0.01'},
+                    }))
+                await asyncio.sleep(interval)
+        except ConnectionResetError:
+            pass
+        return ws
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/ws', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        state['port'] = runner.addresses[0][1]
+        ready.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(main()), daemon=True).start()
+    ready.wait()
+    return state['port']
+
+
+async def client(url, stats, handled):
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(url) as ws:
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    data = msg.json()
+                    stats.add_since(data['ts'])
+                    handled[0] += 1
+
+
+def run(mode, url, seconds):
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    stats = LatencyStats(size=1 << 20)
+    handled = [0]
+    if mode == 'poll':
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        def process_events():
+            loop.call_soon(loop.stop)
+            loop.run_forever()
+
+        timer = QTimer()
+        timer.timeout.connect(process_events)
+        timer.start(100)
+        task = loop.create_task(client(url, stats, handled))
+    else:
+        bridge = QtAsyncioBridge()
+        loop = bridge.loop
+        task = bridge.create_task(client(url, stats, handled))
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    app.exec_()
+    task.cancel()
+    if mode == 'poll':
+        timer.stop()
+    loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+    if mode == 'poll':
+        loop.close()
+    else:
+        bridge.close()
+    return stats, handled[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rate', type=int, default=2000, help='сообщений в секунду')
+    parser.add_argument('--burst', type=int, default=20, help='сообщений в пачке')
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+    port = start_server(args.rate, args.burst)
+    url = f'http://127.0.0.1:{port}/ws'
+    print(f"нагрузка: {args.rate} сообщ/с пачками по {args.burst}, {args.seconds:.0f} с на режим")
+    for mode, title in (('poll', 'QTimer 100 мс (прежний)'), ('bridge', 'QtAsyncioBridge')):
+        stats, handled = run(mode, url, args.seconds)
+        p50, p90, p99, p100 = stats.percentiles((50, 90, 99, 100))
+        print(f"{title:26} обработано {handled:7}  p50 {p50:7.1f} мс  p90 {p90:7.1f} мс  p99 {p99:7.1f} мс  max {p100:7.1f} мс")
+
+
+if __name__ == '__main__':
+    main()
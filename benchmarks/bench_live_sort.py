@@ -0,0 +1,76 @@
+# Живая сортировка: полная пересортировка (argsort + layoutChanged) на каждом тике
+# против LiveSortIndex, который переставляет только символы с изменившимся значением.
+# Отдельно: время update_data (порядок строк и пометка ячеек) и последующей отрисовки.
+# Запуск: python benchmarks/bench_live_sort.py [--symbols 3000] [--changed 0.3] [--ticks 50]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+
+import ws_screener_gui as gui
+from ticker_store import TickerStore, FUT_FIELDS
+
+SORT_COL = 2  # '% за 24ч'
+
+
+def make_tab(store, live):
+    tab = gui.ScreenerTab(gui.COLUMNS_FUT, gui.COLUMN_KEYS_FUT, gui.NUMERIC_COLS_FUT)
+    tab.resize(1200, 800)
+    tab.show()
+    tab.update_data(store, None)
+    tab.live_sort_checkbox.setChecked(live)
+    tab.handle_sort(SORT_COL)
+    return tab
+
+
+def run(tab, store, symbols, args, seed):
+    rnd = random.Random(seed)
+    order_times, paint_times = [], []
+    for _ in range(args.ticks):
+        dirty = {}
+        now = int(time.time() * 1000)
+        for symbol in rnd.sample(symbols, int(len(symbols) * args.changed)):
+            store.update(symbol, {'price24hPcnt': f"{rnd.uniform(-0.2, 0.2):.4f}"}, now, now)
+            dirty[symbol] = {'price24hPcnt'}
+        t0 = time.perf_counter()
+        if not tab.live_sort:
+            # Без живого индекса актуальный порядок — только полной пересортировкой
+            tab.sorted_symbols = tab.get_sorted_symbols(tab.current_sort_col, tab.current_sort_order)
+        tab.update_data(store, dirty)
+        t1 = time.perf_counter()
+        QApplication.processEvents()
+        order_times.append((t1 - t0) * 1000)
+        paint_times.append((time.perf_counter() - t1) * 1000)
+    order_times.sort()
+    paint_times.sort()
+    return order_times[len(order_times) // 2], order_times[-1], paint_times[len(paint_times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=3000)
+    parser.add_argument('--changed', type=float, default=0.3, help='доля символов с новым значением за тик')
+    parser.add_argument('--ticks', type=int, default=50)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    symbols = [f'F{i}USDT' for i in range(args.symbols)]
+    print(f"символов: {args.symbols}, изменилось за тик: {args.changed:.0%}")
+    for live, label in ((False, 'полная пересортировка'), (True, 'LiveSortIndex       ')):
+        store = TickerStore(FUT_FIELDS, 'futures', symbols)
+        now = int(time.time() * 1000)
+        for symbol in symbols:
+            store.update(symbol, {'price24hPcnt': f"{random.uniform(-0.2, 0.2):.4f}", 'lastPrice': '1'}, now, now)
+        tab = make_tab(store, live)
+        median, worst, paint = run(tab, store, symbols, args, seed=1)
+        print(f"{label}: порядок median {median:7.2f} ms  max {worst:7.2f} ms | отрисовка median {paint:6.2f} ms")
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# Нагрузочный прогон по сетке «символов × сообщений/с»: fake_bybit.py и скринер — отдельные процессы,
+# каждая точка — в свежем процессе (честный RSS). Поток идёт через IngestEngine в отдельном потоке,
+# потребитель (ScreenerCore, с --gui — окно PyQt) применяет пакеты и обновляет таблицы, как в приложении.
+# Меряются: принятые сообщения/с, задержка ts биржи -> разбор и ts -> применение в потоке GUI (p50/p99),
+# длительность обновления таблиц раз в секунду, RSS процесса и объём хранилищ.
+# Запуск: python benchmarks/bench_load.py [--symbols 1000,5000,20000] [--rates 1000,10000,100000] [--seconds 10] [--gui]
+import argparse
+import json
+import math
+import os
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_bybit import FakeBybit
+from ingest import IngestEngine, PUBLISH_INTERVAL
+from metrics import LatencyStats
+from screener_core import ScreenerCore
+
+# Примерный предел одного процесса fake_bybit, сообщений/с; выше — несколько процессов на порту
+SERVER_RATE_PER_WORKER = 30000
+# Точка «не справляется»: принято меньше этой доли заданного потока или p99 задержки выше порога
+MIN_RATE_SHARE = 0.9
+MAX_P99_MS = 1000
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_port(port, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def count_messages(engine):
+    return sum(conn.messages for stream in list(engine.streams.values()) for conn in stream.connections)
+
+
+def run_point(args):
+    # Дочерний процесс: одна точка сетки против уже запущенного стенда
+    engine = IngestEngine(endpoints=FakeBybit.endpoints(args.port), cache_path=None, snapshot_path=None)
+    core = ScreenerCore(engine)
+
+    def refresh():
+        core.update_derived()
+        core.take_dirty()
+
+    if args.gui:
+        from PyQt5.QtWidgets import QApplication
+        import ws_screener_gui as gui
+        app = QApplication(sys.argv[:1])
+        window = gui.SpotFuturesScreener(engine)
+        # Таймеры окна заменяет этот цикл, приём уже запущен окном
+        window.batch_timer.stop()
+        window.refresh_timer.stop()
+        window.funding_alerts_enabled[0] = False
+        core = window.core
+        window.resize(1600, 800)
+        window.show()
+
+        def refresh():
+            window.refresh_tables()
+            app.processEvents()
+    else:
+        engine.start_thread()
+
+    # Прогрев: подписка и первое обновление по всем символам
+    started = time.monotonic()
+    while engine.time_to_populated is None and time.monotonic() - started < args.warmup:
+        time.sleep(PUBLISH_INTERVAL)
+        core.apply_batches()
+    populated = engine.time_to_populated
+
+    engine.latency.reset()
+    applied = LatencyStats()
+    refresh_times = []
+    messages = count_messages(engine)
+    t_start = time.monotonic()
+    next_tick = t_start
+    next_refresh = t_start + 1.0
+    while True:
+        next_tick += PUBLISH_INTERVAL
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+        now = time.monotonic()
+        if now - t_start >= args.seconds:
+            break
+        if core.apply_batches() and core.last_broker_ts:
+            applied.add_since(core.last_broker_ts)
+        if now >= next_refresh:
+            next_refresh += 1.0
+            t0 = time.perf_counter()
+            refresh()
+            refresh_times.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.monotonic() - t_start
+    received = count_messages(engine) - messages
+    handle_p50, handle_p99 = engine.latency.percentiles((50, 99))
+    apply_p50, apply_p99 = applied.percentiles((50, 99))
+    refresh_times.sort()
+    result = {
+        'rate': received / elapsed,
+        'populated_s': populated,
+        'handle_p50': handle_p50, 'handle_p99': handle_p99,
+        'apply_p50': apply_p50, 'apply_p99': apply_p99,
+        'refresh_median': refresh_times[len(refresh_times) // 2] if refresh_times else None,
+        'refresh_max': refresh_times[-1] if refresh_times else None,
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # КБ на Linux
+        'store_mb': (core.data_spot.memory_bytes() + core.data_fut.memory_bytes()) / 1e6,
+        'connections': sum(len(s.connections) for s in engine.streams.values()),
+    }
+    print(json.dumps(result), flush=True)
+    os._exit(0)  # без ожидания закрытия соединений и потока приёма
+
+
+def start_server(symbols, msg_rate, workers):
+    port = free_port()
+    cmd = [
+        sys.executable, os.path.join(ROOT, 'fake_bybit.py'), '--port', str(port),
+        '--symbols', str(symbols // 2), '--msg-rate', str(msg_rate), '--workers', str(workers),
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, start_new_session=hasattr(os, 'killpg'))
+    if not wait_port(port):
+        stop_server(proc)
+        raise RuntimeError('fake_bybit не запустился')
+    return proc, port
+
+
+def stop_server(proc):
+    # Процессы-работники живут в той же группе
+    if hasattr(os, 'killpg'):
+        os.killpg(proc.pid, signal.SIGTERM)
+    else:
+        proc.terminate()
+    proc.wait()
+
+
+def fmt(value, spec='.0f'):
+    return '-' if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', default='1000,5000,20000', help='символов всего (поровну spot и linear)')
+    parser.add_argument('--rates', default='1000,10000,100000', help='сообщений/с всего')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--warmup', type=float, default=60.0, help='предел ожидания первого обновления по всем символам')
+    parser.add_argument('--workers', type=int, default=None, help='процессов fake_bybit; по умолчанию по потоку и числу ядер')
+    parser.add_argument('--gui', action='store_true', help='потребитель — окно PyQt с отрисовкой')
+    parser.add_argument('--point', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.point:
+        run_point(args)
+        return
+
+    cpus = os.cpu_count() or 1
+    print(f"ядер: {cpus}, {args.seconds:.0f} с на точку, потребитель: {'окно PyQt' if args.gui else 'ScreenerCore'}")
+    print(f"{'символов':>8} {'цель/с':>7} {'принято/с':>9} {'разбор p50/p99':>15} {'в GUI p50/p99':>14} "
+          f"{'обновление med/max':>19} {'RSS':>6} {'хранилища':>9}  итог")
+    for symbols in map(int, args.symbols.split(',')):
+        for msg_rate in map(int, args.rates.split(',')):
+            workers = args.workers or max(1, min(cpus - 1, math.ceil(msg_rate / SERVER_RATE_PER_WORKER)))
+            server, port = start_server(symbols, msg_rate, workers)
+            try:
+                cmd = [sys.executable, os.path.abspath(__file__), '--point', '--port', str(port),
+                       '--seconds', str(args.seconds), '--warmup', str(args.warmup)]
+                if args.gui:
+                    cmd.append('--gui')
+                out = subprocess.run(cmd, capture_output=True, text=True, timeout=args.warmup + args.seconds + 60)
+            finally:
+                stop_server(server)
+            lines = out.stdout.strip().splitlines()
+            if out.returncode != 0 or not lines:
+                print(f"{symbols:>8} {msg_rate:>7}  ошибка: {out.stderr.strip().splitlines()[-1:]}")
+                continue
+            r = json.loads(lines[-1])
+            ok = r['rate'] >= MIN_RATE_SHARE * msg_rate and (r['handle_p99'] or 0) < MAX_P99_MS
+            verdict = 'ok' if ok else ('отстаёт' if (r['handle_p99'] or 0) >= MAX_P99_MS else 'поток ниже цели')
+            if r['populated_s'] is None:
+                verdict += ', не все символы получили данные'
+            print(
+                f"{symbols:>8} {msg_rate:>7} {r['rate']:>9.0f} {fmt(r['handle_p50']):>7}/{fmt(r['handle_p99']):<7} "
+                f"{fmt(r['apply_p50']):>6}/{fmt(r['apply_p99']):<7} {fmt(r['refresh_median'], '.1f'):>9}/{fmt(r['refresh_max'], '.1f'):<7} ms "
+                f"{r['rss_mb']:>4.0f}МБ {r['store_mb']:>7.1f}МБ  {verdict}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# Время восстановления потока после обрыва: IngestEngine против fake_bybit.py,
+# который периодически рвёт все соединения. Восстановление — от обрыва до первого
+# кадра с данными после переподключения и повторной подписки.
+# Запуск: python benchmarks/bench_reconnect.py [--symbols 300] [--kill-every 3] [--seconds 20]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_bybit import FakeBybit
+from ingest import IngestEngine
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=300)
+    parser.add_argument('--rate', type=float, default=5.0)
+    parser.add_argument('--kill-every', type=float, default=3.0)
+    parser.add_argument('--seconds', type=float, default=20.0)
+    parser.add_argument('--shards', type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeBybit(args.symbols, args.rate, args.kill_every)
+    port = server.start_thread()
+    engine = IngestEngine(shards=args.shards, endpoints=FakeBybit.endpoints(port), cache_path=None, snapshot_path=None)
+    engine.start_thread()
+    time.sleep(args.seconds)
+    engine.stop()
+
+    print(f"символов: {args.symbols} x 2, обрыв каждые {args.kill_every} с, {args.seconds:.0f} с, обрывов: {server.kills}")
+    for category, stream in engine.streams.items():
+        p50, p99, worst = stream.recovery.percentiles((50, 99, 100))
+        if p50 is None:
+            print(f"{category}: соединений {len(stream.connections)}, восстановлений не было")
+            continue
+        print(
+            f"{category}: соединений {len(stream.connections)}, переподключений {stream.reconnects()}, "
+            f"восстановление p50 {p50:.0f} мс, p99 {p99:.0f} мс, макс {worst:.0f} мс"
+        )
+    stale = sum(int(store.stale_mask(1).sum()) for store in (engine.data_spot, engine.data_fut))
+    print(f"строк без данных после последнего обрыва: {stale}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+# Замер времени обновления таблиц: старая перестройка QTableWidget против модели с грязными ячейками.
+# Запуск: python benchmarks/bench_refresh.py [--spot 650] [--fut 550] [--ticks 20] [--changed 0.6] [--live]
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+from PyQt5.QtWidgets import QApplication, QTableWidget, QTableWidgetItem
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt
+
+import ws_screener_gui as gui
+from ingest import IngestEngine
+from screener_core import ScreenerCore
+from ticker_store import SPOT_FIELDS, FUT_FIELDS
+
+
+def legacy_refresh(table, data_cache, symbols, column_keys, numeric_cols):
+    # Копия прежнего ScreenerTab.refresh_table: новый QTableWidgetItem на каждую ячейку
+    table.setRowCount(len(symbols))
+    for row, symbol in enumerate(symbols):
+        d = data_cache.get(symbol, {})
+        for col, key in enumerate(column_keys):
+            value = d.get(key, '')
+            if key == 'price24hPcnt' and value not in ('', None):
+                try:
+                    value = f"{float(value) * 100:.2f}%"
+                except Exception:
+                    pass
+            elif key in ('turnover24h', 'openInterestValue') and value not in ('', None):
+                try:
+                    value = f"{float(value):,.2f}".replace(",", " ")
+                except Exception:
+                    pass
+            elif key in ('markPrice', 'indexPrice', 'lastPrice') and value not in ('', None):
+                try:
+                    value = f"{float(value):.6f}" if float(value) < 100 else f"{float(value):.2f}"
+                except Exception:
+                    pass
+            item = QTableWidgetItem(str(value))
+            if col in numeric_cols:
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            if key == 'price24hPcnt' and d.get(key, '') not in ('', None):
+                percent = float(d[key]) * 100
+                if percent > 0:
+                    item.setForeground(QColor(0, 200, 0))
+                elif percent < 0:
+                    item.setForeground(QColor(220, 40, 40))
+            table.setItem(row, col, item)
+
+
+async def fetch_live_symbols():
+    async with aiohttp.ClientSession() as session:
+        result = []
+        for url in (gui.SPOT_SYMBOLS_URL, gui.FUT_SYMBOLS_URL):
+            async with session.get(url) as resp:
+                data = await resp.json()
+                result.append([x['symbol'] for x in data['result']['list']])
+        return result
+
+
+def make_window(spot_symbols, fut_symbols):
+    window = gui.SpotFuturesScreener.__new__(gui.SpotFuturesScreener)
+    gui.QMainWindow.__init__(window)
+    window.funding_alerts_enabled = [False]
+    window.tabs = gui.QTabWidget()
+    window.tab_all = gui.ScreenerTab(gui.COLUMNS_ALL, gui.COLUMN_KEYS_ALL, gui.NUMERIC_COLS_ALL, parent=window, funding_alerts_enabled_ref=window.funding_alerts_enabled)
+    window.tab_spot = gui.ScreenerTab(gui.COLUMNS_SPOT, gui.COLUMN_KEYS_SPOT, gui.NUMERIC_COLS_SPOT, parent=window, funding_alerts_enabled_ref=window.funding_alerts_enabled)
+    window.tab_fut = gui.ScreenerTab(gui.COLUMNS_FUT, gui.COLUMN_KEYS_FUT, gui.NUMERIC_COLS_FUT, parent=window, funding_alerts_enabled_ref=window.funding_alerts_enabled)
+    window.tabs.addTab(window.tab_all, "Все")
+    window.tabs.addTab(window.tab_spot, "Спот")
+    window.tabs.addTab(window.tab_fut, "Фьючерсы")
+    window.setCentralWidget(window.tabs)
+    window.time_label = gui.QLabel()
+    window.latency_label = gui.QLabel()
+    window.statusBar().setVisible(False)  # без строки метрик
+    # Движок не запускается: сообщения подаются в него напрямую, без сети
+    window.core = ScreenerCore(IngestEngine())
+    window.engine = window.core.engine
+    window.dispatcher = gui.AlertDispatcher()  # правил нет — уведомления не проверяются
+    window.engine._spot.add_symbols(spot_symbols)
+    window.engine._fut.add_symbols(fut_symbols)
+    window.spot_symbols, window.fut_symbols = spot_symbols, fut_symbols
+    # Прежнее хранение: symbol -> dict сырых строк Bybit
+    window.legacy_spot = {s: dict.fromkeys(('symbol',) + SPOT_FIELDS, '') for s in spot_symbols}
+    window.legacy_fut = {s: dict.fromkeys(('symbol',) + FUT_FIELDS + ('funding_info',), '') for s in fut_symbols}
+    return window
+
+
+def random_tick(symbol, ts):
+    price = random.uniform(0.001, 70000)
+    return {
+        'symbol': symbol, 'lastPrice': f"{price:.6f}", 'price24hPcnt': f"{random.uniform(-0.2, 0.2):.4f}",
+        'volume24h': f"{random.uniform(0, 1e9):.2f}", 'turnover24h': f"{random.uniform(0, 1e9):.2f}",
+        'markPrice': f"{price:.6f}", 'indexPrice': f"{price:.6f}", 'openInterestValue': f"{random.uniform(0, 1e8):.2f}",
+        'fundingRate': '0.0001', 'nextFundingTime': str(ts + 3600000),
+    }
+
+
+def feed(window, changed):
+    ts = int(time.time() * 1000)
+    for symbols, is_spot in ((window.spot_symbols, True), (window.fut_symbols, False)):
+        legacy = window.legacy_spot if is_spot else window.legacy_fut
+        for s in random.sample(symbols, int(len(symbols) * changed)):
+            tick = random_tick(s, ts)
+            window.engine.handle_ws_msg({'topic': 'tickers.' + s, 'ts': ts, 'data': tick}, is_spot=is_spot)
+            legacy[s].update((k, v) for k, v in tick.items() if k in legacy[s])
+    window.engine.publish()
+    window.apply_batches()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--spot', type=int, default=650)
+    parser.add_argument('--fut', type=int, default=550)
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--changed', type=float, default=0.6, help='доля тикеров, обновившихся за секунду')
+    parser.add_argument('--live', action='store_true', help='взять реальный список символов с Bybit')
+    args = parser.parse_args()
+    app = QApplication(sys.argv)
+    if args.live:
+        spot_symbols, fut_symbols = asyncio.run(fetch_live_symbols())
+    else:
+        spot_symbols = [f"S{i}USDT" for i in range(args.spot)]
+        fut_symbols = [f"F{i}USDT" for i in range(args.fut)]
+    random.seed(1)
+
+    window = make_window(spot_symbols, fut_symbols)
+    window.resize(1600, 800)
+    window.show()
+    app.processEvents()
+    feed(window, 1.0)
+    window.refresh_tables()
+    app.processEvents()
+
+    # До: три QTableWidget перестраиваются целиком каждую секунду
+    legacy_tables = [QTableWidget(0, len(keys)) for keys in (gui.COLUMN_KEYS_ALL, gui.COLUMN_KEYS_SPOT, gui.COLUMN_KEYS_FUT)]
+    legacy_times = []
+    for _ in range(args.ticks):
+        feed(window, args.changed)
+        window.core.take_dirty()
+        t0 = time.perf_counter()
+        all_data = {}
+        for s in spot_symbols:
+            all_data[s + '_spot'] = dict(window.legacy_spot[s], type='spot')
+        for s in fut_symbols:
+            all_data[s + '_fut'] = dict(window.legacy_fut[s], type='futures')
+        for table, data, keys, numeric in zip(
+            legacy_tables,
+            (all_data, window.legacy_spot, window.legacy_fut),
+            (gui.COLUMN_KEYS_ALL, gui.COLUMN_KEYS_SPOT, gui.COLUMN_KEYS_FUT),
+            (gui.NUMERIC_COLS_ALL, gui.NUMERIC_COLS_SPOT, gui.NUMERIC_COLS_FUT),
+        ):
+            legacy_refresh(table, data, list(data), keys, numeric)
+        legacy_times.append(time.perf_counter() - t0)
+
+    # После: модель, видима только вкладка 'Все'
+    new_times = []
+    paint_times = []
+    for _ in range(args.ticks):
+        feed(window, args.changed)
+        t0 = time.perf_counter()
+        window.refresh_tables()
+        t1 = time.perf_counter()
+        app.processEvents()
+        new_times.append(t1 - t0)
+        paint_times.append(time.perf_counter() - t1)
+
+    def ms(values):
+        values = sorted(values)
+        return f"median {values[len(values) // 2] * 1000:8.2f} ms  max {values[-1] * 1000:8.2f} ms"
+
+    rows = len(spot_symbols) * 2 + len(fut_symbols) * 2
+    print(f"символов: spot={len(spot_symbols)} fut={len(fut_symbols)}, строк во всех вкладках: {rows}, обновлено за тик: {args.changed:.0%}")
+    print(f"до   (QTableWidget, 3 вкладки):     {ms(legacy_times)}")
+    print(f"после (модель, refresh_tables):      {ms(new_times)}")
+    print(f"после (модель, отрисовка видимого):  {ms(paint_times)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# Офлайн-замеры по записи сырых кадров (recorder.py), без сети и детерминированно.
+# 1) пропускная способность приёма: FrameReplay без пауз через IngestEngine.run -> handle_frame,
+#    без замеров, с выборкой по умолчанию и с замером каждого кадра (цена метрик);
+# 2) стоимость потребителя: кадры подаются синхронно, пакет публикуется каждые PUBLISH_INTERVAL
+#    и обновление таблиц идёт раз в секунду по времени записи; --gui — с окном PyQt и отрисовкой.
+# Без --file запись делается заранее по локальному стенду fake_bybit.
+# Запуск: python benchmarks/bench_replay.py [--file session.wsrec] [--symbols 500 --rate 10 --seconds 5] [--gui]
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_bybit import FakeBybit
+from ingest import IngestEngine, PUBLISH_INTERVAL
+from metrics import METRICS_SAMPLE
+from recorder import FrameRecorder, FrameReplay, CHANNELS, META, describe, read_chunks
+from screener_core import ScreenerCore
+
+
+def record_fake(path, symbols, rate, seconds):
+    server = FakeBybit(symbols, rate)
+    port = server.start_thread()
+    engine = IngestEngine(endpoints=FakeBybit.endpoints(port), cache_path=None, snapshot_path=None,
+                          recorder=FrameRecorder(path))
+
+    async def session():
+        task = asyncio.ensure_future(engine.run())
+        await asyncio.sleep(seconds)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(session())
+
+
+def ingest_throughput(path, repeat, metrics_sample):
+    best = None
+    for _ in range(repeat):
+        replay = FrameReplay(path, speed=0)
+        engine = IngestEngine(cache_path=None, replay=replay, metrics_sample=metrics_sample)
+        asyncio.run(engine.run())
+        rate = replay.frames / replay.elapsed
+        best = rate if best is None else max(best, rate)
+    return best, replay.frames
+
+
+def consume(path, core, refresh):
+    # Синхронная подача кадров с публикацией и обновлением по времени записи
+    engine = core.engine
+    apply_times, refresh_times = [], []
+    next_publish = next_refresh = None
+    for records in read_chunks(path):
+        for recv_us, channel, payload in records:
+            if channel == META:
+                listing = json.loads(payload)
+                for name in CHANNELS:
+                    engine._apply_listing(name, listing['symbols'][name], listing['decimals'][name])
+                continue
+            if next_publish is None:
+                next_publish = recv_us + PUBLISH_INTERVAL * 1e6
+                next_refresh = recv_us + 1e6
+            engine.handle_frame(CHANNELS[channel], payload)
+            if recv_us >= next_publish:
+                next_publish += PUBLISH_INTERVAL * 1e6
+                engine.publish()
+                t0 = time.perf_counter()
+                core.apply_batches()
+                apply_times.append(time.perf_counter() - t0)
+            if recv_us >= next_refresh:
+                next_refresh += 1e6
+                refresh_times.append(refresh())
+    return apply_times, refresh_times
+
+
+def ms(values):
+    if not values:
+        return 'нет замеров'
+    values = sorted(values)
+    return f"median {values[len(values) // 2] * 1000:7.2f} ms  max {values[-1] * 1000:7.2f} ms  ({len(values)})"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--file')
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--rate', type=float, default=10.0)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--gui', action='store_true')
+    args = parser.parse_args()
+
+    path = args.file
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'session.wsrec')
+        record_fake(path, args.symbols, args.rate, args.seconds)
+    info = describe(path)
+    total = sum(info['frames'].values())
+    print(f"запись: {total} кадров за {info['duration_s']:.1f} с, файл {info['file_bytes'] / 1e6:.2f} МБ "
+          f"(сжатие {info['raw_bytes'] / max(info['file_bytes'], 1):.1f}x)")
+
+    for sample, label in ((0, 'без замеров'), (METRICS_SAMPLE, f'замер 1/{METRICS_SAMPLE}'), (1, 'замер каждого')):
+        rate, frames = ingest_throughput(path, args.repeat, sample)
+        print(f"приём без пауз (handle_frame, {label}): {rate:,.0f} кадров/с, запись целиком за {frames / rate * 1000:.0f} ms")
+
+    core = ScreenerCore(IngestEngine(cache_path=None, snapshot_path=None))
+
+    def refresh_core():
+        t0 = time.perf_counter()
+        core.update_derived()
+        core.take_dirty()
+        return time.perf_counter() - t0
+
+    refresh = refresh_core
+    if args.gui:
+        from PyQt5.QtWidgets import QApplication
+        import ws_screener_gui as gui
+        app = QApplication(sys.argv[:1])
+        # Окно без собственного приёма и таймеров: пакеты и обновления подаёт этот цикл
+        core.engine.start_thread = lambda: None
+        window = gui.SpotFuturesScreener(core.engine)
+        window.batch_timer.stop()
+        window.refresh_timer.stop()
+        window.funding_alerts_enabled[0] = False
+        core = window.core
+        window.resize(1600, 800)
+        window.show()
+        app.processEvents()
+
+        def refresh():
+            t0 = time.perf_counter()
+            window.refresh_tables()
+            app.processEvents()
+            return time.perf_counter() - t0
+
+    apply_times, refresh_times = consume(path, core, refresh)
+    print(f"apply_batches (раз в {PUBLISH_INTERVAL * 1000:.0f} мс записи): {ms(apply_times)}")
+    label = 'refresh_tables + отрисовка' if args.gui else 'update_derived (без GUI)'
+    print(f"{label} (раз в 1 с записи): {ms(refresh_times)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# Разделяемая память демона (shared_state.py): писатель публикует пакеты в сегмент без пауз,
+# несколько процессов-клиентов читают их так же без пауз и применяют к своим хранилищам.
+# Писатель ставит всем полям изменённой строки одно значение, поэтому разорванное чтение
+# (часть полей из одной записи, часть из другой) видно как строка с разными значениями — их должно быть 0.
+# Запуск: python benchmarks/bench_shared.py [--symbols 600,2000] [--share 0.1] [--clients 3] [--seconds 3]
+import argparse
+import json
+import os
+import subprocess
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import TickerBatch
+from shared_state import SharedStateClient, SharedStateWriter, H_HEARTBEAT
+from ticker_store import TickerStore, DiffTracker, apply_diff, SPOT_FIELDS, FUT_FIELDS
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2] if values else 0.0
+
+
+def client(name):
+    # Отдельный процесс, как настоящий клиент; итог — строкой JSON в stdout
+    engine = SharedStateClient(name)
+    stores = TickerStore(SPOT_FIELDS, 'spot'), TickerStore(FUT_FIELDS, 'futures')
+    torn = cells = 0
+    times = []
+    while not engine.closed():
+        t0 = time.perf_counter()
+        batches = engine.take_batches()
+        if batches:
+            times.append(time.perf_counter() - t0)
+        for batch in batches:
+            for store, diff in zip(stores, (batch.spot, batch.fut)):
+                apply_diff(store, diff)
+                cells += diff.cells()
+                n = len(store)
+                values = np.stack([store.values[f][:n] for f in store.fields])
+                valid = np.stack([store.valid[f][:n] for f in store.fields]).all(axis=0)
+                torn += int((values.max(axis=0) != values.min(axis=0))[valid].sum())
+    print(json.dumps((engine.reads, engine.retries, torn, cells, median(times))))
+    engine.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', default='600,2000', help='символов в каждом хранилище')
+    parser.add_argument('--share', type=float, default=0.1, help='доля строк, меняющихся в пакете')
+    parser.add_argument('--clients', type=int, default=3)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--client', metavar='NAME', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.client:
+        return client(args.client)
+    rnd = random.Random(1)
+    for n in map(int, args.symbols.split(',')):
+        name = f"bench_shared_{os.getpid()}"
+        writer = SharedStateWriter(name, n)
+        trackers = DiffTracker(TickerStore(SPOT_FIELDS, 'spot')), DiffTracker(TickerStore(FUT_FIELDS, 'futures'))
+        symbols = [f"S{i:05d}USDT" for i in range(n)]
+        for tracker in trackers:
+            tracker.add_symbols(symbols)
+        readers = [subprocess.Popen([sys.executable, __file__, '--client', name], stdout=subprocess.PIPE, text=True)
+                   for _ in range(args.clients)]
+        time.sleep(0.5)  # клиенты подключаются к сегменту
+        times = []
+        ts = 1_700_000_000_000
+        deadline = time.monotonic() + args.seconds
+        while time.monotonic() < deadline:
+            ts += 100
+            for tracker in trackers:
+                raws = (str(ts % 100_000),) * len(tracker.store.fields)
+                for symbol in rnd.sample(symbols, max(1, int(n * args.share))):
+                    tracker.update_values(symbol, raws, ts, ts)
+            batch = TickerBatch(trackers[0].take(), trackers[1].take(), ts, 0)
+            t0 = time.perf_counter()
+            writer.publish([batch])
+            times.append(time.perf_counter() - t0)
+            writer.header[H_HEARTBEAT] = int(time.time() * 1000)  # отметка жизни без движка
+        writer.close()
+        stats = [json.loads(reader.communicate()[0]) for reader in readers]
+        print(f"{n:>5} символов, меняется {args.share:.0%}: записей {len(times)}, запись median {median(times) * 1e6:6.0f} мкс")
+        for i, (reads, retries, torn, cells, read_s) in enumerate(stats):
+            print(f"  клиент {i}: чтений {reads}, повторов {retries}, разорванных строк {torn}, "
+                  f"ячеек {cells}, чтение изменений median {read_s * 1e6:6.0f} мкс")
+
+
+if __name__ == '__main__':
+    main()
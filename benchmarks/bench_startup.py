@@ -0,0 +1,54 @@
+# Запуск без GUI против GUI: время импорта и RSS процесса, каждый режим — в отдельном интерпретаторе.
+# headless — ядро (screener_core) с хранилищами; gui — ws_screener_gui и QApplication;
+# webengine — то же плюс QtWebEngineWidgets, который раньше импортировался при старте.
+# Запуск: python benchmarks/bench_startup.py [--repeat 5]
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+mode = {mode!r}
+if mode == 'headless':
+    import screener_core
+    screener_core.ScreenerCore()
+else:
+    if mode == 'webengine':
+        import PyQt5.QtWebEngineWidgets
+    import ws_screener_gui
+    app = ws_screener_gui.QApplication([])
+elapsed = time.perf_counter() - t0
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # КБ на Linux
+print(json.dumps({{'import_s': elapsed, 'rss_mb': rss / 1024, 'modules': len(sys.modules)}}))
+'''
+
+
+def measure(mode):
+    result = subprocess.run([sys.executable, '-c', CHILD.format(root=ROOT, mode=mode)], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    for mode in ('headless', 'gui', 'webengine'):
+        runs = [measure(mode) for _ in range(args.repeat)]
+        if None in runs:
+            print(f"{mode:10}: не запускается в этом окружении")
+            continue
+        import_ms = sorted(r['import_s'] * 1000 for r in runs)[len(runs) // 2]
+        rss = sorted(r['rss_mb'] for r in runs)[len(runs) // 2]
+        print(f"{mode:10}: импорт median {import_ms:7.1f} ms | RSS {rss:6.1f} МБ | модулей {runs[0]['modules']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# Микробенчмарк: словари сырых строк (прежний путь) против колоночного TickerStore.
+# Запуск: python benchmarks/bench_store.py [--symbols 1200] [--messages 200000]
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from ticker_store import TickerStore, FUT_FIELDS, FUNDING_LEFT
+
+
+def make_messages(symbols, count, ts):
+    messages = []
+    for i in range(count):
+        price = random.uniform(0.001, 70000)
+        messages.append({
+            'symbol': random.choice(symbols), 'lastPrice': f"{price:.6f}", 'price24hPcnt': f"{random.uniform(-0.2, 0.2):.4f}",
+            'volume24h': f"{random.uniform(0, 1e9):.2f}", 'turnover24h': f"{random.uniform(0, 1e9):.2f}",
+            'markPrice': f"{price:.6f}", 'indexPrice': f"{price:.6f}", 'openInterestValue': f"{random.uniform(0, 1e8):.2f}",
+            'fundingRate': '0.0001', 'nextFundingTime': str(ts + random.randint(0, 8 * 3600000)),
+        })
+    return messages
+
+
+def legacy_update(data_fut, data, ts):
+    # Прежний handle_ws_msg: сырые строки + строка funding_info
+    fut = data_fut.get(data['symbol'])
+    for key in FUT_FIELDS:
+        new_val = data.get(key)
+        if new_val not in (None, ''):
+            fut[key] = new_val
+    rate_str = f"{float(fut['fundingRate']) * 100:.4f}%"
+    delta = int(fut['nextFundingTime']) - ts
+    time_str = f"{delta // 3600000:02}:{(delta % 3600000) // 60000:02}:{(delta % 60000) // 1000:02}"
+    fut['funding_info'] = f"{rate_str} / {time_str}"
+
+
+def legacy_sort(data_fut, key):
+    def sort_key(symbol):
+        try:
+            return float(str(data_fut[symbol].get(key, '')).replace('%', '').replace(' ', ''))
+        except Exception:
+            return float('-inf')
+    return sorted(data_fut, key=sort_key, reverse=True)
+
+
+def legacy_alerts(data_fut):
+    hits = []
+    for symbol, d in data_fut.items():
+        try:
+            h, m, s = map(int, d['funding_info'].split('/')[-1].strip().split(':'))
+        except Exception:
+            continue
+        if 0 < h * 3600 + m * 60 + s <= 300:
+            hits.append(symbol)
+    return hits
+
+
+def store_sort(store, key):
+    values, valid = store.column(key)
+    order = np.argsort(-np.where(valid, values, -np.inf), kind='stable')
+    keys = store.keys()
+    return [keys[i] for i in order]
+
+
+def store_alerts(store):
+    left, valid = store.column(FUNDING_LEFT)
+    keys = store.keys()
+    return [keys[i] for i in np.flatnonzero(valid & (left > 0) & (left <= 300000))]
+
+
+def measure(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=1200)
+    parser.add_argument('--messages', type=int, default=200000)
+    args = parser.parse_args()
+    random.seed(1)
+    ts = int(time.time() * 1000)
+    symbols = [f"T{i}USDT" for i in range(args.symbols)]
+    messages = make_messages(symbols, args.messages, ts)
+
+    tracemalloc.start()
+    base = tracemalloc.take_snapshot()
+    data_fut = {s: dict.fromkeys(('symbol',) + FUT_FIELDS + ('funding_info',), '') for s in symbols}
+    for s in symbols:
+        data_fut[s]['symbol'] = s
+    for m in messages[:args.symbols * 2]:
+        legacy_update(data_fut, m, ts)
+    legacy_mem = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(base, 'filename'))
+    base = tracemalloc.take_snapshot()
+    store = TickerStore(FUT_FIELDS, 'futures', symbols)
+    for m in messages[:args.symbols * 2]:
+        store.update(m['symbol'], m, ts)
+    store_mem = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(base, 'filename'))
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    for m in messages:
+        legacy_update(data_fut, m, ts)
+    legacy_ingest = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for m in messages:
+        store.update(m['symbol'], m, ts)
+    store_ingest = time.perf_counter() - t0
+
+    print(f"символов: {args.symbols}, сообщений: {args.messages}")
+    print(f"{'':24}{'dict':>14}{'TickerStore':>14}")
+    print(f"{'память хранилища':24}{legacy_mem / 1024:11.0f} KB{store_mem / 1024:11.0f} KB")
+    print(f"{'приём, сообщ/с':24}{args.messages / legacy_ingest:14,.0f}{args.messages / store_ingest:14,.0f}")
+    print(f"{'сортировка, мс':24}{measure(lambda: legacy_sort(data_fut, 'turnover24h'), 20) * 1000:14.3f}{measure(lambda: store_sort(store, 'turnover24h'), 20) * 1000:14.3f}")
+    print(f"{'проверка фандинга, мс':24}{measure(lambda: legacy_alerts(data_fut), 20) * 1000:14.3f}{measure(lambda: store_alerts(store), 20) * 1000:14.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+import asyncio
+import math
+import random
+import time
+
+import aiohttp
+
+from metrics import LatencyStats
+
+# Bybit принимает не больше 10 тем в одном запросе subscribe
+SUBSCRIBE_BATCH = 10
+# Сколько запросов subscribe может ждать подтверждения одновременно
+MAX_INFLIGHT_SUBSCRIBES = 50
+SUBSCRIBE_ACK_TIMEOUT = 5.0
+# Автовыбор числа соединений: по числу символов, затем по фактическому потоку сообщений
+SYMBOLS_PER_SHARD = 200
+MAX_SHARDS = 8
+MAX_RATE_PER_SHARD = 1500  # сообщений/с на соединение, выше — шард делится
+REBALANCE_INTERVAL = 10.0
+# Bybit ждёт ping раз в 20 с; без входящих кадров дольше PING_INTERVAL + PONG_TIMEOUT соединение мёртвое
+PING_INTERVAL = 20.0
+PONG_TIMEOUT = 10.0
+# Переподключение с экспоненциальной задержкой и разбросом ±20%
+RECONNECT_BASE = 0.25
+RECONNECT_MAX = 30.0
+
+
+def plan_shards(symbols, shards=None, per_shard=SYMBOLS_PER_SHARD):
+    # Раскладывает символы по соединениям через один, чтобы ликвидные пары не скапливались в одном
+    if not shards:
+        shards = min(MAX_SHARDS, max(1, math.ceil(len(symbols) / per_shard)))
+    shards = max(1, min(shards, len(symbols) or 1))
+    return [symbols[i::shards] for i in range(shards)]
+
+
+class ShardConnection:
+    # Одно WebSocket-соединение: подписки отправляются параллельно с чтением,
+    # подтверждения сопоставляются по req_id. supervise() держит соединение живым:
+    # heartbeat, переподключение с нарастающей задержкой и повторная подписка
+
+    def __init__(self, stream, index, topics):
+        self.stream = stream
+        self.index = index
+        self.topics = list(topics)
+        self.ws = None
+        self.pending = {}       # req_id -> (op, args, время отправки, занял ли место в окне)
+        self.subscribed = set()
+        self.failed = []        # (args, ret_msg) отклонённых подписок
+        self.messages = 0
+        self._rate_mark = (time.monotonic(), 0)
+        self._req_seq = 0
+        self._inflight = None
+        self.connected = False
+        self.reconnects = 0
+        self.last_error = None
+        self.last_rx = 0.0
+        self.disconnected_at = None  # момент обрыва; сбрасывается первым кадром данных
+
+    def rate(self):
+        # Сообщений в секунду с прошлого вызова
+        now = time.monotonic()
+        mark_time, mark_count = self._rate_mark
+        self._rate_mark = (now, self.messages)
+        elapsed = now - mark_time
+        return (self.messages - mark_count) / elapsed if elapsed > 0 else 0.0
+
+    async def supervise(self, session):
+        delay = RECONNECT_BASE
+        while True:
+            got_data = False
+            try:
+                got_data = await self.run(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.last_error = repr(exc)
+            # Потребителя извещаем только о переходе «на связи -> оборвано»: неудачные попытки
+            # переподключения строки заново не гасят и стаканы не сбрасывают
+            was_connected, self.connected = self.connected, False
+            self.reconnects += 1
+            if self.disconnected_at is None:
+                self.disconnected_at = time.monotonic()
+            if was_connected:
+                self.stream.on_disconnect(self)
+            if got_data:
+                # Обрыв рабочего сеанса: сразу же, с разбросом, чтобы шарды не ломились разом
+                delay = RECONNECT_BASE
+                await asyncio.sleep(random.uniform(0, RECONNECT_BASE))
+                continue
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, RECONNECT_MAX)
+
+    async def run(self, session):
+        # Один сеанс соединения; возвращает True, если по нему пришли данные
+        self._inflight = asyncio.Semaphore(MAX_INFLIGHT_SUBSCRIBES)
+        self.pending.clear()
+        self.subscribed.clear()
+        got_data = False
+        async with session.ws_connect(self.stream.url) as ws:
+            self.ws = ws
+            self.connected = True
+            self.last_rx = time.monotonic()
+            sender = asyncio.create_task(self.send_ops('subscribe', self.topics))
+            heartbeat = asyncio.create_task(self._heartbeat())
+            try:
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        self.messages += 1
+                        self.last_rx = time.monotonic()
+                        if self.stream.on_frame(self.stream.category, msg.data, self) and not got_data:
+                            got_data = True
+                            if self.disconnected_at is not None:
+                                self.stream.recovery.add((self.last_rx - self.disconnected_at) * 1000)
+                                self.disconnected_at = None
+                    elif msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED):
+                        break
+            finally:
+                sender.cancel()
+                heartbeat.cancel()
+                self.ws = None
+        return got_data
+
+    async def _heartbeat(self):
+        while self.ws is not None:
+            await asyncio.sleep(PING_INTERVAL)
+            if self.ws is None:
+                return
+            if time.monotonic() - self.last_rx > PING_INTERVAL + PONG_TIMEOUT:
+                # Ни pong, ни данных: закрываем, supervise() переподключится
+                await self.ws.close()
+                return
+            self._req_seq += 1
+            await self.ws.send_json({"req_id": f"ping-{self.index}-{self._req_seq}", "op": "ping"})
+
+    async def send_ops(self, op, topics):
+        for i in range(0, len(topics), SUBSCRIBE_BATCH):
+            # Окно неподтверждённых запросов; если биржа молчит, не стоим дольше таймаута.
+            # Запрос, ушедший по таймауту, места в окне не занял и при подтверждении его не освобождает
+            inflight = self._inflight
+            try:
+                await asyncio.wait_for(inflight.acquire(), SUBSCRIBE_ACK_TIMEOUT)
+                acquired = True
+            except asyncio.TimeoutError:
+                acquired = False
+            if self.ws is None or inflight is not self._inflight:
+                # Сеанс сменился, пока ждали: у нового сеанса своё окно
+                if acquired:
+                    inflight.release()
+                return
+            self._req_seq += 1
+            req_id = f"{self.stream.category}-{self.index}-{self._req_seq}"
+            args = topics[i:i + SUBSCRIBE_BATCH]
+            self.pending[req_id] = (op, args, time.monotonic(), acquired)
+            await self.ws.send_json({"req_id": req_id, "op": op, "args": args})
+
+    async def resubscribe(self, topics):
+        # Отписка и повторная подписка: биржа пришлёт по темам свежий снапшот
+        await self.send_ops('unsubscribe', topics)
+        await self.send_ops('subscribe', topics)
+
+    def on_op(self, op, success, req_id, ret_msg):
+        entry = self.pending.pop(req_id, None) if req_id else None
+        if entry is None:
+            return
+        kind, args, sent_at, acquired = entry
+        if acquired:
+            self._inflight.release()
+        if not success:
+            self.failed.append((args, ret_msg))
+        elif kind == 'subscribe':
+            self.subscribed.update(args)
+        else:
+            self.subscribed.difference_update(args)
+        self.stream.on_ack(self, kind, args, success, time.monotonic() - sent_at)
+
+
+class ShardedStream:
+    # Символы одной категории, разложенные по нескольким соединениям; все темы символа
+    # (тикер, стакан, сделки) — в одном соединении
+
+    def __init__(self, category, url, symbols, on_frame, shards=None, topic_prefixes=('tickers.',), on_down=None):
+        self.category = category
+        self.url = url
+        self.on_frame = on_frame  # (category, raw, conn) -> True для кадров с данными
+        self.on_down = on_down    # (category, symbols) при обрыве соединения
+        self.topic_prefixes = tuple(topic_prefixes)
+        self.recovery = LatencyStats(256)  # обрыв -> первый кадр данных после переподключения, мс
+        self.auto = not shards
+        self.connections = [
+            ShardConnection(self, i, self.topics(part))
+            for i, part in enumerate(plan_shards(list(symbols), shards, SYMBOLS_PER_SHARD // len(self.topic_prefixes)))
+        ]
+        self.acked = 0
+        self.ack_time_max = 0.0
+        self.rates = []
+        self.last_error = None  # последнее исключение фоновой задачи (подписка, деление шарда)
+        self.task_errors = 0
+        self._session = None
+        self._supervisors = {}  # ShardConnection -> задача supervise()
+        self._tasks = set()
+
+    def topics(self, symbols):
+        return [prefix + s for s in symbols for prefix in self.topic_prefixes]
+
+    async def run(self, session=None):
+        # session — общий сеанс движка; без него поток открывает собственный
+        if session is None:
+            async with aiohttp.ClientSession() as session:
+                return await self.run(session)
+        self._session = session
+        for conn in self.connections:
+            self._supervise(conn)
+        self._spawn(self._monitor())
+        try:
+            while True:
+                # supervise() сам не завершается: готовая задача — исключение, оно уходит наружу.
+                # Соединения, добавленные _split, попадают в ожидание на следующем круге
+                done, _ = await asyncio.wait(list(self._supervisors.values()), timeout=REBALANCE_INTERVAL,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+
+    def _supervise(self, conn):
+        self._supervisors[conn] = self._spawn(conn.supervise(self._session), conn)
+
+    def _spawn(self, coro, conn=None):
+        # Фоновая задача потока; её исключение не теряется, а попадает в last_error (и соединения, если оно есть)
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(lambda t: self._task_done(t, conn))
+        return task
+
+    def _task_done(self, task, conn):
+        self._tasks.discard(task)
+        if task.cancelled() or task.exception() is None:
+            return
+        self.task_errors += 1
+        self.last_error = repr(task.exception())
+        if conn is not None:
+            conn.last_error = self.last_error
+
+    def add_symbols(self, symbols):
+        # Новые символы уходят в наименее загруженное соединение; подписка — сразу, если оно на связи
+        if not symbols:
+            return
+        conn = min(self.connections, key=lambda c: len(c.topics))
+        topics = self.topics(symbols)
+        conn.topics.extend(topics)
+        if conn.ws is not None:
+            self._spawn(conn.send_ops('subscribe', topics), conn)
+
+    def remove_symbols(self, symbols):
+        removed = set(self.topics(symbols))
+        if not removed:
+            return
+        for conn in self.connections:
+            topics = [t for t in conn.topics if t in removed]
+            if not topics:
+                continue
+            conn.topics = [t for t in conn.topics if t not in removed]
+            if conn.ws is not None:
+                self._spawn(conn.send_ops('unsubscribe', topics), conn)
+
+    def on_disconnect(self, conn):
+        if self.on_down is not None:
+            # Символ — после последней точки темы (orderbook.50.BTCUSDT)
+            symbols = dict.fromkeys(topic[topic.rfind('.') + 1:] for topic in conn.topics)
+            self.on_down(self.category, list(symbols))
+
+    def resubscribe(self, topics):
+        # Переподписка тем в тех соединениях, где они живут
+        wanted = set(topics)
+        for conn in self.connections:
+            mine = [t for t in conn.topics if t in wanted]
+            if mine and conn.ws is not None:
+                self._spawn(conn.resubscribe(mine), conn)
+
+    def reconnects(self):
+        return sum(conn.reconnects for conn in self.connections)
+
+    def on_ack(self, conn, op, args, success, elapsed):
+        if success and op == 'subscribe':
+            self.acked += len(args)
+        self.ack_time_max = max(self.ack_time_max, elapsed)
+
+    async def _monitor(self):
+        # Следим за потоком на каждом соединении; перегруженный шард делится пополам
+        while True:
+            await asyncio.sleep(REBALANCE_INTERVAL)
+            self.rates = [conn.rate() for conn in self.connections]
+            if not self.auto or len(self.connections) >= MAX_SHARDS:
+                continue
+            busiest = max(range(len(self.connections)), key=self.rates.__getitem__)
+            conn = self.connections[busiest]
+            if self.rates[busiest] > MAX_RATE_PER_SHARD and len(conn.topics) >= 2 * len(self.topic_prefixes):
+                await self._split(conn)
+
+    async def _split(self, conn):
+        # Делим по границе символа: его темы идут подряд
+        k = len(self.topic_prefixes)
+        half = len(conn.topics) // (2 * k) * k
+        moved = conn.topics[half:]
+        new = ShardConnection(self, len(self.connections), moved)
+        self.connections.append(new)
+        self._supervise(new)
+        # Отписываем старое соединение только после того, как новое подтвердило подписки
+        deadline = time.monotonic() + SUBSCRIBE_ACK_TIMEOUT * 2
+        while not new.subscribed.issuperset(moved) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        # Пока ждали, add_symbols мог дописать темы в старое соединение, а remove_symbols — убрать часть
+        # перенесённых: уходят ровно перенесённые, что ещё остались
+        moved_set = set(moved)
+        moved = [t for t in conn.topics if t in moved_set]
+        conn.topics = [t for t in conn.topics if t not in moved_set]
+        if conn.ws is not None and moved:
+            await conn.send_ops('unsubscribe', moved)
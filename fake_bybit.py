@@ -0,0 +1,296 @@
+# Локальный стенд, имитирующий публичное API Bybit v5: REST instruments-info (страницы по курсору)
+# и WebSocket-потоки spot/linear: тикеры, стакан orderbook.{depth} (снапшот и delta с номером u) и сделки publicTrade. Нужен для бенчмарков и проверки переподключения.
+#   python fake_bybit.py --symbols 300 --rate 20 --kill-every 5
+#   python fake_bybit.py --port 8765 --symbols 10000 --msg-rate 100000 --workers 4
+#   python fake_bybit.py --book-gap 0.01   — пропускать номер delta стакана с такой вероятностью
+# Скринер к нему: IngestEngine(endpoints=FakeBybit.endpoints(port))
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import threading
+import time
+
+from aiohttp import web, WSMsgType
+
+
+# Страницы instruments-info, как у Bybit: limit по умолчанию и максимум
+PAGE_LIMIT_DEFAULT = 500
+PAGE_LIMIT_MAX = 1000
+# Шаг генерации обновлений
+FEED_TICK = 0.05
+
+
+class FakeBybit:
+    def __init__(self, symbols=100, rate=10.0, kill_every=None, msg_rate=None, book_gap=0.0):
+        # Как на бирже: у большинства спотовых пар есть бессрочный контракт с тем же символом
+        self.symbols = {
+            'spot': [f'C{i:04d}USDT' for i in range(symbols)],
+            'linear': [f'C{i:04d}USDT' for i in range(symbols // 10, symbols + symbols // 10)],
+        }
+        self.rate = rate              # обновлений в секунду на символ
+        if msg_rate is not None:
+            # Общий поток сообщений/с по обеим категориям -> на символ
+            self.rate = msg_rate / sum(len(s) for s in self.symbols.values())
+        self.kill_every = kill_every  # обрывать все соединения каждые N секунд
+        self.book_gap = book_gap      # вероятность пропустить номер delta стакана (проверка переподписки)
+        self.book_gaps = 0
+        self.sent = 0
+        self.sockets = set()
+        self.kills = 0
+        self.port = None
+        self.loop = None
+        self._runner = None
+
+    @staticmethod
+    def endpoints(port, host='127.0.0.1'):
+        base = f'http://{host}:{port}'
+        return {
+            'spot_symbols': f'{base}/v5/market/instruments-info?category=spot',
+            'linear_symbols': f'{base}/v5/market/instruments-info?category=linear',
+            'spot': f'ws://{host}:{port}/v5/public/spot',
+            'linear': f'ws://{host}:{port}/v5/public/linear',
+        }
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/v5/market/instruments-info', self.instruments)
+        app.router.add_get('/v5/public/{category}', self.ws)
+        return app
+
+    async def instruments(self, request):
+        category = request.query.get('category', 'spot')
+        try:
+            limit = min(PAGE_LIMIT_MAX, max(1, int(request.query.get('limit', PAGE_LIMIT_DEFAULT))))
+            start = int(request.query.get('cursor') or 0)
+        except ValueError:
+            return web.json_response({'retCode': 10001, 'retMsg': 'params error', 'result': {}})
+        symbols = self.symbols.get(category, [])
+        items = [
+            {'symbol': s, 'status': 'Trading', 'priceFilter': {'tickSize': '0.01'}}
+            for s in symbols[start:start + limit]
+        ]
+        # Курсор у Bybit непрозрачный; здесь — смещение следующей страницы
+        cursor = str(start + limit) if start + limit < len(symbols) else ''
+        return web.json_response({
+            'retCode': 0, 'retMsg': 'OK',
+            'result': {'category': category, 'list': items, 'nextPageCursor': cursor},
+        })
+
+    def ticker(self, category, symbol, ts, full):
+        # Спот всегда приходит полным снапшотом, linear — снапшот после подписки, затем delta
+        full = full or category == 'spot'
+        price = 100 + random.random()
+        data = {'symbol': symbol, 'lastPrice': f'{price:.4f}'}
+        if full or random.random() < 0.3:
+            data.update(price24hPcnt=f'{random.uniform(-0.1, 0.1):.4f}', volume24h='1000', turnover24h=f'{1000 * price:.2f}')
+        if category == 'linear' and full:
+            data.update(
+                markPrice=f'{price:.4f}', indexPrice=f'{price:.4f}', openInterestValue='500000',
+                fundingRate='0.0001', nextFundingTime=str(ts - ts % 28800000 + 28800000),
+            )
+        elif category == 'spot':
+            data.update(highPrice24h='110', lowPrice24h='90')
+        type_ = 'snapshot' if full else 'delta'
+        return json.dumps({'topic': 'tickers.' + symbol, 'ts': ts, 'type': type_, 'cs': ts, 'data': data})
+
+    # Кадры потока без json.dumps: при сотне тысяч сообщений/с генерация не должна быть узким местом
+    @staticmethod
+    def spot_snapshot(symbol, ts):
+        price = 100 + random.random()
+        return (f'{{"topic":"tickers.{symbol}","ts":{ts},"type":"snapshot","cs":{ts},"data":{{"symbol":"{symbol}",'
+                f'"lastPrice":"{price:.4f}","price24hPcnt":"{random.uniform(-0.1, 0.1):.4f}","volume24h":"1000",'
+                f'"turnover24h":"{1000 * price:.2f}","highPrice24h":"110","lowPrice24h":"90"}}}}')
+
+    @staticmethod
+    def delta(symbol, ts):
+        price = 100 + random.random()
+        if random.random() < 0.3:
+            return (f'{{"topic":"tickers.{symbol}","ts":{ts},"type":"delta","cs":{ts},"data":{{"symbol":"{symbol}",'
+                    f'"lastPrice":"{price:.4f}","price24hPcnt":"{random.uniform(-0.1, 0.1):.4f}",'
+                    f'"volume24h":"1000","turnover24h":"{1000 * price:.2f}"}}}}')
+        return f'{{"topic":"tickers.{symbol}","ts":{ts},"type":"delta","cs":{ts},"data":{{"symbol":"{symbol}","lastPrice":"{price:.4f}"}}}}'
+
+    @staticmethod
+    def _levels(start, step, count):
+        return ','.join(f'["{start + step * i:.2f}","{random.uniform(1, 10):.3f}"]' for i in range(count))
+
+    def book_snapshot(self, topic, ts, u):
+        depth, symbol = topic.split('.')[1:]
+        depth = int(depth)
+        return (f'{{"topic":"{topic}","type":"snapshot","ts":{ts},"data":{{"s":"{symbol}",'
+                f'"b":[{self._levels(99.99, -0.01, depth)}],"a":[{self._levels(100.0, 0.01, depth)}],"u":{u},"seq":{u}}},"cts":{ts}}}')
+
+    def book_delta(self, topic, ts, u):
+        # Один-два уровня у лучших цен: новый объём или удаление
+        symbol = topic.rsplit('.', 1)[1]
+        sides = {'b': [], 'a': []}
+        for _ in range(random.randint(1, 2)):
+            side = random.choice('ba')
+            price = 99.99 - 0.01 * random.randrange(3) if side == 'b' else 100.0 + 0.01 * random.randrange(3)
+            size = '0' if random.random() < 0.2 else f'{random.uniform(1, 10):.3f}'
+            sides[side].append(f'["{price:.2f}","{size}"]')
+        return (f'{{"topic":"{topic}","type":"delta","ts":{ts},"data":{{"s":"{symbol}",'
+                f'"b":[{",".join(sides["b"])}],"a":[{",".join(sides["a"])}],"u":{u},"seq":{u}}},"cts":{ts}}}')
+
+    @staticmethod
+    def trades(topic, ts):
+        symbol = topic.rsplit('.', 1)[1]
+        items = ','.join(
+            f'{{"T":{ts},"s":"{symbol}","S":"{random.choice(("Buy", "Sell"))}","v":"{random.uniform(0.01, 5):.3f}",'
+            f'"p":"{100 + random.random():.4f}","L":"PlusTick","i":"{random.getrandbits(32)}","BT":false}}'
+            for _ in range(random.randint(1, 3)))
+        return f'{{"topic":"{topic}","type":"snapshot","ts":{ts},"data":[{items}]}}'
+
+    def frame(self, category, topic, ts, books):
+        # Кадр потока по теме; books — topic -> последний номер u стакана в этом соединении
+        if topic.startswith('orderbook.'):
+            u = books[topic] + 1
+            if random.random() < self.book_gap:
+                u += 1
+                self.book_gaps += 1
+            books[topic] = u
+            return self.book_delta(topic, ts, u)
+        if topic.startswith('publicTrade.'):
+            return self.trades(topic, ts)
+        symbol = topic.split('.', 1)[1]
+        return self.spot_snapshot(symbol, ts) if category == 'spot' else self.delta(symbol, ts)
+
+    async def ws(self, request):
+        category = request.match_info['category']
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        subscribed = []  # темы
+        books = {}
+        feeder = asyncio.create_task(self._feed(ws, category, subscribed, books))
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                req = json.loads(msg.data)
+                op = req.get('op')
+                if op == 'ping':
+                    await ws.send_json({'success': True, 'ret_msg': 'pong', 'conn_id': '', 'req_id': req.get('req_id', ''), 'op': 'ping'})
+                elif op in ('subscribe', 'unsubscribe'):
+                    args = req.get('args', [])
+                    await ws.send_json({'success': True, 'ret_msg': '', 'conn_id': '', 'req_id': req.get('req_id', ''), 'op': op})
+                    if op == 'subscribe':
+                        ts = int(time.time() * 1000)
+                        for topic in args:
+                            subscribed.append(topic)
+                            if topic.startswith('tickers.'):
+                                await ws.send_str(self.ticker(category, topic.split('.', 1)[1], ts, True))
+                            elif topic.startswith('orderbook.'):
+                                books[topic] = random.randrange(1000, 10**6)
+                                await ws.send_str(self.book_snapshot(topic, ts, books[topic]))
+                    else:
+                        for topic in args:
+                            if topic in subscribed:
+                                subscribed.remove(topic)
+        except ConnectionResetError:
+            pass
+        finally:
+            feeder.cancel()
+            self.sockets.discard(ws)
+        return ws
+
+    async def _feed(self, ws, category, subscribed, books):
+        # Каждый тик отправляет в среднем rate * FEED_TICK обновлений на подписанную тему;
+        # отставание генератора от графика догоняется на следующем тике
+        due = time.monotonic()
+        while not ws.closed:
+            due += FEED_TICK
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            ts = int(time.time() * 1000)
+            expected = self.rate * FEED_TICK * len(subscribed)
+            count = int(expected) + (random.random() < expected % 1)
+            try:
+                for topic in random.choices(subscribed, k=count) if subscribed else ():
+                    await ws.send_str(self.frame(category, topic, ts, books))
+                self.sent += count
+            except ConnectionResetError:
+                return
+
+    async def kill_all(self):
+        # Обрыв всех соединений, как при сбое на стороне биржи
+        self.kills += 1
+        for ws in list(self.sockets):
+            await ws.close()
+
+    async def _killer(self):
+        while True:
+            await asyncio.sleep(self.kill_every)
+            await self.kill_all()
+
+    async def start(self, host='127.0.0.1', port=0, reuse_port=False):
+        self.loop = asyncio.get_running_loop()
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port, reuse_port=reuse_port or None)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        if self.kill_every:
+            self.loop.create_task(self._killer())
+        return self.port
+
+    def start_thread(self, host='127.0.0.1', port=0):
+        # Сервер в фоновом потоке со своим циклом; возвращает порт
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start(host, port))
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name='fake-bybit', daemon=True).start()
+        ready.wait()
+        return self.port
+
+    def kill_all_threadsafe(self):
+        asyncio.run_coroutine_threadsafe(self.kill_all(), self.loop).result()
+
+
+async def serve(args, reuse_port=False, announce=True):
+    server = FakeBybit(args.symbols, args.rate, args.kill_every, args.msg_rate, args.book_gap)
+    port = await server.start(port=args.port, reuse_port=reuse_port)
+    if announce:
+        print(f'fake bybit на порту {port}', flush=True)
+        for name, url in FakeBybit.endpoints(port).items():
+            print(f'  {name}: {url}', flush=True)
+    await asyncio.Event().wait()
+
+
+def run_worker(args):
+    # Дополнительный процесс на том же порту (SO_REUSEPORT): соединения между процессами делит ядро
+    try:
+        asyncio.run(serve(args, reuse_port=True, announce=False))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Локальный стенд Bybit v5')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--symbols', type=int, default=100, help='символов на категорию')
+    parser.add_argument('--rate', type=float, default=10.0, help='обновлений/с на символ')
+    parser.add_argument('--msg-rate', type=float, default=None, help='сообщений/с всего, вместо --rate')
+    parser.add_argument('--kill-every', type=float, default=None, help='обрывать соединения каждые N с')
+    parser.add_argument('--book-gap', type=float, default=0.0, help='вероятность пропуска номера delta стакана')
+    parser.add_argument('--workers', type=int, default=1, help='процессов на одном порту (Linux, SO_REUSEPORT)')
+    args = parser.parse_args()
+    if args.workers > 1 and not args.port:
+        parser.error('--workers требует явный --port')
+    for _ in range(args.workers - 1):
+        multiprocessing.Process(target=run_worker, args=(args,), daemon=True).start()
+    try:
+        asyncio.run(serve(args, reuse_port=args.workers > 1))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
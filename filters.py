@@ -0,0 +1,287 @@
+import json
+import os
+import re
+import tempfile
+from itertools import compress
+
+import numpy as np
+
+from history import HISTORY_COLUMNS
+from ticker_store import SPOT_FIELDS, FUT_FIELDS, BASIS, FUNDING_LEFT
+
+# Фильтры строк: маленький язык выражений над числовыми полями тикеров, компилируемый
+# в векторный предикат над колонками хранилища. Пример:
+#   turnover24h > 10M and abs(price24hPcnt) > 5% and fundingRate > 0.05%
+# Проценты — доли, как их присылает Bybit (5% = 0.05); суффиксы k/M/B — тысячи, миллионы, миллиарды.
+# Пустое поле (нет значения или поля нет у хранилища, например fundingRate у спота) не проходит сравнение.
+FILTER_FIELDS = tuple(dict.fromkeys(SPOT_FIELDS + FUT_FIELDS + (BASIS, FUNDING_LEFT) + HISTORY_COLUMNS))
+# Поля, меняющиеся без сообщений (по часам биржи): фильтр с ними пересчитывается целиком на каждом тике
+VOLATILE_FIELDS = {FUNDING_LEFT}
+SUFFIXES = {'k': 1e3, 'K': 1e3, 'm': 1e6, 'M': 1e6, 'b': 1e9, 'B': 1e9, '%': 0.01}
+FILTERS_PATH = os.path.join(os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config'), 'ws_screener', 'filters.json')
+
+_TOKEN = re.compile(r'\s*(?:(?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)(?P<suffix>[kKmMbB%])?|(?P<name>[A-Za-z_]\w*)'
+                    r'|(?P<op>>=|<=|==|!=|&&|\|\||[-+*/()<>!]))')
+_COMPARE = {
+    '>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal,
+    '==': np.equal, '!=': np.not_equal,
+}
+_ARITH = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide}
+
+
+class FilterError(ValueError):
+    pass
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if m is None or m.end() == pos:
+            pos += len(text) - pos - len(text[pos:].lstrip())  # позиция самого символа, не пробела перед ним
+            raise FilterError(f"непонятный символ в позиции {pos + 1}: {text[pos:pos + 10]!r}")
+        if m.group('num') is not None:
+            tokens.append(('num', float(m.group('num')) * SUFFIXES.get(m.group('suffix'), 1), m.start('num')))
+        elif m.group('name') is not None:
+            name = m.group('name')
+            kind = name.lower() if name.lower() in ('and', 'or', 'not', 'abs') else 'name'
+            tokens.append((kind, name, m.start('name')))
+        else:
+            op = {'&&': 'and', '||': 'or', '!': 'not'}.get(m.group('op'), m.group('op'))
+            tokens.append((op if op in ('and', 'or', 'not') else 'op', op, m.start('op')))
+        pos = m.end()
+    tokens.append(('end', None, len(text)))
+    return tokens
+
+
+class _Parser:
+    # Рекурсивный спуск; узлы — кортежи, второй элемент — вид значения ('num' или 'bool')
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.i = 0
+        self.fields = set()
+
+    def peek(self, *values):
+        kind, value, _ = self.tokens[self.i]
+        return kind in values or (kind == 'op' and value in values)
+
+    def take(self):
+        token = self.tokens[self.i]
+        self.i += 1
+        return token
+
+    def expect(self, value):
+        kind, got, pos = self.take()
+        if got != value:
+            raise FilterError(f"ожидается {value!r} в позиции {pos + 1}")
+
+    def fail(self, message):
+        raise FilterError(f"{message} в позиции {self.tokens[self.i][2] + 1}")
+
+    def parse(self):
+        node = self.logic_or()
+        if not self.peek('end'):
+            self.fail("лишнее в выражении")
+        if node[1] != 'bool':
+            raise FilterError("выражение должно быть условием: сравнение, and, or, not")
+        return node
+
+    def logic_or(self):
+        node = self.logic_and()
+        while self.peek('or'):
+            self.take()
+            node = ('or', 'bool', self.need_bool(node), self.need_bool(self.logic_and()))
+        return node
+
+    def logic_and(self):
+        node = self.logic_not()
+        while self.peek('and'):
+            self.take()
+            node = ('and', 'bool', self.need_bool(node), self.need_bool(self.logic_not()))
+        return node
+
+    def logic_not(self):
+        if self.peek('not'):
+            self.take()
+            return ('not', 'bool', self.need_bool(self.logic_not()))
+        return self.comparison()
+
+    def comparison(self):
+        node = self.additive()
+        if self.peek(*_COMPARE):
+            op = self.take()[1]
+            node = ('cmp', 'bool', op, self.need_num(node), self.need_num(self.additive()))
+            if self.peek(*_COMPARE):
+                self.fail("цепочка сравнений не поддерживается (используйте and)")
+        return node
+
+    def additive(self):
+        node = self.term()
+        while self.peek('+', '-'):
+            op = self.take()[1]
+            node = ('arith', 'num', op, self.need_num(node), self.need_num(self.term()))
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.peek('*', '/'):
+            op = self.take()[1]
+            node = ('arith', 'num', op, self.need_num(node), self.need_num(self.unary()))
+        return node
+
+    def unary(self):
+        if self.peek('-'):
+            self.take()
+            return ('neg', 'num', self.need_num(self.unary()))
+        if self.peek('abs'):
+            self.take()
+            self.expect('(')
+            node = self.need_num(self.logic_or())
+            self.expect(')')
+            return ('abs', 'num', node)
+        return self.atom()
+
+    def atom(self):
+        kind, value, pos = self.take()
+        if kind == 'num':
+            return ('const', 'num', value)
+        if kind == 'name':
+            if value not in FILTER_FIELDS:
+                raise FilterError(f"неизвестное поле {value!r} в позиции {pos + 1}; доступны: {', '.join(FILTER_FIELDS)}")
+            self.fields.add(value)
+            return ('field', 'num', value)
+        if value == '(':
+            node = self.logic_or()
+            self.expect(')')
+            return node
+        raise FilterError(f"ожидается число, поле или '(' в позиции {pos + 1}")
+
+    def need_num(self, node):
+        if node[1] != 'num':
+            self.fail("ожидается число, а не условие")
+        return node
+
+    def need_bool(self, node):
+        if node[1] != 'bool':
+            self.fail("ожидается условие (сравнение), а не число")
+        return node
+
+
+def _compile(node):
+    # Узел -> функция над словарём колонок {field: float64 с NaN на месте пустых}
+    tag = node[0]
+    if tag == 'const':
+        value = node[2]
+        return lambda cols: value
+    if tag == 'field':
+        field = node[2]
+        return lambda cols: cols[field]
+    if tag in ('neg', 'abs', 'not'):
+        inner = _compile(node[2])
+        op = {'neg': np.negative, 'abs': np.abs, 'not': np.logical_not}[tag]
+        return lambda cols: op(inner(cols))
+    if tag in ('and', 'or'):
+        left, right = _compile(node[2]), _compile(node[3])
+        op = np.logical_and if tag == 'and' else np.logical_or
+        return lambda cols: op(left(cols), right(cols))
+    left, right = _compile(node[3]), _compile(node[4])
+    op = (_COMPARE if tag == 'cmp' else _ARITH)[node[2]]
+    return lambda cols: op(left(cols), right(cols))
+
+
+def compile_filter(text):
+    # -> (функция колонок -> bool-массив, используемые поля); FilterError при ошибке
+    parser = _Parser(text)
+    fn = _compile(parser.parse())
+    return fn, frozenset(parser.fields)
+
+
+class RowFilter:
+    # Скомпилированный фильтр и маска прошедших строк в порядке source.keys().
+    # На тике пересчитываются только строки изменившихся символов
+
+    def __init__(self, text):
+        self.text = text.strip()
+        self._fn, self.fields = compile_filter(self.text)
+        self.volatile = bool(self.fields & VOLATILE_FIELDS)
+        self.mask = np.zeros(0, dtype=bool)
+        self._passed = None  # множество прошедших ключей, строится лениво в select()
+
+    def _evaluate(self, source, rows=None):
+        cols = {}
+        size = len(source) if rows is None else len(rows)
+        for field in self.fields:
+            values, valid = source.column(field)
+            if rows is not None:
+                values, valid = values[rows], valid[rows]
+            cols[field] = np.where(valid, values, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = self._fn(cols)
+        return np.broadcast_to(np.asarray(result, dtype=bool), (size,)).copy()
+
+    def update(self, source, dirty=None):
+        # dirty: key -> set(полей) или '*', изменившиеся с прошлого вызова; None — всё.
+        # -> True, если набор прошедших строк изменился
+        if dirty is None or self.volatile or len(self.mask) != len(source):
+            mask = self._evaluate(source)
+            changed = len(mask) != len(self.mask) or bool((mask != self.mask).any())
+            self.mask = mask
+            if changed:
+                self._passed = None
+            return changed
+        # Пересчитываем только строки, у которых изменилось поле из выражения
+        fields = self.fields
+        keys = [key for key, changed in dirty.items() if changed == '*' or not fields.isdisjoint(changed)]
+        if not keys:
+            return False
+        rows = source.positions(keys)
+        result = self._evaluate(source, rows)
+        changed = bool((result != self.mask[rows]).any())
+        if changed:
+            self.mask[rows] = result
+            self._passed = None
+        return changed
+
+    def count(self):
+        return int(self.mask.sum())
+
+    def select(self, source, keys):
+        # Ключи из keys (в их порядке), прошедшие фильтр; проверка по множеству дешевле,
+        # чем искать номер строки каждого ключа
+        if self._passed is None:
+            self._passed = set(compress(source.keys(), self.mask.tolist()))
+        return list(filter(self._passed.__contains__, keys))
+
+
+def load_saved_filters(path=FILTERS_PATH):
+    # {вкладка: {имя: выражение}}; нет файла или он испорчен — пусто
+    try:
+        with open(path, encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return saved if isinstance(saved, dict) else {}
+
+
+def save_saved_filters(saved, path=FILTERS_PATH):
+    save_json(saved, path)
+
+
+def save_json(data, path):
+    # Настройки в ~/.config/ws_screener: временный файл + os.replace, обрыв записи не испортит старые
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
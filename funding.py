@@ -0,0 +1,74 @@
+import time
+from heapq import heappop, heappush
+
+
+class ExchangeClock:
+    # Время биржи между сообщениями: последний ts биржи + локально прошедшее с его приёма.
+    # Одни часы на все строки: отсчёт до фандинга идёт каждую секунду, а не с приходом сообщения
+
+    def __init__(self):
+        self._ts = None
+        self._at = 0.0
+
+    def sync(self, exchange_ts):
+        if exchange_ts:
+            self._ts = int(exchange_ts)
+            self._at = time.monotonic()
+
+    def now(self):
+        # мс по часам биржи; None — ещё не было ни одного сообщения
+        if self._ts is None:
+            return None
+        return self._ts + int((time.monotonic() - self._at) * 1000)
+
+
+class FundingScheduler:
+    # Символы сгруппированы по времени фандинга (у большинства контрактов оно общее: 00/08/16 UTC),
+    # в куче лежат только сами времена групп. Обновление символа — O(1) или O(log n) на новую группу,
+    # уведомление за alert_ms до фандинга срабатывает один раз на группу
+
+    def __init__(self, alert_ms):
+        self.alert_ms = alert_ms
+        self._heap = []     # времена фандинга групп
+        self._buckets = {}  # nextFundingTime -> set(symbol)
+        self._time_of = {}  # symbol -> nextFundingTime
+
+    def __len__(self):
+        return len(self._time_of)
+
+    def set(self, symbol, next_funding_time):
+        next_funding_time = int(next_funding_time)
+        old = self._time_of.get(symbol)
+        if old == next_funding_time:
+            return
+        if old is not None:
+            bucket = self._buckets.get(old)
+            if bucket is not None:
+                # Опустевшая группа остаётся в куче и отбрасывается при извлечении
+                bucket.discard(symbol)
+        self._time_of[symbol] = next_funding_time
+        bucket = self._buckets.get(next_funding_time)
+        if bucket is None:
+            bucket = self._buckets[next_funding_time] = set()
+            heappush(self._heap, next_funding_time)
+        bucket.add(symbol)
+
+    def remove(self, symbol):
+        old = self._time_of.pop(symbol, None)
+        if old is not None and old in self._buckets:
+            self._buckets[old].discard(symbol)
+
+    def next_alert(self):
+        # Момент ближайшего уведомления (мс биржи) или None
+        return self._heap[0] - self.alert_ms if self._heap else None
+
+    def due(self, now):
+        # -> [(symbol, мс до фандинга)] групп, у которых наступило окно уведомления.
+        # Группы, чей фандинг уже прошёл (например, при запуске), снимаются молча
+        fired = []
+        while self._heap and self._heap[0] - self.alert_ms <= now:
+            next_funding_time = heappop(self._heap)
+            bucket = self._buckets.pop(next_funding_time, ())
+            if now < next_funding_time:
+                fired.extend((symbol, next_funding_time - now) for symbol in sorted(bucket))
+        return fired
@@ -0,0 +1,157 @@
+import math
+
+import numpy as np
+
+from ticker_store import replace_derived
+
+# Короткая история тикеров: по хранилищу — кольцевые буферы выборок lastPrice и openInterestValue
+# (numpy float32, слот x строка, выделяются заранее в пределах бюджета памяти) и производные колонки,
+# которые раз в тик считаются векторно по всем символам сразу:
+# изменение цены за 1/5/15 минут, реализованная волатильность и изменение открытого интереса за 15 минут.
+# Время — часы биржи (ExchangeClock), поэтому окна верны и при воспроизведении записи с ускорением.
+# volume24h не хранится: это скользящая сумма за сутки, её разность за 15 минут — не объём за 15 минут.
+CHANGE_1M = 'change_1m'
+CHANGE_5M = 'change_5m'
+CHANGE_15M = 'change_15m'
+VOLATILITY = 'volatility_15m'  # sqrt(сумма квадратов лог-доходностей выборок за окно)
+OI_CHANGE = 'oi_change_15m'
+CHANGE_WINDOWS = ((CHANGE_1M, 60), (CHANGE_5M, 300), (CHANGE_15M, 900))
+HISTORY_COLUMNS = (CHANGE_1M, CHANGE_5M, CHANGE_15M, VOLATILITY, OI_CHANGE)
+
+HISTORY_WINDOW_S = 900
+HISTORY_PERIOD_S = 1       # шаг выборки; если бюджета не хватает — шаг растёт, окна округляются до шага
+HISTORY_BUDGET_MB = 64     # на оба хранилища
+PRICE = 'lastPrice'
+OI = 'openInterestValue'
+
+
+class TickerHistory:
+    # История одного хранилища; строки буферов — строки хранилища, слоты — выборки по времени
+
+    def __init__(self, store, budget_bytes, window_s=HISTORY_WINDOW_S, period_s=HISTORY_PERIOD_S):
+        self.store = store
+        self.fields = tuple(f for f in (PRICE, OI) if f in store.fields)
+        self.budget_bytes = budget_bytes
+        self.window_ms = window_s * 1000
+        self.min_period_ms = period_s * 1000
+        self.rows = 0
+        self.period_ms = 0
+        self.slots = 0
+        self.buffers = {}    # field -> float32 (slots, rows), NaN — значения не было
+        self.head = 0        # слот следующей выборки
+        self.count = 0       # заполнено слотов
+        self.next_sample = None
+        # Сумма квадратов лог-доходностей за окно ведётся на ходу: вычитается уходящая, прибавляется новая
+        self._sum_sq = np.zeros(0)
+        self._returns = np.zeros(0, dtype=np.int32)
+
+    def _plan(self, rows):
+        # -> (шаг выборки в мс, слотов) под бюджет
+        per_slot = max(rows, 1) * len(self.fields) * 4
+        slots = max(self.budget_bytes // per_slot, 2)
+        period = max(self.min_period_ms, math.ceil(self.window_ms / (slots - 1) / 1000) * 1000)
+        return period, self.window_ms // period + 1
+
+    def memory_bytes(self):
+        return sum(buf.nbytes for buf in self.buffers.values()) + self._sum_sq.nbytes + self._returns.nbytes
+
+    def _ensure_rows(self):
+        n = len(self.store)
+        if n <= self.rows and self.buffers:
+            return
+        rows = max(self.store.capacity, n)
+        period, slots = self._plan(rows)
+        old = self.buffers
+        self.buffers = {f: np.full((slots, rows), np.nan, dtype=np.float32) for f in self.fields}
+        sum_sq, returns = self._sum_sq, self._returns
+        self._sum_sq = np.zeros(rows)
+        self._returns = np.zeros(rows, dtype=np.int32)
+        if (period, slots) == (self.period_ms, self.slots):
+            # Геометрия та же — переносим накопленное, новые строки пустые
+            for f in self.fields:
+                self.buffers[f][:, :self.rows] = old[f]
+            self._sum_sq[:self.rows] = sum_sq
+            self._returns[:self.rows] = returns
+        else:
+            self.head = self.count = 0
+        self.rows, self.period_ms, self.slots = rows, period, slots
+
+    def _current(self, field):
+        values, valid = self.store.column(field)
+        return np.where(valid, values, np.nan)
+
+    def _lag(self, window_ms):
+        return max(1, round(window_ms / self.period_ms))
+
+    def _at(self, field, lag):
+        # Выборка lag шагов назад от последней; None — истории ещё нет
+        if self.count <= lag:
+            return None
+        return self.buffers[field][(self.head - 1 - lag) % self.slots, :len(self.store)]
+
+    def sample(self, now):
+        # Выборка по часам биржи (мс); пропущенные шаги заполняются текущими значениями. -> True, если была выборка
+        if not now:
+            return False
+        self._ensure_rows()
+        if self.next_sample is None:
+            self.next_sample = now
+        if now < self.next_sample:
+            return False
+        steps = int((now - self.next_sample) // self.period_ms) + 1
+        self.next_sample += steps * self.period_ms
+        current = {f: self._current(f) for f in self.fields}
+        for _ in range(min(steps, self.slots)):
+            self._push(current)
+        return True
+
+    def _push(self, current):
+        n = len(self.store)
+        prices = self.buffers[PRICE]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if self.count == self.slots:
+                # Из окна уходит доходность между самой старой и следующей выборкой
+                leaving = np.log(prices[(self.head + 1) % self.slots] / prices[self.head]).astype(np.float64)
+                ok = np.isfinite(leaving)
+                self._sum_sq[ok] -= leaving[ok] ** 2
+                self._returns -= ok
+            if self.count:
+                new = np.log(current[PRICE] / prices[(self.head - 1) % self.slots, :n])
+                ok = np.isfinite(new)
+                self._sum_sq[:n][ok] += new[ok] ** 2
+                self._returns[:n] += ok
+        for f in self.fields:
+            self.buffers[f][self.head, :n] = current[f]
+            self.buffers[f][self.head, n:] = np.nan
+        self.head = (self.head + 1) % self.slots
+        self.count = min(self.count + 1, self.slots)
+        if self.head == 0:
+            self._resum()
+
+    def _resum(self):
+        # Раз за оборот кольца сумма пересчитывается заново, чтобы не копилась ошибка округления
+        prices = np.roll(self.buffers[PRICE], -self.head, axis=0)[-self.count:].astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = np.diff(np.log(prices), axis=0)
+        ok = np.isfinite(returns)
+        self._sum_sq = np.square(np.where(ok, returns, 0.0)).sum(axis=0)
+        self._returns = ok.sum(axis=0, dtype=np.int32)
+
+    def update(self, now):
+        # Выборка и пересчёт колонок в store.derived. -> {колонка: номера строк, где значение изменилось}
+        if not self.sample(now) and not self.count:
+            return {}
+        n = len(self.store)
+        columns = {}
+        price = self._current(PRICE)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for name, window_s in CHANGE_WINDOWS:
+                old = self._at(PRICE, self._lag(window_s * 1000))
+                columns[name] = np.full(n, np.nan) if old is None else np.where(old > 0, price / old - 1, np.nan)
+            returns = self._returns[:n]
+            columns[VOLATILITY] = np.where(returns >= 2, np.sqrt(np.maximum(self._sum_sq[:n], 0.0)), np.nan)
+            if OI in self.fields:
+                old = self._at(OI, self._lag(self.window_ms))
+                oi = self._current(OI)
+                columns[OI_CHANGE] = np.full(n, np.nan) if old is None else np.where(old > 0, oi / old - 1, np.nan)
+        return {name: replace_derived(self.store, name, values) for name, values in columns.items()}
@@ -0,0 +1,472 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+import aiohttp
+
+from connections import ShardedStream
+from instruments import InstrumentRegistry, CACHE_PATH
+from metrics import LatencyStats, Histogram, MetricsRegistry, METRICS_SAMPLE
+from orderbook import BookEngine
+from snapshot import SNAPSHOT_PATH, SNAPSHOT_INTERVAL, capture, read_snapshot, write_snapshot
+from ticker_store import TickerStore, DiffTracker, SPOT_FIELDS, FUT_FIELDS
+from trade_flow import TradeFlow
+from ws_decode import get_decoder, DICT_TICKER_GETTERS, MALFORMED_ERRORS
+
+SPOT_WS_URL = "wss://stream.bybit.com/v5/public/spot"
+SPOT_SYMBOLS_URL = "https://api.bybit.com/v5/market/instruments-info?category=spot"
+FUT_WS_URL = "wss://stream.bybit.com/v5/public/linear"
+FUT_SYMBOLS_URL = "https://api.bybit.com/v5/market/instruments-info?category=linear"
+
+# Точки подключения; для локального стенда (fake_bybit.py) подменяются целиком
+BYBIT_ENDPOINTS = {
+    'spot_symbols': SPOT_SYMBOLS_URL,
+    'linear_symbols': FUT_SYMBOLS_URL,
+    'spot': SPOT_WS_URL,
+    'linear': FUT_WS_URL,
+}
+
+# Как часто движок публикует накопленные изменения (частота кадров интерфейса)
+PUBLISH_INTERVAL = 0.1
+
+
+class TickerBatch:
+    # Слитые за кадр изменения обоих хранилищ; GUI только применяет их
+    def __init__(self, spot, fut, last_broker_ts, updates):
+        self.spot = spot
+        self.fut = fut
+        self.last_broker_ts = last_broker_ts
+        self.updates = updates  # сообщений с изменениями, слитых в этот пакет
+
+
+class IngestEngine:
+    # Приём WebSocket-потоков Bybit: разбор и обновление состояния в собственном цикле asyncio
+    # (по умолчанию в отдельном потоке), публикация слитых пакетов в очередь batches.
+    # deque.append/popleft атомарны, поэтому потребитель забирает пакеты без блокировок.
+
+    def __init__(self, publish_interval=PUBLISH_INTERVAL, decoder=None, shards=None, endpoints=None,
+                 cache_path=CACHE_PATH, snapshot_path=SNAPSHOT_PATH, recorder=None, replay=None, metrics_sample=METRICS_SAMPLE,
+                 book_depth=None, trades=False):
+        self.publish_interval = publish_interval
+        self.endpoints = dict(BYBIT_ENDPOINTS, **(endpoints or {}))
+        # Список инструментов: кэш на диске, обновление в фоне; cache_path=None — без кэша
+        self.registry = InstrumentRegistry(
+            {'spot': self.endpoints['spot_symbols'], 'linear': self.endpoints['linear_symbols']}, cache_path)
+        self.shards = shards  # соединений на категорию; None — выбирается автоматически
+        self.streams = {}
+        self.data_spot = TickerStore(SPOT_FIELDS, 'spot')
+        self.data_fut = TickerStore(FUT_FIELDS, 'futures')
+        self._spot = DiffTracker(self.data_spot)
+        self._fut = DiffTracker(self.data_fut)
+        self.decoder = get_decoder(decoder)
+        # Маршрутизация кадров по префиксу темы: category -> {префикс: обработчик}
+        self.routes = {
+            'spot': {'tickers': self._ticker_handler(self._spot, self.decoder.ticker_getter('spot'))},
+            'linear': {'tickers': self._ticker_handler(self._fut, self.decoder.ticker_getter('linear'))},
+        }
+        # Необязательные темы: стакан orderbook.{book_depth} и лента сделок publicTrade, по тем же соединениям.
+        # Их поля в хранилищах считаются раз в публикацию, см. _flush_market
+        self.topic_prefixes = ['tickers.']
+        self.books = {}   # category -> BookEngine
+        self.trades = {}  # category -> TradeFlow
+        self._resync = {}  # category -> символы, стаканам которых нужен свежий снапшот
+        for category, tracker in (('spot', self._spot), ('linear', self._fut)):
+            if book_depth:
+                books = self.books[category] = BookEngine(tracker, book_depth, self._gap_handler(category))
+                self.routes[category]['orderbook'] = self._book_handler(books, self.decoder.book_getter(category))
+            if trades:
+                flow = self.trades[category] = TradeFlow(tracker)
+                self.routes[category]['publicTrade'] = self._trades_handler(flow, self.decoder.trades_getter(category))
+        self.book_prefix = f'orderbook.{book_depth}.'
+        if book_depth:
+            self.topic_prefixes.append(self.book_prefix)
+        if trades:
+            self.topic_prefixes.append('publicTrade.')
+        self.batches = deque()
+        self.latency = LatencyStats()  # ts биржи -> handle_ws_msg, мс
+        self.last_broker_ts = None
+        # Время от запуска до первого обновления по каждому символу
+        self.started_at = None
+        self.time_to_populated = None
+        self._unseen = {}  # DiffTracker -> set(символов без единого обновления); только поток приёма
+        self._unseen_count = 0  # их число: populated() из других потоков читает только его
+        self.session = None  # общий aiohttp-сеанс для REST и всех WebSocket-соединений
+        # Снимок состояния для тёплого старта; snapshot_path=None — без снимков.
+        # Воспроизведение записи снимок не читает и не пишет: результат не должен зависеть от прошлых запусков
+        self.snapshot_path = snapshot_path if replay is None else None
+        # Запись сырых кадров (FrameRecorder) и воспроизведение записи вместо сети (FrameReplay)
+        self.recorder = recorder
+        self.replay = replay
+        self.restored = 0  # строк, показанных из снимка до первых сообщений
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_written = 0.0
+        self.loop = None
+        self._thread = None
+        self._main_task = None
+        # Метрики: счётчики — обычные атрибуты, длительности разбора — у каждого metrics_sample-го кадра
+        self.metrics_sample = metrics_sample
+        self._until_sample = metrics_sample or -1
+        self.decode_us = Histogram()
+        self.handle_us = Histogram()
+        self.unrouted = 0            # кадры с темой, для которой нет обработчика или данных
+        self.malformed = 0           # кадры, которые не разобрались, — пропущены
+        self.published_updates = 0   # сообщений с изменениями, ушедших потребителю
+        self.metrics = MetricsRegistry()
+        self._register_metrics()
+
+    def _register_metrics(self):
+        m = self.metrics
+        m.register('ws_messages_total', 'counter', 'Кадры WebSocket по соединениям', lambda: [
+            ({'category': category, 'shard': conn.index}, conn.messages)
+            for category, stream in list(self.streams.items()) for conn in stream.connections])
+        m.register('ws_message_rate', 'gauge', 'Кадров/с на соединение за последний интервал ребалансировки', lambda: [
+            ({'category': category, 'shard': i}, rate)
+            for category, stream in list(self.streams.items()) for i, rate in enumerate(stream.rates)])
+        m.register('ws_reconnects_total', 'counter', 'Переподключения', lambda: [
+            ({'category': category}, stream.reconnects()) for category, stream in list(self.streams.items())])
+        m.register('ws_task_errors_total', 'counter', 'Исключения фоновых задач подписки и деления шардов', lambda: [
+            ({'category': category}, stream.task_errors) for category, stream in list(self.streams.items())])
+        m.histogram('ws_decode_us', 'Разбор кадра, мкс (выборка)', self.decode_us)
+        m.histogram('ws_handle_us', 'Обработка кадра после разбора, мкс (выборка)', self.handle_us)
+        m.summary('ws_ts_to_receive_ms', 'ts биржи -> обработка кадра, мс', self.latency)
+        m.counter('ws_frames_unrouted_total', 'Кадры без обработчика темы', lambda: self.unrouted)
+        m.counter('ws_frames_malformed_total', 'Битые кадры, пропущенные без разрыва соединения', lambda: self.malformed)
+        m.counter('ingest_updates_total', 'Сообщений с изменениями, опубликованных потребителю', lambda: self.published_updates)
+        m.gauge('ingest_queue_depth', 'Пакетов в очереди к потребителю', lambda: len(self.batches))
+        m.gauge('ingest_populated_ratio', 'Доля символов с хотя бы одним обновлением', self.populated)
+        m.register('book_messages_total', 'counter', 'Сообщений стакана', lambda: [
+            ({'category': category}, books.messages) for category, books in self.books.items()])
+        m.register('book_gaps_total', 'counter', 'Разрывов последовательности стакана', lambda: [
+            ({'category': category}, books.gaps) for category, books in self.books.items()])
+        m.register('book_resyncs_total', 'counter', 'Снапшотов стакана после разрыва', lambda: [
+            ({'category': category}, books.resyncs) for category, books in self.books.items()])
+        m.register('trades_total', 'counter', 'Сделок в окнах ленты', lambda: [
+            ({'category': category}, flow.trades) for category, flow in self.trades.items()])
+        m.register('trades_late_total', 'counter', 'Сделок старше окна', lambda: [
+            ({'category': category}, flow.late) for category, flow in self.trades.items()])
+
+    def start_thread(self):
+        # Отдельный поток со своим циклом asyncio
+        self._thread = threading.Thread(target=self._run_thread, name='ingest', daemon=True)
+        self._thread.start()
+
+    def _run_thread(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.run())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.loop.close()
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        publisher = self.loop.create_task(self._publisher())
+        try:
+            if self.replay is not None:
+                await self.start_replay()
+            else:
+                await self.start_ws()
+        finally:
+            publisher.cancel()
+            self.publish()
+            if self.recorder is not None:
+                self.recorder.close()
+            if self.snapshot_path and self.populated() > 0:
+                # Последний снимок пишет обычный (не daemon) поток: процесс дождётся записи,
+                # а поток GUI не блокируется. Без живых данных старый снимок не трогаем
+                threading.Thread(target=self._write_snapshot, args=self._capture(), name='snapshot', daemon=False).start()
+
+    def stop(self):
+        if self.loop is None or self.loop.is_closed() or self._main_task is None:
+            return
+        self.loop.call_soon_threadsafe(self._main_task.cancel)
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    async def _publisher(self):
+        while True:
+            await asyncio.sleep(self.publish_interval)
+            self.publish()
+
+    def publish(self):
+        self._flush_market()
+        spot_updates, fut_updates = self._spot.updates, self._fut.updates
+        spot, fut = self._spot.take(), self._fut.take()
+        self.published_updates += spot_updates + fut_updates
+        if spot or fut:
+            self.batches.append(TickerBatch(spot, fut, self.last_broker_ts, spot_updates + fut_updates))
+
+    def _flush_market(self):
+        # Стакан и сделки в поля хранилищ: раз в публикацию, а не на каждое сообщение
+        for books in self.books.values():
+            books.flush()
+        for flow in self.trades.values():
+            flow.flush(self.last_broker_ts)
+        # Переподписка одним запросом на соединение для всех разошедшихся стаканов
+        for category, symbols in self._resync.items():
+            stream = self.streams.get(category)
+            if stream is not None and symbols:
+                stream.resubscribe([self.book_prefix + s for s in symbols])
+        self._resync = {}
+
+    def _gap_handler(self, category):
+        def on_gap(symbol):
+            self._resync.setdefault(category, set()).add(symbol)
+        return on_gap
+
+    def take_batches(self):
+        # Вызывается потребителем (GUI): забирает все опубликованные пакеты по порядку
+        batches = []
+        while True:
+            try:
+                batches.append(self.batches.popleft())
+            except IndexError:
+                return batches
+
+    def messages(self):
+        # Кадров, принятых всеми соединениями
+        return sum(conn.messages for stream in list(self.streams.values()) for conn in stream.connections)
+
+    def populated(self):
+        # Доля символов, по которым уже пришло хотя бы одно обновление
+        total = len(self.data_spot) + len(self.data_fut)
+        if not total:
+            return 0.0
+        return 1.0 - self._unseen_count / total
+
+    def _watch_unseen(self, unseen):
+        self._unseen = {t: symbols for t, symbols in unseen.items() if symbols}
+        self._unseen_count = sum(map(len, self._unseen.values()))
+
+    def _mark_seen(self, tracker, symbol):
+        unseen = self._unseen.get(tracker)
+        if not unseen or symbol not in unseen:
+            return
+        unseen.discard(symbol)
+        self._unseen_count -= 1
+        if not unseen:
+            del self._unseen[tracker]
+            if not self._unseen:
+                self.time_to_populated = time.monotonic() - self.started_at
+
+    async def start_ws(self):
+        self.started_at = time.monotonic()
+        async with aiohttp.ClientSession() as session:
+            self.session = session
+            # С кэшем подписываемся сразу, свежий список догружается в фоне
+            if not self.registry.load_cache():
+                await self.registry.refresh(session)
+            spot_symbols = self.registry.symbols('spot')
+            fut_symbols = self.registry.symbols('linear')
+            # Строки хранилищ создаются сразу для всех тикеров, значения пока невалидны
+            self._spot.add_symbols(spot_symbols)
+            self._fut.add_symbols(fut_symbols)
+            self._spot.set_decimals(self.registry.decimals('spot'))
+            self._fut.set_decimals(self.registry.decimals('linear'))
+            self._watch_unseen({self._spot: set(spot_symbols), self._fut: set(fut_symbols)})
+            self._record_listing()
+            if self.snapshot_path:
+                self.restore_snapshot()
+            self.publish()
+            background = [asyncio.create_task(self._refresh_instruments())]
+            if self.snapshot_path:
+                background.append(asyncio.create_task(self._checkpointer()))
+            try:
+                await asyncio.gather(self.ws_spot(spot_symbols), self.ws_fut(fut_symbols))
+            finally:
+                for task in background:
+                    task.cancel()
+
+    async def start_replay(self):
+        # Кадры записи идут тем же путём, что из сети (handle_frame); список инструментов — из записи
+        self.started_at = time.monotonic()
+        async for category, payload in self.replay.frames_paced():
+            if category is None:
+                listing = json.loads(payload)
+                first = not len(self.data_spot) and not len(self.data_fut)
+                for name in ('spot', 'linear'):
+                    self._apply_listing(name, listing['symbols'][name], listing['decimals'][name])
+                if first:
+                    self._watch_unseen({t: set(t.store.keys()) for t in (self._spot, self._fut)})
+            else:
+                self.handle_frame(category, payload)
+
+    def _record_listing(self):
+        if self.recorder is not None:
+            self.recorder.meta({
+                'symbols': {c: self.registry.symbols(c) for c in ('spot', 'linear')},
+                'decimals': {c: self.registry.decimals(c) for c in ('spot', 'linear')},
+            })
+
+    def restore_snapshot(self):
+        # Значения прошлого запуска показываются сразу, серыми, пока не придут живые
+        loaded = read_snapshot(self.snapshot_path)
+        if loaded is None:
+            return
+        _, snapshots = loaded
+        for name, tracker in (('spot', self._spot), ('linear', self._fut)):
+            if name in snapshots:
+                self.restored += tracker.restore(snapshots[name])
+
+    async def _checkpointer(self):
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+            # Копия колонок снимается в цикле приёма (мс), запись на диск — в пуле потоков
+            await self.loop.run_in_executor(None, self._write_snapshot, *self._capture())
+
+    def _capture(self):
+        return time.time(), {'spot': capture(self.data_spot), 'linear': capture(self.data_fut)}
+
+    def _write_snapshot(self, captured_at, snapshots):
+        with self._snapshot_lock:
+            # Запоздавшая периодическая запись не должна затереть более новый снимок
+            if captured_at < self._snapshot_written:
+                return
+            try:
+                write_snapshot(self.snapshot_path, snapshots, captured_at)
+            except OSError:
+                return
+            self._snapshot_written = captured_at
+
+    async def _refresh_instruments(self):
+        # Фоновое обновление списка: сразу, если он из устаревшего кэша, затем раз в TTL
+        registry = self.registry
+        while True:
+            await asyncio.sleep(max(0.0, registry.ttl - registry.age()) if registry.is_fresh() else 0)
+            try:
+                await registry.refresh(self.session)
+            except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError, KeyError, ValueError):
+                # Сеть или ответ биржи подвели — работаем по старому списку, пробуем позже
+                await asyncio.sleep(60)
+                continue
+            self.apply_instruments()
+
+    def apply_instruments(self):
+        for category in ('spot', 'linear'):
+            self._apply_listing(category, self.registry.symbols(category), self.registry.decimals(category))
+        self._record_listing()
+
+    def _apply_listing(self, category, symbols, decimals):
+        # Новые листинги — строки и подписка, снятые с торгов — отписка (строки остаются серыми)
+        tracker = self._spot if category == 'spot' else self._fut
+        listed = set(symbols)
+        new = [s for s in symbols if s not in tracker.store]
+        removed = [s for s in tracker.store.keys() if s not in listed]
+        tracker.add_symbols(new)
+        tracker.set_decimals(decimals)
+        stream = self.streams.get(category)
+        if stream is not None:
+            stream.add_symbols(new)
+            stream.remove_symbols(removed)
+        tracker.mark_stale(removed)
+
+    async def ws_spot(self, symbols):
+        self.streams['spot'] = ShardedStream(
+            'spot', self.endpoints['spot'], symbols, self.handle_frame, self.shards, self.topic_prefixes, self.on_stream_down)
+        await self.streams['spot'].run(self.session)
+
+    async def ws_fut(self, symbols):
+        self.streams['linear'] = ShardedStream(
+            'linear', self.endpoints['linear'], symbols, self.handle_frame, self.shards, self.topic_prefixes, self.on_stream_down)
+        await self.streams['linear'].run(self.session)
+
+    def on_stream_down(self, category, symbols):
+        # Соединение оборвалось: его строки серые, пока не придёт снапшот после переподключения
+        (self._spot if category == 'spot' else self._fut).mark_stale(symbols)
+        if category in self.books:
+            self.books[category].reset(symbols)
+
+    def handle_frame(self, category, raw, conn=None):
+        # Сырой текст кадра: быстрый декодер и обработчик по префиксу темы.
+        # Кадры без темы — ответы на subscribe/ping, их разбирает соединение
+        if self.recorder is not None:
+            self.recorder.record(category, raw)
+        # Каждый metrics_sample-й кадр идёт через замер; при 0 счётчик уходит в минус и нуля не достигает
+        self._until_sample -= 1
+        if not self._until_sample:
+            self._until_sample = self.metrics_sample
+            return self._handle_frame_timed(category, raw, conn)
+        # Битый кадр (не JSON, null или не тот тип в поле) пропускается: остальной поток соединения цел
+        try:
+            topic, ts, type_, data, frame = self.decoder.frame(raw)
+            if topic:
+                handler = self.routes[category].get(topic.partition('.')[0])
+                if handler is not None and data is not None:
+                    handler(ts, type_, data)
+                else:
+                    self.unrouted += 1
+                return True
+        except MALFORMED_ERRORS:
+            self.malformed += 1
+            return False
+        if conn is not None:
+            conn.on_op(*self.decoder.op(frame))
+        return False
+
+    def _handle_frame_timed(self, category, raw, conn):
+        # То же, что handle_frame, с замером разбора и обработки
+        t0 = time.perf_counter_ns()
+        try:
+            topic, ts, type_, data, frame = self.decoder.frame(raw)
+            t1 = time.perf_counter_ns()
+            if topic:
+                self.decode_us.observe((t1 - t0) / 1000)
+                handler = self.routes[category].get(topic.partition('.')[0])
+                if handler is not None and data is not None:
+                    handler(ts, type_, data)
+                    self.handle_us.observe((time.perf_counter_ns() - t1) / 1000)
+                else:
+                    self.unrouted += 1
+                return True
+        except MALFORMED_ERRORS:
+            self.malformed += 1
+            return False
+        if conn is not None:
+            conn.on_op(*self.decoder.op(frame))
+        return False
+
+    def handle_ws_msg(self, msg, is_spot):
+        # Уже разобранный кадр-словарь (бенчмарки, старый формат)
+        topic = msg.get('topic')
+        data = msg.get('data')
+        if not topic or data is None or not topic.startswith('tickers.'):
+            return
+        category = 'spot' if is_spot else 'linear'
+        tracker = self._spot if is_spot else self._fut
+        self._apply_ticker(tracker, DICT_TICKER_GETTERS[category](data), msg.get('ts'), msg.get('type'))
+
+    def _ticker_handler(self, tracker, getter):
+        def handle(ts, type_, data):
+            self._apply_ticker(tracker, getter(data), ts, type_)
+        return handle
+
+    def _book_handler(self, books, getter):
+        def handle(ts, type_, data):
+            books.handle(getter(data), type_ == 'snapshot')
+        return handle
+
+    def _trades_handler(self, flow, getter):
+        def handle(ts, type_, data):
+            flow.add(getter(data))
+        return handle
+
+    def _apply_ticker(self, tracker, values, ts, type_=None):
+        # values: (symbol, сырые значения полей хранилища по порядку)
+        symbol = values[0]
+        if not symbol:
+            return
+        if self._unseen:
+            self._mark_seen(tracker, symbol)
+        if ts:
+            self.latency.add_since(ts)
+            self.last_broker_ts = ts
+        else:
+            # Используем self.last_broker_ts, иначе локальное время
+            ts = self.last_broker_ts or int(time.time() * 1000)
+        # snapshot (после подписки и переподключения) заменяет строку целиком, delta — только свои поля
+        tracker.update_values(symbol, values[1:], ts, int(time.time() * 1000), type_ == 'snapshot')
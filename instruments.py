@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from decimal import Decimal, InvalidOperation
+
+# Справочник инструментов Bybit v5 (instruments-info) с кэшем на диске:
+# перезапуск подписывается сразу по кэшу, а свежий список догружается в фоне
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'ws_screener')
+CACHE_PATH = os.path.join(CACHE_DIR, 'instruments.json')
+CACHE_TTL = 6 * 3600
+CACHE_VERSION = 1
+PAGE_LIMIT = 1000  # максимум Bybit на страницу instruments-info
+TRADING = 'Trading'
+
+
+def tick_decimals(tick_size):
+    # '0.0010' -> 3; пустой или кривой шаг цены — None (формат по умолчанию)
+    try:
+        exponent = Decimal(tick_size).normalize().as_tuple().exponent
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return max(0, -exponent)
+
+
+class Instrument:
+    __slots__ = ('symbol', 'status', 'tick_size', 'decimals', 'contract_type', 'base_coin', 'quote_coin')
+
+    def __init__(self, symbol, status, tick_size='', contract_type='', base_coin='', quote_coin=''):
+        self.symbol = symbol
+        self.status = status
+        self.tick_size = tick_size
+        self.decimals = tick_decimals(tick_size)
+        self.contract_type = contract_type
+        self.base_coin = base_coin
+        self.quote_coin = quote_coin
+
+    @classmethod
+    def from_api(cls, item):
+        return cls(
+            item['symbol'], item.get('status', ''), (item.get('priceFilter') or {}).get('tickSize', ''),
+            item.get('contractType', ''), item.get('baseCoin', ''), item.get('quoteCoin', ''),
+        )
+
+    def to_row(self):
+        return [self.symbol, self.status, self.tick_size, self.contract_type, self.base_coin, self.quote_coin]
+
+
+class InstrumentRegistry:
+    # category -> {symbol: Instrument}; хранит только инструменты в статусе Trading
+
+    def __init__(self, urls, cache_path=CACHE_PATH, ttl=CACHE_TTL):
+        self.urls = dict(urls)  # category -> URL instruments-info
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.instruments = {category: {} for category in self.urls}
+        self.fetched_at = 0.0  # time.time() загрузки списка (из сети или из кэша)
+        self.from_cache = False
+
+    def symbols(self, category):
+        return list(self.instruments[category])
+
+    def decimals(self, category):
+        return {s: i.decimals for s, i in self.instruments[category].items() if i.decimals is not None}
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def is_fresh(self):
+        return self.fetched_at > 0 and self.age() < self.ttl
+
+    async def refresh(self, session):
+        # Категории загружаются параллельно; страницы внутри категории — по курсору, друг за другом
+        categories = list(self.urls)
+        results = await asyncio.gather(*(self._fetch_category(session, c) for c in categories))
+        self.instruments = dict(zip(categories, results))
+        self.fetched_at = time.time()
+        self.from_cache = False
+        if self.cache_path:
+            # Запись файла не должна задерживать цикл приёма
+            await asyncio.get_running_loop().run_in_executor(None, self.save_cache)
+
+    async def _fetch_category(self, session, category):
+        instruments = {}
+        cursor = ''
+        while True:
+            params = {'limit': PAGE_LIMIT}
+            if cursor:
+                params['cursor'] = cursor
+            async with session.get(self.urls[category], params=params) as resp:
+                data = await resp.json()
+            if data.get('retCode', 0) != 0:
+                raise RuntimeError(f"instruments-info {category}: {data.get('retMsg')}")
+            result = data['result']
+            for item in result['list']:
+                if item.get('status', TRADING) == TRADING:
+                    instruments[item['symbol']] = Instrument.from_api(item)
+            cursor = result.get('nextPageCursor') or ''
+            if not cursor:
+                return instruments
+
+    def load_cache(self):
+        # True, если кэш для тех же URL прочитан (даже устаревший — по нему можно подписаться)
+        if not self.cache_path:
+            return False
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if cache.get('version') != CACHE_VERSION or cache.get('urls') != self.urls:
+            return False
+        self.instruments = {
+            category: {row[0]: Instrument(*row) for row in cache['instruments'].get(category, [])}
+            for category in self.urls
+        }
+        self.fetched_at = cache.get('fetched_at', 0.0)
+        self.from_cache = True
+        return any(self.instruments.values())
+
+    def save_cache(self):
+        cache = {
+            'version': CACHE_VERSION,
+            'fetched_at': self.fetched_at,
+            'urls': self.urls,
+            'instruments': {c: [i.to_row() for i in items.values()] for c, items in self.instruments.items()},
+        }
+        directory = os.path.dirname(self.cache_path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # Временный файл + os.replace: обрыв записи не оставит полу-записанный кэш
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix='.instruments-')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
@@ -0,0 +1,77 @@
+from bisect import bisect_left, insort
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:
+    SortedList = None
+
+
+class _BisectList:
+    # Замена SortedList на обычном списке: вставка/удаление O(n), для тысяч строк хватает
+    def __init__(self, items=()):
+        self._items = sorted(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def add(self, item):
+        insort(self._items, item)
+
+    def remove(self, item):
+        del self._items[bisect_left(self._items, item)]
+
+    def bisect_left(self, item):
+        return bisect_left(self._items, item)
+
+
+class LiveSortIndex:
+    # Упорядоченный индекс строк по числовой колонке: при обновлении значения
+    # переставляется только этот символ. Ключ (пусто?, значение, номер строки источника) —
+    # пустые ячейки всегда в конце, равные значения в порядке источника, как у argsort(stable)
+
+    def __init__(self, descending=True):
+        self.descending = descending
+        self._entries = {}  # symbol -> текущий ключ в индексе
+        self._seq = {}      # symbol -> номер строки в источнике
+        self._sorted = (SortedList or _BisectList)()
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def _key(self, symbol, value):
+        if value is None or value != value:
+            return (1, 0.0, self._seq[symbol], symbol)
+        return (0, -value if self.descending else value, self._seq[symbol], symbol)
+
+    def build(self, symbols, values, valid):
+        # values/valid — колонка источника в порядке symbols
+        self._seq = {symbol: i for i, symbol in enumerate(symbols)}
+        self._entries = {
+            symbol: self._key(symbol, value if ok else None)
+            for symbol, value, ok in zip(symbols, values.tolist(), valid.tolist())
+        }
+        self._sorted = (SortedList or _BisectList)(self._entries.values())
+        return self
+
+    def update(self, symbol, value):
+        # True, если символ сменил место относительно остальных
+        old = self._entries.get(symbol)
+        if old is None:
+            self._seq[symbol] = len(self._seq)
+            new = self._entries[symbol] = self._key(symbol, value)
+            self._sorted.add(new)
+            return True
+        new = self._key(symbol, value)
+        if new == old:
+            return False
+        position = self._sorted.bisect_left(old)
+        self._sorted.remove(old)
+        self._sorted.add(new)
+        self._entries[symbol] = new
+        return self._sorted.bisect_left(new) != position
+
+    def order(self):
+        return [entry[3] for entry in self._sorted]
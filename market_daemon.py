@@ -0,0 +1,58 @@
+# Демон состояния рынка: один процесс держит REST и WebSocket-подключения к Bybit (IngestEngine)
+# и пишет тикеры в разделяемую память (shared_state.py). Окна и headless-скринеры на той же машине
+# подключаются к нему ключом --shm и своих соединений не открывают.
+# Запуск: python market_daemon.py [--shm NAME] [--rows 8192] [--metrics-port 9465] [--replay session.wsrec --speed 0]
+#         клиенты: python ws_screener_gui.py --shm [NAME]; python screener_core.py --shm [NAME]
+import argparse
+import asyncio
+import signal
+import sys
+
+from screener_core import add_engine_args, make_engine, start_metrics_server
+from shared_state import SharedStateWriter, SharedStateError, SHM_NAME, SHM_ROWS
+
+
+async def serve(engine, writer):
+    # Пакеты движка уходят в сегмент с той же частотой, с какой движок их публикует
+    engine_task = asyncio.ensure_future(engine.run())
+    try:
+        while not engine_task.done():
+            await asyncio.wait({engine_task}, timeout=engine.publish_interval)
+            writer.publish(engine.take_batches())
+            writer.heartbeat(engine)
+    finally:
+        engine_task.cancel()
+        try:
+            await engine_task
+        except asyncio.CancelledError:
+            pass
+        writer.publish(engine.take_batches())  # последний пакет движка при остановке
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Демон: состояние рынка Bybit в разделяемой памяти для нескольких скринеров')
+    add_engine_args(parser)
+    parser.add_argument('--rows', type=int, default=SHM_ROWS, help='строк на хранилище в сегменте')
+    args = parser.parse_args()
+    try:
+        engine = make_engine(args, shared=False)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        writer = SharedStateWriter(args.shm or SHM_NAME, args.rows)
+    except SharedStateError as e:
+        parser.error(str(e))
+    writer.register_metrics(engine.metrics)
+    start_metrics_server(engine, args)
+    # SIGTERM (systemd, kill) завершает так же, как Ctrl+C: сегмент помечается закрытым и удаляется
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        asyncio.run(serve(engine, writer))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+
+def now_ms():
+    return time.time() * 1000.0
+
+
+class LatencyStats:
+    # Кольцевой буфер последних измерений задержки (мс) с перцентилями по запросу
+
+    def __init__(self, size=4096):
+        self.size = size
+        self._samples = array('d', bytes(8 * size))
+        self._pos = 0
+        self.count = 0
+
+    def add(self, value):
+        self._samples[self._pos] = value
+        self._pos = (self._pos + 1) % self.size
+        self.count += 1
+
+    def add_since(self, ts):
+        # Задержка от ts биржи (мс) до текущего момента; включает расхождение часов
+        self.add(now_ms() - ts)
+
+    def percentiles(self, qs=(50, 99)):
+        n = min(self.count, self.size)
+        if not n:
+            return [None for _ in qs]
+        samples = np.frombuffer(self._samples, dtype=np.float64)[:n]
+        return [float(v) for v in np.percentile(samples, qs)]
+
+    def reset(self):
+        self._pos = 0
+        self.count = 0
+
+
+# Границы корзин гистограмм по умолчанию: 1-2-5 от 1 до 500 000 (мкс или мс — по смыслу метрики)
+DEFAULT_BUCKETS = tuple(m * 10 ** e for e in range(6) for m in (1, 2, 5))
+MS_BUCKETS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+# Замер длительностей на горячем пути — у каждого N-го кадра; 0 — выключен
+METRICS_SAMPLE = 16
+
+
+class Histogram:
+    # Счётчики по фиксированным корзинам, как у Prometheus: запись — bisect и два сложения.
+    # Пишет один поток, читают другие: чтение без блокировки, допустимо отставание на пару значений
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # последняя — выше всех границ
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Оценка по верхней границе корзины; None — замеров нет
+        counts = list(self.counts)
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            seen += n
+            if seen >= rank:
+                return bound if bound != float('inf') else self.buckets[-1]
+        return self.buckets[-1]
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}'
+
+
+class MetricsRegistry:
+    # Метрики регистрируются функцией сбора: значения читаются только при запросе,
+    # поэтому счётчики на горячем пути остаются обычными атрибутами объектов.
+    # collect() -> [(labels dict, значение)]; для histogram значение — Histogram, для summary — LatencyStats
+
+    def __init__(self):
+        self._metrics = []  # (name, type, help, collect)
+
+    def register(self, name, type_, help_, collect):
+        self._metrics.append((name, type_, help_, collect))
+
+    def counter(self, name, help_, fn, labels=None):
+        self.register(name, 'counter', help_, lambda: [(labels, fn())])
+
+    def gauge(self, name, help_, fn, labels=None):
+        self.register(name, 'gauge', help_, lambda: [(labels, fn())])
+
+    def histogram(self, name, help_, histogram, labels=None):
+        self.register(name, 'histogram', help_, lambda: [(labels, histogram)])
+        return histogram
+
+    def summary(self, name, help_, stats, labels=None):
+        self.register(name, 'summary', help_, lambda: [(labels, stats)])
+
+    def prometheus(self):
+        # Текстовый формат экспозиции Prometheus 0.0.4
+        lines = []
+        for name, type_, help_, collect in self._metrics:
+            lines.append(f'# HELP {name} {help_}')
+            lines.append(f'# TYPE {name} {type_}')
+            for labels, value in collect():
+                labels = labels or {}
+                if type_ == 'histogram':
+                    cumulative = 0
+                    for bound, n in zip(value.buckets + ('+Inf',), list(value.counts)):
+                        cumulative += n
+                        lines.append(f'{name}_bucket{_labels(dict(labels, le=bound))} {cumulative}')
+                    lines.append(f'{name}_sum{_labels(labels)} {value.sum}')
+                    lines.append(f'{name}_count{_labels(labels)} {value.count}')
+                elif type_ == 'summary':
+                    for q, v in zip((0.5, 0.99), value.percentiles((50, 99))):
+                        if v is not None:
+                            lines.append(f'{name}{_labels(dict(labels, quantile=q))} {v}')
+                    lines.append(f'{name}_count{_labels(labels)} {value.count}')
+                elif value is not None:
+                    lines.append(f'{name}{_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def as_json(self):
+        # {name: [{labels, value | p50/p99/count}]}; гистограммы — оценками перцентилей по корзинам
+        result = {}
+        for name, type_, _, collect in self._metrics:
+            entries = result.setdefault(name, [])
+            for labels, value in collect():
+                entry = {'labels': labels or {}}
+                if type_ == 'histogram':
+                    entry.update(p50=value.quantile(0.5), p99=value.quantile(0.99), count=value.count, sum=value.sum)
+                elif type_ == 'summary':
+                    p50, p99 = value.percentiles((50, 99))
+                    entry.update(p50=p50, p99=p99, count=value.count)
+                else:
+                    entry['value'] = value
+                entries.append(entry)
+        return result
+
+
+class MetricsServer:
+    # Локальная точка для Prometheus (/metrics) и JSON (/metrics.json) в фоновом потоке
+
+    def __init__(self, registry, port, host='127.0.0.1'):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # только если точка включена
+        self.registry = registry
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, ctype = registry_ref.prometheus().encode(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, ctype = json.dumps(registry_ref.as_json()).encode(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', ctype)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='metrics', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,131 @@
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+from ticker_store import BOOK_FIELDS
+
+# Стаканы Bybit v5 (orderbook.{depth}.{symbol}): снапшот после подписки, затем delta с номером u,
+# который растёт на 1. Пропущенный номер — стакан разошёлся с биржей: он сбрасывается,
+# delta до свежего снапшота отбрасываются, а снапшот запрашивается переподпиской на тему.
+# Верх стакана (лучшие цены, спред, дисбаланс) считается не на каждое сообщение, а раз в публикацию
+# движка и только по символам, чьи стаканы изменились: orderbook.50 идёт в десятки раз чаще тикеров
+BOOK_DEPTHS = (1, 50)
+IMBALANCE_LEVELS = 5  # уровней каждой стороны в дисбалансе
+
+
+class OrderBook:
+    # Стакан одного символа: на сторону два array('d') — ключи уровней по возрастанию и объёмы.
+    # Ключ бида — цена со знаком минус, поэтому у обеих сторон лучший уровень первый, а поиск — bisect
+    __slots__ = ('bid_keys', 'bid_sizes', 'ask_keys', 'ask_sizes', 'u')
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self, u=0):
+        # u: 0 — снапшота ещё не было, -1 — сброшен после разрыва последовательности
+        self.bid_keys = array('d')
+        self.bid_sizes = array('d')
+        self.ask_keys = array('d')
+        self.ask_sizes = array('d')
+        self.u = u
+
+    @property
+    def synced(self):
+        return self.u > 0
+
+    def apply(self, bids, asks, depth):
+        _apply_side(self.bid_keys, self.bid_sizes, bids, -1.0, depth)
+        _apply_side(self.ask_keys, self.ask_sizes, asks, 1.0, depth)
+
+    def top(self, levels=IMBALANCE_LEVELS):
+        # -> (bid, ask, спред, дисбаланс) в порядке BOOK_FIELDS; NaN, где стороны нет
+        nan = float('nan')
+        if not self.bid_keys or not self.ask_keys:
+            bid = -self.bid_keys[0] if self.bid_keys else nan
+            ask = self.ask_keys[0] if self.ask_keys else nan
+            return bid, ask, nan, nan
+        bid, ask = -self.bid_keys[0], self.ask_keys[0]
+        bid_size, ask_size = sum(self.bid_sizes[:levels]), sum(self.ask_sizes[:levels])
+        return bid, ask, 2 * (ask - bid) / (ask + bid), (bid_size - ask_size) / (bid_size + ask_size)
+
+
+def _apply_side(keys, sizes, levels, sign, depth):
+    # Уровни [цена, объём] строками; объём 0 — уровень удалён. Глубже depth уровни не держим
+    for price, size in levels:
+        key = sign * float(price)
+        size = float(size)
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            if size:
+                sizes[i] = size
+            else:
+                del keys[i]
+                del sizes[i]
+        elif size and i < depth:
+            keys.insert(i, key)
+            sizes.insert(i, size)
+            if len(keys) > depth:
+                keys.pop()
+                sizes.pop()
+
+
+class BookEngine:
+    # Стаканы одной категории поверх DiffTracker хранилища: handle() на каждое сообщение в цикле приёма,
+    # flush() раз в публикацию пишет верх изменившихся стаканов в поля хранилища
+
+    def __init__(self, tracker, depth, on_gap=None):
+        self.tracker = tracker
+        self.depth = depth
+        self.on_gap = on_gap  # symbol -> None: нужен свежий снапшот
+        self.books = {}
+        self.dirty = set()
+        self.messages = 0
+        self.gaps = 0
+        self.resyncs = 0  # снапшотов, пришедших после разрыва
+
+    def handle(self, values, snapshot):
+        # values — (symbol, биды, аски, u) от декодера; snapshot — type == 'snapshot'
+        symbol, bids, asks, u = values
+        book = self.books.get(symbol)
+        if book is None:
+            if symbol not in self.tracker.store:
+                return
+            book = self.books[symbol] = OrderBook()
+        self.messages += 1
+        if snapshot or u == 1:
+            # u == 1 в delta — сервис биржи перезапущен, сообщение несёт стакан целиком
+            if book.u < 0:
+                self.resyncs += 1
+            book.clear(u)
+            book.apply(bids, asks, self.depth)
+        elif not book.synced:
+            return
+        elif u != book.u + 1:
+            self.gaps += 1
+            book.clear(-1)
+            if self.on_gap is not None:
+                self.on_gap(symbol)
+        else:
+            book.apply(bids, asks, self.depth)
+            book.u = u
+        self.dirty.add(symbol)
+
+    def reset(self, symbols):
+        # Соединение оборвалось: стаканы пустые до снапшота после переподключения
+        for symbol in symbols:
+            book = self.books.get(symbol)
+            if book is not None:
+                book.clear()
+                self.dirty.add(symbol)
+
+    def flush(self):
+        if not self.dirty:
+            return
+        row_of = self.tracker.store.row_of
+        symbols = [s for s in self.dirty if s in row_of]
+        self.dirty = set()
+        rows = np.fromiter((row_of[s] for s in symbols), dtype=np.int64, count=len(symbols))
+        tops = np.array([self.books[s].top() for s in symbols], dtype=np.float64).reshape(-1, len(BOOK_FIELDS))
+        for i, field in enumerate(BOOK_FIELDS):
+            self.tracker.set_column(field, rows, tops[:, i])
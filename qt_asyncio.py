@@ -0,0 +1,104 @@
+import asyncio
+import math
+import selectors
+
+from PyQt5.QtCore import QObject, QSocketNotifier, QTimer
+
+# Следующая итерация выбирается по внутренним очередям цикла (_ready, _scheduled), которые есть
+# у asyncio.BaseEventLoop в CPython 3.7–3.13. Если их нет (другая версия или реализация) —
+# мост не ломается, а опрашивает цикл с этим шагом, мс
+POLL_FALLBACK_MS = 10
+
+
+class _NotifyingSelector(selectors.DefaultSelector):
+    # Селектор asyncio, который сообщает мосту о каждом зарегистрированном сокете
+
+    def __init__(self, bridge):
+        super().__init__()
+        self._bridge = bridge
+
+    def register(self, fileobj, events, data=None):
+        key = super().register(fileobj, events, data)
+        self._bridge._watch(key.fd, events)
+        return key
+
+    def unregister(self, fileobj):
+        key = super().unregister(fileobj)
+        self._bridge._unwatch(key.fd)
+        return key
+
+    def modify(self, fileobj, events, data=None):
+        key = super().modify(fileobj, events, data)
+        self._bridge._watch(key.fd, events)
+        return key
+
+
+class QtAsyncioBridge(QObject):
+    # Цикл asyncio, встроенный в цикл событий Qt: готовность сокетов приходит через
+    # QSocketNotifier, таймеры asyncio — через один QTimer. Итерация asyncio выполняется
+    # сразу, как только сокет стал читаемым, без опроса по таймеру.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._notifiers = {}  # fd -> {событие selectors: QSocketNotifier}
+        self.loop = asyncio.SelectorEventLoop(_NotifyingSelector(self))
+        asyncio.set_event_loop(self.loop)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._pump)
+        self._schedule()
+
+    def create_task(self, coro):
+        task = self.loop.create_task(coro)
+        self._schedule()
+        return task
+
+    def _watch(self, fd, events):
+        notifiers = self._notifiers.setdefault(fd, {})
+        for event, kind in ((selectors.EVENT_READ, QSocketNotifier.Read), (selectors.EVENT_WRITE, QSocketNotifier.Write)):
+            notifier = notifiers.get(event)
+            if events & event:
+                if notifier is None:
+                    notifier = QSocketNotifier(fd, kind, self)
+                    notifier.activated.connect(self._pump)
+                    notifiers[event] = notifier
+                notifier.setEnabled(True)
+            elif notifier is not None:
+                notifier.setEnabled(False)
+
+    def _unwatch(self, fd):
+        for notifier in self._notifiers.pop(fd, {}).values():
+            notifier.setEnabled(False)
+            notifier.deleteLater()
+
+    def _pump(self, *args):
+        # Одна итерация asyncio: select с нулевым таймаутом и готовые колбэки
+        if self.loop.is_running() or self.loop.is_closed():
+            return
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+        self._schedule()
+
+    def _schedule(self):
+        # Следующая итерация: сразу, если есть готовые колбэки, иначе к ближайшему таймеру asyncio
+        if self.loop.is_closed():
+            return
+        ready = getattr(self.loop, '_ready', None)
+        scheduled = getattr(self.loop, '_scheduled', None)
+        if ready is None or scheduled is None:
+            timeout = POLL_FALLBACK_MS
+        elif ready:
+            timeout = 0
+        elif scheduled:
+            timeout = max(0, math.ceil((scheduled[0].when() - self.loop.time()) * 1000))
+        else:
+            self._timer.stop()
+            return
+        self._timer.start(timeout)
+
+    def close(self):
+        self._timer.stop()
+        for fd in list(self._notifiers):
+            self._unwatch(fd)
+        if not self.loop.is_closed():
+            self.loop.close()
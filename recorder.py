@@ -0,0 +1,226 @@
+# Запись сырых кадров WebSocket с временем приёма и их воспроизведение без сети.
+# Формат: MAGIC, затем блоки (длина сжатого блока uint32, записей uint32, zlib-данные).
+# Запись в блоке: время приёма (мкс, int64), канал (uint8), длина (uint32), байты кадра.
+# Канал META — JSON со списком инструментов: без него воспроизведённые кадры некуда записать.
+# Файл только дописывается; оборванный при падении последний блок при чтении отбрасывается,
+# а при дозаписи обрезается: новые блоки встают сразу за последним целым.
+# Паузы между записями длиннее REPLAY_MAX_GAP (перерыв между сеансами в одном файле) воспроизводятся укороченными.
+#   python recorder.py info session.wsrec
+import argparse
+import asyncio
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b'WSREC1\0\0'
+_CHUNK = struct.Struct('<II')
+_RECORD = struct.Struct('<qBI')
+CHANNELS = ('spot', 'linear')
+CHANNEL_OF = {name: i for i, name in enumerate(CHANNELS)}
+META = 255
+
+# Блок уходит писателю, когда набралось столько байт кадров или прошло столько секунд
+CHUNK_BYTES = 1 << 20
+CHUNK_INTERVAL = 1.0
+COMPRESS_LEVEL = 1  # быстрее всего; кадры тикеров и так сжимаются в 5-10 раз
+REPLAY_MAX_GAP = 5.0  # с; дольше кадров не бывает только между сеансами записи
+
+
+class FrameRecorder:
+    # record() вызывается в цикле приёма и только добавляет кортеж в список;
+    # упаковка, сжатие и запись блока — в отдельном потоке
+
+    def __init__(self, path, chunk_bytes=CHUNK_BYTES, chunk_interval=CHUNK_INTERVAL):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+        self.chunk_interval_us = int(chunk_interval * 1e6)
+        self.frames = 0
+        self.written = 0  # байт на диске, включая заголовок
+        self._buf = []
+        self._size = 0
+        self._flush_at = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path):
+            # Дозапись: заголовок проверяется (ValueError — не запись кадров), хвост после последнего
+            # целого блока обрезается, иначе всё дописанное за оборванным блоком не прочиталось бы
+            end = valid_length(path)
+            self._file = open(path, 'r+b')
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(MAGIC)
+        self.written = self._file.tell()
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._writer, name='recorder', daemon=True)
+        self._thread.start()
+
+    def record(self, category, raw):
+        now = time.time_ns() // 1000
+        self._buf.append((now, CHANNEL_OF[category], raw))
+        self.frames += 1
+        self._size += len(raw)
+        if self._size >= self.chunk_bytes or now >= self._flush_at:
+            self.flush(now)
+
+    def meta(self, info):
+        self._buf.append((time.time_ns() // 1000, META, json.dumps(info)))
+        self.flush()
+
+    def flush(self, now=None):
+        if self._buf:
+            self._queue.put(self._buf)
+            self._buf = []
+            self._size = 0
+        self._flush_at = (now or time.time_ns() // 1000) + self.chunk_interval_us
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+    def _writer(self):
+        while True:
+            records = self._queue.get()
+            if records is None:
+                return
+            parts = []
+            for recv_us, channel, raw in records:
+                if isinstance(raw, str):
+                    raw = raw.encode()
+                parts.append(_RECORD.pack(recv_us, channel, len(raw)))
+                parts.append(raw)
+            data = zlib.compress(b''.join(parts), COMPRESS_LEVEL)
+            self._file.write(_CHUNK.pack(len(data), len(records)) + data)
+            self._file.flush()
+            self.written += _CHUNK.size + len(data)
+
+
+def _open_recording(path):
+    f = open(path, 'rb')
+    if f.read(len(MAGIC)) != MAGIC:
+        f.close()
+        raise ValueError(f"{path}: не запись кадров")
+    return f
+
+
+def _chunks(f):
+    # -> (распакованные записи блока, их число); на оборванном или битом блоке чтение кончается
+    while True:
+        header = f.read(_CHUNK.size)
+        if len(header) < _CHUNK.size:
+            return
+        length, count = _CHUNK.unpack(header)
+        data = f.read(length)
+        if len(data) < length:
+            return
+        try:
+            data = zlib.decompress(data)
+        except zlib.error:
+            return
+        yield data, count
+
+
+def valid_length(path):
+    # Байт от начала файла до конца последнего целого блока
+    with _open_recording(path) as f:
+        end = f.tell()
+        for _ in _chunks(f):
+            end = f.tell()
+        return end
+
+
+def read_chunks(path):
+    # -> блоки записей [(мкс приёма, канал, bytes)] по порядку
+    with _open_recording(path) as f:
+        for data, count in _chunks(f):
+            records = []
+            offset = 0
+            for _ in range(count):
+                recv_us, channel, size = _RECORD.unpack_from(data, offset)
+                offset += _RECORD.size
+                records.append((recv_us, channel, data[offset:offset + size]))
+                offset += size
+            yield records
+
+
+class FrameReplay:
+    # Источник кадров для IngestEngine вместо сети. speed: 1 — в темпе записи,
+    # N — в N раз быстрее, 0 или None — без пауз (между блоками цикл asyncio всё же получает управление)
+
+    def __init__(self, path, speed=1.0):
+        # Файл проверяется сразу (OSError — не открывается, ValueError — не запись кадров),
+        # чтобы ошибка в аргументах была видна при запуске, а не в задаче движка
+        _open_recording(path).close()
+        self.path = path
+        self.speed = speed or 0
+        self.frames = 0
+        self.elapsed = 0.0  # длительность последнего воспроизведения, с
+
+    async def frames_paced(self):
+        # -> (category или None для META, bytes) с паузами по времени приёма
+        started = time.monotonic()
+        first = prev = None
+        skipped = 0  # мкс, вырезанные из пауз между сеансами (и из скачков часов назад)
+        max_gap = int(REPLAY_MAX_GAP * 1e6)
+        for records in read_chunks(self.path):
+            for recv_us, channel, payload in records:
+                if first is None:
+                    first = prev = recv_us
+                gap = recv_us - prev
+                if not 0 <= gap <= max_gap:
+                    skipped += gap - min(max(gap, 0), max_gap)
+                prev = recv_us
+                if self.speed:
+                    delay = started + (recv_us - first - skipped) / 1e6 / self.speed - time.monotonic()
+                    if delay > 0.001:
+                        await asyncio.sleep(delay)
+                self.frames += channel != META
+                yield (None if channel == META else CHANNELS[channel]), payload
+            if not self.speed:
+                await asyncio.sleep(0)
+        self.elapsed = time.monotonic() - started
+
+
+def describe(path):
+    frames = {name: 0 for name in CHANNELS}
+    raw_bytes = 0
+    first = last = None
+    chunks = 0
+    for records in read_chunks(path):
+        chunks += 1
+        for recv_us, channel, payload in records:
+            first = recv_us if first is None else first
+            last = recv_us
+            if channel != META:
+                frames[CHANNELS[channel]] += 1
+                raw_bytes += len(payload)
+    size = os.path.getsize(path)
+    duration = (last - first) / 1e6 if first is not None else 0.0
+    return {'frames': frames, 'chunks': chunks, 'duration_s': duration, 'raw_bytes': raw_bytes, 'file_bytes': size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Записи сырых кадров WebSocket')
+    parser.add_argument('command', choices=('info',))
+    parser.add_argument('path')
+    args = parser.parse_args()
+    info = describe(args.path)
+    total = sum(info['frames'].values())
+    print(f"кадров: {total} ({', '.join(f'{k} {v}' for k, v in info['frames'].items())}), блоков: {info['chunks']}")
+    print(f"длительность: {info['duration_s']:.1f} с, {total / max(info['duration_s'], 1e-9):.0f} кадров/с")
+    ratio = info['raw_bytes'] / max(info['file_bytes'], 1)
+    print(f"кадры {info['raw_bytes'] / 1e6:.1f} МБ, файл {info['file_bytes'] / 1e6:.1f} МБ (сжатие {ratio:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,552 @@
+# Ядро скринера без GUI: хранилища на стороне потребителя, применение пакетов движка,
+# базис пар, устаревание строк, часы биржи и уведомления о фандинге.
+# Окно PyQt (ws_screener_gui.py) работает поверх него; без GUI — вывод top-N в консоль или файл.
+# Запуск: python screener_core.py [--view fut] [--sort price24hPcnt] [--top 20] [--interval 5] [--format table|csv|jsonl] [--count 0]
+#         [--filter "turnover24h > 10M and abs(price24hPcnt) > 5%"]
+#         [--record session.wsrec | --replay session.wsrec --speed 10]
+#         [--shm [NAME]]  — читать рынок из market_daemon.py вместо своих подключений
+#         [--book 1|50] [--trades]  — стакан и лента сделок: спред, дисбаланс, сделки и поток за минуту
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from alerts import Alert, AlertEngine, AlertDispatcher, WebhookSink, ALERTS_PATH, load_alert_config
+from filters import RowFilter, FilterError
+from funding import ExchangeClock, FundingScheduler
+from history import TickerHistory, HISTORY_COLUMNS, HISTORY_BUDGET_MB
+from ingest import IngestEngine
+from metrics import Histogram, LatencyStats, MetricsServer, METRICS_SAMPLE, MS_BUCKETS, now_ms
+from orderbook import BOOK_DEPTHS
+from recorder import FrameRecorder, FrameReplay
+from shared_state import SharedStateClient, SharedStateError, SHM_NAME
+from ticker_store import (
+    TickerStore, JoinedStores, PairLink, apply_diff,
+    SPOT_FIELDS, FUT_FIELDS, FUNDING_INFO, FUNDING_LEFT, BASIS, STALE_AFTER_MS, PRICE_FIELDS,
+    SPREAD, IMBALANCE, FLOW_1M,
+)
+
+# За сколько до фандинга показывать уведомление
+FUNDING_ALERT_MS = 300 * 1000
+
+# Частота обновления таблиц (RefreshScheduler): активная вкладка — до 10 Гц, пока стоимость кадра
+# укладывается в долю времени потока GUI; фоновые вкладки и производные колонки — раз в секунду
+REFRESH_MIN_INTERVAL = 0.1
+REFRESH_MAX_INTERVAL = 1.0
+REFRESH_BUDGET = 0.25
+REFRESH_SMOOTHING = 0.2  # вес нового кадра при снижении оценки стоимости; рост учитывается сразу
+DERIVED_INTERVAL = 1.0
+
+COLUMN_KEYS_ALL = [
+    'symbol', 'type', 'lastPrice', 'price24hPcnt', 'volume24h', 'turnover24h', 'markPrice', 'indexPrice', 'openInterestValue', 'funding_info', 'basis',
+    'change_1m', 'change_5m', 'change_15m', 'volatility_15m', 'oi_change_15m',
+    'spread', 'book_imbalance', 'trades_1m', 'flow_1m'
+]
+COLUMN_KEYS_SPOT = [
+    'symbol', 'lastPrice', 'price24hPcnt', 'volume24h', 'turnover24h', 'funding_info',
+    'change_1m', 'change_5m', 'change_15m', 'volatility_15m',
+    'spread', 'book_imbalance', 'trades_1m', 'flow_1m'
+]
+COLUMN_KEYS_FUT = [
+    'symbol', 'lastPrice', 'price24hPcnt', 'volume24h', 'turnover24h', 'markPrice', 'indexPrice', 'openInterestValue', 'funding_info', 'basis',
+    'change_1m', 'change_5m', 'change_15m', 'volatility_15m', 'oi_change_15m',
+    'spread', 'book_imbalance', 'trades_1m', 'flow_1m'
+]
+
+def format_ts(ts):
+    return datetime.utcfromtimestamp(ts / 1000).strftime('%H:%M:%S') if ts else ''
+
+def format_percent(val):
+    try:
+        return f"{float(val) * 100:.2f}%"
+    except Exception:
+        return val
+
+def format_money(val):
+    try:
+        return f"{float(val):,.2f}".replace(",", " ")
+    except Exception:
+        return val
+
+def format_price(val, decimals=None):
+    # decimals — по tickSize инструмента; без него прежнее правило
+    if decimals is not None:
+        return f"{val:.{decimals}f}"
+    return f"{val:.6f}" if val < 100 else f"{val:.2f}"
+
+def format_number(val):
+    return f"{val:f}".rstrip('0').rstrip('.')
+
+def format_countdown(ms):
+    seconds = int(ms) // 1000
+    return f"{seconds // 3600:02}:{seconds % 3600 // 60:02}:{seconds % 60:02}"
+
+def format_symbols(symbols, limit=3):
+    names = ', '.join(symbols[:limit])
+    if len(symbols) > limit:
+        names += f" и ещё {len(symbols) - limit}"
+    return names
+
+def format_alert(alert):
+    return f"{alert.title}: {format_symbols(alert.symbols)}"
+
+def log_alerts(alerts):
+    # Приёмник уведомлений «журнал»: строка на событие в stderr
+    for alert in alerts:
+        print(f"[{format_ts(alert.ts)}] {format_alert(alert)}", file=sys.stderr)
+
+
+def format_cell(key, value, decimals=None):
+    # Форматирование типизированного значения ячейки только для отображения
+    if value is None:
+        return ''
+    if key == FUNDING_INFO:
+        rate, left = value
+        if rate is None and left is None:
+            return ''
+        rate_str = '' if rate is None else f"{rate * 100:.4f}%"
+        time_str = '' if left is None else format_countdown(left)
+        return f"{rate_str} / {time_str}"
+    if isinstance(value, str):
+        return value
+    if key == SPREAD:
+        return f"{value * 100:.3f}%"  # у ликвидных пар спред — тысячные доли процента
+    if key in ('price24hPcnt', BASIS, IMBALANCE) or key in HISTORY_COLUMNS:
+        return format_percent(value)
+    if key in ('turnover24h', 'openInterestValue', FLOW_1M):
+        return format_money(value)
+    if key in PRICE_FIELDS:
+        return format_price(value, decimals)
+    return format_number(value)
+
+
+def sort_value(source, symbol, key):
+    # Число, по которому сортируется колонка (как в source.column); None — пусто
+    value = source.value(symbol, key)
+    if key == FUNDING_INFO:
+        return value[0]
+    return value
+
+
+def sorted_keys(source, key, descending=True):
+    # Ключи источника, упорядоченные по колонке; пустые ячейки всегда в конце
+    keys = source.keys()
+    column = source.column(key)
+    if column is None:
+        return sorted(keys, key=lambda symbol: source.value(symbol, key) or '', reverse=descending)
+    values, valid = column
+    values = np.where(valid, values, -np.inf if descending else np.inf)
+    order_idx = np.argsort(-values if descending else values, kind='stable')
+    return [keys[i] for i in order_idx]
+
+
+class ScreenerCore:
+    # Потребитель IngestEngine: раз в кадр забирает пакеты изменений в свои хранилища и копит
+    # грязные ячейки (symbol -> set(keys) или '*'), раз в секунду обновляет производные колонки.
+    # Ничего не знает об отображении: GUI и headless-режим читают хранилища и забирают грязное сами
+
+    def __init__(self, engine=None, history_mb=HISTORY_BUDGET_MB):
+        self.engine = engine if engine is not None else IngestEngine()
+        self.history_mb = history_mb
+        self.init_stores()
+        # Метрики потребителя — в общем реестре движка
+        self.batches_applied = 0
+        self.conflated = 0        # сообщений, слитых движком с другими по той же строке (нижняя оценка)
+        self.last_queue_depth = 0  # пакетов, забранных последним apply_batches
+        self.frame_conflated = 0  # обновлений символа, слитых с уже ждущим кадра (последнее значение побеждает)
+        self.receive_latency = LatencyStats()  # приём кадра -> передача в таблицы, мс
+        self._delivered_at = 0
+        self._messages_mark = (time.monotonic(), 0)
+        m = self.engine.metrics
+        m.counter('screener_batches_applied_total', 'Пакетов, применённых потребителем', lambda: self.batches_applied)
+        m.counter('screener_conflated_updates_total', 'Обновлений, слитых в пакете с другими по той же строке', lambda: self.conflated)
+        m.gauge('screener_batches_per_apply', 'Пакетов в очереди на последнем применении', lambda: self.last_queue_depth)
+        m.counter('screener_frame_conflated_total', 'Обновлений символа, слитых до следующего кадра таблиц', lambda: self.frame_conflated)
+        m.summary('screener_receive_to_screen_ms', 'Приём кадра -> передача в таблицы, мс', self.receive_latency)
+        m.gauge('alerts_rules', 'Правил уведомлений', lambda: len(self.alerts.rules))
+        m.counter('alerts_fired_total', 'Срабатываний правил уведомлений', lambda: self.alerts.fired)
+        m.counter('alerts_checks_total', 'Проверок правило x символ', lambda: self.alerts.evaluated)
+        m.histogram('alerts_eval_us', 'Проверка правил за тик, мкс', self.alerts.eval_us)
+
+    def init_stores(self):
+        self.data_spot = TickerStore(SPOT_FIELDS, 'spot')
+        self.data_fut = TickerStore(FUT_FIELDS, 'futures')
+        # Вкладка 'Все' читает оба хранилища напрямую, без объединённой копии
+        self.all_view = JoinedStores(((self.data_spot, '_spot'), (self.data_fut, '_fut')))
+        self.pairs = PairLink(self.data_spot, self.data_fut)
+        # Кольцевые буферы истории; у фьючерсов два поля (цена и OI) против одного у спота
+        budget = self.history_mb * 1e6
+        self.history = (TickerHistory(self.data_spot, int(budget / 3)), TickerHistory(self.data_fut, int(budget * 2 / 3)))
+        self.dirty_spot = {}  # symbol -> set(keys), изменившиеся с прошлого обновления таблиц
+        self.dirty_fut = {}
+        self.stale_masks = {}  # type_label -> маска устаревших строк на прошлом обновлении
+        self.source_lost = False  # источник (демон разделяемой памяти) завершился
+        self.last_broker_ts = None
+        # Часы биржи для отсчёта до фандинга и планировщик уведомлений о нём
+        self.clock = ExchangeClock()
+        self.funding = FundingScheduler(FUNDING_ALERT_MS)
+        # Правила уведомлений проверяются по грязным ячейкам, доставку подключает GUI или headless-режим
+        self.alerts = AlertEngine({'spot': self.data_spot, 'fut': self.data_fut})
+
+    def view(self, name):
+        # 'all' | 'spot' | 'fut' -> (источник строк, ключи колонок)
+        if name == 'spot':
+            return self.data_spot, COLUMN_KEYS_SPOT
+        if name == 'fut':
+            return self.data_fut, COLUMN_KEYS_FUT
+        return self.all_view, COLUMN_KEYS_ALL
+
+    def apply_batches(self):
+        # Применяем слитые движком пакеты: векторная запись в хранилища и пометка грязных ячеек.
+        # True, если что-то пришло
+        batches = self.engine.take_batches()
+        self.last_queue_depth = len(batches)
+        if not batches:
+            return False
+        for batch in batches:
+            self.batches_applied += 1
+            self.conflated += max(0, batch.updates - len(batch.spot.ts_rows) - len(batch.fut.ts_rows))
+            self._mark_dirty(self.dirty_spot, apply_diff(self.data_spot, batch.spot))
+            changed = apply_diff(self.data_fut, batch.fut)
+            for keys in changed.values():
+                if 'fundingRate' in keys:
+                    keys.add(FUNDING_INFO)
+            self._mark_dirty(self.dirty_fut, changed)
+            # Новое время фандинга переносит символ в другую группу планировщика уведомлений
+            if 'nextFundingTime' in batch.fut.fields:
+                symbols = self.data_fut.symbols
+                rows, values = batch.fut.fields['nextFundingTime']
+                for row, value in zip(rows.tolist(), values.tolist()):
+                    if value == value:
+                        self.funding.set(symbols[row], value)
+                    else:
+                        self.funding.remove(symbols[row])
+        self.last_broker_ts = batches[-1].last_broker_ts
+        self.clock.sync(self.last_broker_ts)
+        return True
+
+    def _mark_dirty(self, dirty, changed):
+        # Значения уже в хранилище; символ, ждущий кадра, лишь пополняет набор грязных ячеек
+        for symbol, keys in changed.items():
+            cells = dirty.get(symbol)
+            if cells is None:
+                dirty[symbol] = keys
+            else:
+                self.frame_conflated += 1
+                cells.update(keys)
+
+    def has_dirty(self):
+        return bool(self.dirty_spot or self.dirty_fut)
+
+    def update_derived(self):
+        # Раз в секунду: время биржи для отсчёта, базис пар и устаревшие строки. -> время биржи или None
+        now = self.clock.now()
+        for store in (self.data_spot, self.data_fut):
+            store.funding_now = now or 0
+        # Базис пар спот/фьючерс пересчитывается векторно по обоим хранилищам
+        for store, dirty, rows in zip((self.data_spot, self.data_fut), (self.dirty_spot, self.dirty_fut), self.pairs.update()):
+            symbols = store.symbols
+            for row in rows.tolist():
+                dirty.setdefault(symbols[row], set()).add(BASIS)
+        # Изменения за 1/5/15 минут, волатильность и OI — векторно по всем символам
+        for history, dirty in zip(self.history, (self.dirty_spot, self.dirty_fut)):
+            symbols = history.store.symbols
+            for field, rows in history.update(now).items():
+                for row in rows.tolist():
+                    dirty.setdefault(symbols[row], set()).add(field)
+        self.update_stale()
+        return now
+
+    def check_source(self):
+        # Клиент демона (SharedStateClient.closed()): после завершения демона все строки серые сразу,
+        # не через STALE_AFTER_MS. -> True, если источник больше не обновляется
+        closed = getattr(self.engine, 'closed', None)
+        if self.source_lost or closed is None or not closed():
+            return self.source_lost
+        self.source_lost = True
+        for store in (self.data_spot, self.data_fut):
+            store.mark_stale(store.keys())
+        return True
+
+    def update_stale(self):
+        # Строки, которые стали устаревшими или ожили, перерисовываются целиком (серый цвет)
+        cutoff = now_ms() - STALE_AFTER_MS
+        for store, dirty in ((self.data_spot, self.dirty_spot), (self.data_fut, self.dirty_fut)):
+            store.stale_cutoff = cutoff
+            mask = store.stale_mask()
+            prev = self.stale_masks.get(store.type_label)
+            if prev is None or len(prev) != len(mask):
+                changed = np.flatnonzero(mask)
+            else:
+                changed = np.flatnonzero(mask != prev)
+            for row in changed.tolist():
+                dirty[store.symbols[row]] = '*'
+            self.stale_masks[store.type_label] = mask.copy()
+
+    def observe_delivery(self, sample=256):
+        # Задержка приём -> таблицы по строкам, получившим кадры с прошлой передачи (до sample замеров)
+        now = now_ms()
+        for store in (self.data_spot, self.data_fut):
+            seen = store.seen[:len(store)]
+            fresh = seen[seen > self._delivered_at]
+            if len(fresh):
+                for value in (now - fresh[::max(1, len(fresh) // sample)]).tolist():
+                    self.receive_latency.add(value)
+        self._delivered_at = now
+
+    def message_rate(self):
+        # Кадров/с по всем соединениям с прошлого вызова
+        total = self.engine.messages()
+        now = time.monotonic()
+        mark_time, mark_total = self._messages_mark
+        self._messages_mark = (now, total)
+        return (total - mark_total) / (now - mark_time) if now > mark_time else 0.0
+
+    def take_dirty(self):
+        # -> (dirty_spot, dirty_fut) с прошлого вызова
+        dirty = self.dirty_spot, self.dirty_fut
+        self.dirty_spot = {}
+        self.dirty_fut = {}
+        return dirty
+
+    def due_funding(self, now):
+        # -> [(мс до фандинга, [symbol])]: группы, у которых наступило окно уведомления.
+        # Одна запись на группу: у сотен контрактов фандинг в одно и то же время
+        groups = {}
+        for symbol, left in self.funding.due(now):
+            groups.setdefault(left, []).append(symbol)
+        return list(groups.items())
+
+    def check_alerts(self, now):
+        # После update_derived и до take_dirty: проверяются правила полей, изменившихся с прошлого тика
+        if now is None:
+            return []
+        return self.alerts.evaluate({'spot': self.dirty_spot, 'fut': self.dirty_fut}, now)
+
+    def funding_alerts(self, now):
+        # Уведомления «скоро фандинг» планировщика в виде событий для доставки
+        return [Alert(f"до фандинга {format_countdown(left)}", symbols, ts=now) for left, symbols in self.due_funding(now)]
+
+    def top(self, view, key, n, descending=True, row_filter=None):
+        # row_filter — RowFilter, уже обновлённый по этому источнику
+        source, _ = self.view(view)
+        keys = sorted_keys(source, key, descending)
+        if row_filter is not None:
+            keys = row_filter.select(source, keys)
+        return keys[:n]
+
+
+class RefreshScheduler:
+    # Интервал кадров таблиц по стоимости кадра (обновление модели + отрисовка): interval = cost / budget
+    # в пределах [min_interval, max_interval]. Дорогой кадр сразу увеличивает интервал, дешёвые
+    # возвращают частоту постепенно. Кадр без изменений пропускается и в оценку не входит
+
+    def __init__(self, min_interval=REFRESH_MIN_INTERVAL, max_interval=REFRESH_MAX_INTERVAL, budget=REFRESH_BUDGET):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget = budget
+        self.interval = min_interval
+        self.cost = None  # оценка стоимости кадра, с
+        self.frames = 0
+        self.skipped = 0
+        self.frame_ms = Histogram(MS_BUCKETS)
+
+    def frame_done(self, cost):
+        self.frames += 1
+        self.frame_ms.observe(cost * 1000)
+        if self.cost is None or cost > self.cost:
+            self.cost = cost
+        else:
+            self.cost += REFRESH_SMOOTHING * (cost - self.cost)
+        self.interval = min(max(self.cost / self.budget, self.min_interval), self.max_interval)
+
+    def skip(self):
+        self.skipped += 1
+
+    def rate(self):
+        return 1 / self.interval
+
+    def register_metrics(self, metrics, prefix='gui_refresh'):
+        metrics.gauge(f'{prefix}_hz', 'Частота кадров таблиц, Гц', self.rate)
+        metrics.counter(f'{prefix}_frames_total', 'Кадров таблиц', lambda: self.frames)
+        metrics.counter(f'{prefix}_frames_skipped_total', 'Пропущенных кадров (нет изменений)', lambda: self.skipped)
+        metrics.histogram(f'{prefix}_frame_ms', 'Стоимость кадра: обновление модели и отрисовка, мс', self.frame_ms)
+
+
+def add_engine_args(parser, gui=False):
+    # Общие для GUI и headless-режима ключи источника данных; gui — ещё и где в окне идёт приём
+    if gui:
+        parser.add_argument('--ingest', choices=('thread', 'qt'), default='thread',
+                            help='приём в отдельном потоке или в цикле Qt (QtAsyncioBridge)')
+    parser.add_argument('--record', metavar='FILE', help='записывать сырые кадры WebSocket в файл')
+    parser.add_argument('--replay', metavar='FILE', help='воспроизвести запись вместо подключения к бирже')
+    parser.add_argument('--speed', type=float, default=1.0, help='скорость воспроизведения; 0 — максимальная')
+    parser.add_argument('--metrics-port', type=int, help='отдавать метрики на 127.0.0.1:PORT (/metrics, /metrics.json)')
+    parser.add_argument('--metrics-sample', type=int, default=METRICS_SAMPLE,
+                        help='замерять разбор у каждого N-го кадра; 0 — не замерять')
+    parser.add_argument('--history-mb', type=float, default=HISTORY_BUDGET_MB,
+                        help='память под историю цен и OI (колонки изменений за 1/5/15 минут), МБ')
+    parser.add_argument('--book', type=int, choices=BOOK_DEPTHS, help='подписаться на стакан orderbook.N: спред и дисбаланс')
+    parser.add_argument('--trades', action='store_true', help='подписаться на ленту сделок: сделок и поток покупок за минуту')
+    parser.add_argument('--shm', nargs='?', const=SHM_NAME, metavar='NAME',
+                        help='читать состояние рынка из разделяемой памяти демона market_daemon.py, без своих подключений')
+
+
+def make_engine(args, shared=True):
+    # С --shm — клиент сегмента демона (SharedStateError, если демона нет), иначе свой движок.
+    # ValueError с именем ключа, если файл --replay или --record не открывается или это не запись кадров
+    if shared and args.shm:
+        return SharedStateClient(args.shm)
+    try:
+        replay = FrameReplay(args.replay, args.speed) if args.replay else None
+    except (OSError, ValueError) as e:
+        raise ValueError(f"--replay: {e}") from None
+    try:
+        recorder = FrameRecorder(args.record) if args.record else None
+    except (OSError, ValueError) as e:
+        raise ValueError(f"--record: {e}") from None
+    return IngestEngine(
+        recorder=recorder,
+        replay=replay,
+        metrics_sample=args.metrics_sample,
+        book_depth=args.book,
+        trades=args.trades,
+    )
+
+
+def load_alerts(core, path, dispatcher):
+    # Правила из файла в ядро; из настроек доставки здесь подключается только webhook,
+    # окно, звук и журнал подключает тот, кто показывает. -> настройки доставки
+    rules, delivery = load_alert_config(path)
+    core.alerts.set_rules(rules)
+    if delivery.get('webhook'):
+        dispatcher.add('webhook', WebhookSink(delivery['webhook']), delivery.get('webhook_interval', 1.0))
+    return delivery
+
+
+def start_metrics_server(engine, args):
+    if args.metrics_port is None:
+        return None
+    return MetricsServer(engine.metrics, args.metrics_port).start()
+
+
+def export_row(source, symbol, keys):
+    # Значения строки для csv/jsonl: числа как есть, фандинг — двумя полями
+    row = {}
+    for key in keys:
+        value = source.value(symbol, key)
+        if key == FUNDING_INFO:
+            row['fundingRate'], row[FUNDING_LEFT] = value if value is not None else (None, None)
+        else:
+            row[key] = value
+    return row
+
+
+class TopWriter:
+    # Вывод top-N: выровненная таблица, CSV (один заголовок) или JSON по строке на снимок
+    def __init__(self, fmt, out=sys.stdout):
+        self.fmt = fmt
+        self.out = out
+        self._csv = None
+
+    def write(self, source, keys, symbols, now):
+        if self.fmt == 'jsonl':
+            rows = [export_row(source, symbol, keys) for symbol in symbols]
+            self.out.write(json.dumps({'ts': now, 'rows': rows}, ensure_ascii=False) + '\n')
+        elif self.fmt == 'csv':
+            rows = [export_row(source, symbol, keys) for symbol in symbols]
+            if self._csv is None and rows:
+                self._csv = csv.DictWriter(self.out, ['ts'] + list(rows[0]))
+                self._csv.writeheader()
+            for row in rows:
+                self._csv.writerow(dict(row, ts=now))
+        else:
+            table = [keys] + [
+                [format_cell(key, source.value(symbol, key), source.price_decimals(symbol)) for key in keys]
+                for symbol in symbols
+            ]
+            widths = [max(len(row[i]) for row in table) for i in range(len(keys))]
+            self.out.write(f"--- {format_ts(now)} ---\n")
+            for row in table:
+                self.out.write('  '.join(cell.ljust(w) if i < 2 else cell.rjust(w) for i, (cell, w) in enumerate(zip(row, widths))) + '\n')
+        self.out.flush()
+
+
+async def run_headless(core, args, writer, row_filter=None, dispatcher=None):
+    dispatcher = dispatcher or AlertDispatcher()
+    engine_task = asyncio.ensure_future(core.engine.run())
+    source, keys = core.view(args.view)
+    shown = 0
+    try:
+        while True:
+            # Воспроизведение записи может закончиться раньше интервала
+            await asyncio.wait({engine_task}, timeout=args.interval)
+            core.apply_batches()
+            now = core.update_derived()
+            dispatcher.submit(core.check_alerts(now))
+            core.take_dirty()  # без таблиц грязные ячейки не нужны
+            if now is not None:
+                dispatcher.submit(core.funding_alerts(now))
+            dispatcher.drain()
+            if row_filter is not None:
+                row_filter.update(source)  # раз в interval проще пересчитать целиком
+            writer.write(source, keys, core.top(args.view, args.sort, args.top, not args.asc, row_filter), now)
+            core.observe_delivery()
+            shown += 1
+            if engine_task.done() or args.count and shown >= args.count:
+                break
+    finally:
+        engine_task.cancel()
+        try:
+            await engine_task
+        except asyncio.CancelledError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Скринер Bybit без GUI: top-N тикеров раз в interval секунд')
+    parser.add_argument('--view', choices=('all', 'spot', 'fut'), default='fut')
+    parser.add_argument('--sort', default='price24hPcnt', help='ключ колонки сортировки')
+    parser.add_argument('--asc', action='store_true', help='по возрастанию')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=5.0)
+    parser.add_argument('--format', choices=('table', 'csv', 'jsonl'), default='table')
+    parser.add_argument('--count', type=int, default=0, help='сколько снимков вывести; 0 — без ограничения')
+    parser.add_argument('--filter', metavar='EXPR', help='показывать только строки, прошедшие фильтр (см. filters.py)')
+    parser.add_argument('--alerts', metavar='FILE', default=ALERTS_PATH, help='правила уведомлений (JSON, см. alerts.py)')
+    add_engine_args(parser)
+    args = parser.parse_args()
+    try:
+        row_filter = RowFilter(args.filter) if args.filter else None
+    except FilterError as e:
+        parser.error(f"--filter: {e}")
+    try:
+        engine = make_engine(args)
+    except SharedStateError as e:
+        parser.error(f"--shm: {e}")
+    except ValueError as e:
+        parser.error(str(e))
+    core = ScreenerCore(engine, args.history_mb)
+    start_metrics_server(core.engine, args)
+    if args.sort not in core.view(args.view)[1]:
+        parser.error(f"нет колонки {args.sort!r}; доступны: {', '.join(core.view(args.view)[1])}")
+    dispatcher = AlertDispatcher()
+    # Без GUI уведомления уходят в журнал (stderr) и на webhook, если он задан в файле правил
+    dispatcher.add('log', log_alerts)
+    try:
+        load_alerts(core, args.alerts, dispatcher)
+    except ValueError as e:
+        parser.error(f"--alerts: {e}")
+    try:
+        asyncio.run(run_headless(core, args, TopWriter(args.format), row_filter, dispatcher))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
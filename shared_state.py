@@ -0,0 +1,343 @@
+import asyncio
+import atexit
+import os
+import time
+import zlib
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ingest import TickerBatch, PUBLISH_INTERVAL
+from metrics import Histogram, LatencyStats, MetricsRegistry, now_ms
+from ticker_store import StoreDiff, SPOT_FIELDS, FUT_FIELDS
+
+# Общее состояние рынка в разделяемой памяти: один процесс-демон (market_daemon.py) держит подключения
+# и пишет тикеры в колоночный сегмент multiprocessing.shared_memory, клиенты (GUI, screener_core.py)
+# только читают его, без своих REST-запросов и WebSocket.
+# Согласованность — seqlock: писатель делает счётчик SEQ нечётным на время записи пакета и чётным после;
+# читатель повторяет чтение, если счётчик был нечётным или изменился, пока он читал.
+# У каждой ячейки — номер записи (rev), поэтому клиент забирает только изменившееся с прошлого чтения.
+SHM_NAME = 'ws_screener'
+SHM_ROWS = 8192              # строк на хранилище; сегмент фиксированного размера, лишние символы не пишутся
+SYMBOL_BYTES = 32
+LAYOUT_VERSION = 1
+DAEMON_TIMEOUT_MS = 5000     # без отметки демона дольше этого сегмент считается брошенным
+SEQLOCK_RETRIES = 8
+
+MAGIC = 0x5753534852454431   # 'WSSHRED1'
+# Заголовок — int64 по номерам
+H_MAGIC, H_LAYOUT, H_SEQ, H_ROWS, H_N_SPOT, H_N_FUT, H_BROKER_TS, H_HEARTBEAT = range(8)
+H_PID, H_CLOSED, H_MESSAGES, H_UPDATES, H_POPULATED, H_POPULATED_MS = range(8, 14)
+HEADER_SLOTS = 32
+
+
+class SharedStateError(RuntimeError):
+    pass
+
+
+def layout_crc():
+    # Клиент и демон должны одинаково понимать раскладку: версия и списки полей
+    return zlib.crc32(f"{LAYOUT_VERSION}|{','.join(SPOT_FIELDS)}|{','.join(FUT_FIELDS)}".encode())
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class SharedPart:
+    # Колонки одного хранилища в сегменте: values NaN — значения нет; rev — номер записи по ячейке,
+    # row_rev — по ts/seen строки, dec_rev — по точности цены (decimals, -1 — неизвестна)
+
+    def __init__(self, buf, offset, fields, rows):
+        self.fields = fields
+        self.n = 0  # строк, уже известных этой стороне
+        self.symbols = []
+        arrays = (
+            ('values', np.float64, (len(fields), rows)), ('rev', np.int64, (len(fields), rows)),
+            ('ts', np.int64, rows), ('seen', np.int64, rows), ('row_rev', np.int64, rows),
+            ('dec_rev', np.int64, rows), ('decimals', np.int8, rows), ('names', f'S{SYMBOL_BYTES}', rows),
+        )
+        for name, dtype, shape in arrays:
+            array = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+            setattr(self, name, array)
+            offset = _align(offset + array.nbytes)
+        self.end = offset
+
+    @staticmethod
+    def size(fields, rows):
+        return (8 * 2 * len(fields) + 8 * 4 + 1 + SYMBOL_BYTES) * rows + 8 * 4
+
+
+def segment_size(rows):
+    return 8 * HEADER_SLOTS + SharedPart.size(SPOT_FIELDS, rows) + SharedPart.size(FUT_FIELDS, rows)
+
+
+def map_segment(buf, rows):
+    # -> (заголовок, (спот, фьючерсы)) поверх буфера сегмента
+    header = np.ndarray(HEADER_SLOTS, dtype=np.int64, buffer=buf)
+    spot = SharedPart(buf, 8 * HEADER_SLOTS, SPOT_FIELDS, rows)
+    fut = SharedPart(buf, spot.end, FUT_FIELDS, rows)
+    return header, (spot, fut)
+
+
+def attach(name):
+    # Подключение к существующему сегменту без учёта в resource_tracker: до Python 3.13 трекер
+    # процесса-клиента удалил бы чужой сегмент при выходе
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except (ImportError, AttributeError, KeyError):
+        pass
+    return shm
+
+
+class SharedStateWriter:
+    # Сторона демона: применяет пакеты IngestEngine к сегменту под seqlock (один писатель)
+
+    def __init__(self, name=SHM_NAME, rows=SHM_ROWS):
+        self.name = name
+        self.rows = rows
+        self.shm = self._create(name, segment_size(rows))
+        self.header, self.parts = map_segment(self.shm.buf, rows)
+        self.row_of = tuple({} for _ in self.parts)
+        h = self.header
+        h[:] = 0
+        for part in self.parts:
+            part.decimals[:] = -1
+        h[H_LAYOUT], h[H_ROWS], h[H_PID], h[H_POPULATED_MS] = layout_crc(), rows, os.getpid(), -1
+        h[H_HEARTBEAT] = int(now_ms())
+        h[H_MAGIC] = MAGIC  # последним: до него клиенты сегмент не принимают
+        self.publishes = 0
+        self.dropped = 0  # символов, не поместившихся в сегмент
+        self.write_us = Histogram()
+
+    @staticmethod
+    def _create(name, size):
+        try:
+            return shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            pass
+        # Сегмент остался от прошлого запуска: занят, только если его демон жив
+        old = attach(name)
+        try:
+            if old.size >= 8 * HEADER_SLOTS:
+                header = np.ndarray(HEADER_SLOTS, dtype=np.int64, buffer=old.buf)
+                alive = not header[H_CLOSED] and now_ms() - header[H_HEARTBEAT] < DAEMON_TIMEOUT_MS
+                pid = int(header[H_PID])
+                del header
+                if alive:
+                    raise SharedStateError(f"сегмент {name!r} уже обслуживает демон (pid {pid})")
+        finally:
+            old.close()
+        old.unlink()
+        return shared_memory.SharedMemory(name, create=True, size=size)
+
+    def register_metrics(self, metrics):
+        metrics.counter('shm_publishes_total', 'Записей пакетов в разделяемую память', lambda: self.publishes)
+        metrics.histogram('shm_write_us', 'Запись пакетов в сегмент, мкс', self.write_us)
+        metrics.counter('shm_symbols_dropped_total', 'Символов, не поместившихся в сегмент', lambda: self.dropped)
+
+    def publish(self, batches):
+        if not batches:
+            return
+        t0 = time.perf_counter()
+        h = self.header
+        seq = int(h[H_SEQ]) + 2
+        h[H_SEQ] = seq - 1  # нечётный: идёт запись
+        for batch in batches:
+            for part, row_of, diff in zip(self.parts, self.row_of, (batch.spot, batch.fut)):
+                self._write(part, row_of, diff, seq)
+            if batch.last_broker_ts:
+                h[H_BROKER_TS] = batch.last_broker_ts
+        h[H_N_SPOT], h[H_N_FUT] = (part.n for part in self.parts)
+        h[H_SEQ] = seq
+        self.publishes += 1
+        self.write_us.observe((time.perf_counter() - t0) * 1e6)
+
+    def _write(self, part, row_of, diff, seq):
+        new = diff.new_symbols[:self.rows - part.n]
+        self.dropped += len(diff.new_symbols) - len(new)
+        if new:
+            part.names[part.n:part.n + len(new)] = [s.encode()[:SYMBOL_BYTES] for s in new]
+            row_of.update((s, part.n + i) for i, s in enumerate(new))
+            part.n += len(new)
+        index = {f: i for i, f in enumerate(part.fields)}
+        for field, (rows, values) in diff.fields.items():
+            keep = rows < part.n
+            rows = rows[keep]
+            i = index[field]
+            part.values[i, rows] = values[keep]
+            part.rev[i, rows] = seq
+        keep = diff.ts_rows < part.n
+        rows = diff.ts_rows[keep]
+        part.ts[rows] = diff.ts_values[keep]
+        part.seen[rows] = diff.seen_values[keep]
+        part.row_rev[rows] = seq
+        for symbol, decimals in diff.decimals.items():
+            row = row_of.get(symbol)
+            if row is not None:
+                part.decimals[row] = -1 if decimals is None else decimals
+                part.dec_rev[row] = seq
+
+    def heartbeat(self, engine):
+        # Отметка жизни и сводка движка для клиентов; отдельные int64, без seqlock
+        h = self.header
+        h[H_MESSAGES] = engine.messages()
+        h[H_UPDATES] = engine.published_updates
+        h[H_POPULATED] = int(engine.populated() * 1e6)
+        if engine.time_to_populated is not None:
+            h[H_POPULATED_MS] = int(engine.time_to_populated * 1000)
+        h[H_HEARTBEAT] = int(now_ms())
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.header[H_CLOSED] = 1
+        # numpy-представления держат буфер сегмента, без их удаления close() не пройдёт
+        self.header = self.parts = None
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+
+class SharedStateClient:
+    # Сторона клиента вместо IngestEngine: тот же интерфейс для ScreenerCore и окна (take_batches,
+    # run/start_thread/stop, метрики, задержка), но данные — из сегмента демона.
+    # Сегмент отображается только на чтение; numpy-представления смотрят прямо в него, а в хранилища
+    # потребителя копируются лишь ячейки, изменившиеся с прошлого согласованного чтения:
+    # таблицы рисуются позже чтения и держать seqlock на время отрисовки не могут
+
+    def __init__(self, name=SHM_NAME, publish_interval=PUBLISH_INTERVAL):
+        self.name = name
+        self.publish_interval = publish_interval
+        try:
+            self.shm = attach(name)
+        except FileNotFoundError:
+            raise SharedStateError(f"нет сегмента {name!r}: запустите market_daemon.py") from None
+        self._buf = self.shm.buf.toreadonly()
+        header = np.ndarray(HEADER_SLOTS, dtype=np.int64, buffer=self._buf)
+        if header[H_MAGIC] != MAGIC or header[H_LAYOUT] != layout_crc():
+            del header
+            self.stop()
+            raise SharedStateError(f"сегмент {name!r} другой версии или ещё не готов")
+        rows = int(header[H_ROWS])
+        del header
+        self.header, self.parts = map_segment(self._buf, rows)
+        atexit.register(self.stop)  # представления нужно отпустить до закрытия сегмента
+        self.seq = 0  # SEQ последнего согласованного чтения
+        self._updates = int(self.header[H_UPDATES])
+        self.streams = {}  # своих соединений у клиента нет
+        self.latency = LatencyStats()  # ts биржи -> чтение клиентом, мс
+        self.decode_us = Histogram()
+        self.handle_us = Histogram()
+        self.reads = 0
+        self.retries = 0  # чтений, повторённых из-за записи демона
+        self.read_us = Histogram()
+        self.metrics = MetricsRegistry()
+        m = self.metrics
+        m.counter('shm_reads_total', 'Согласованных чтений сегмента', lambda: self.reads)
+        m.counter('shm_read_retries_total', 'Повторов чтения из-за записи демона', lambda: self.retries)
+        m.histogram('shm_read_us', 'Чтение изменений из сегмента, мкс', self.read_us)
+        m.gauge('shm_daemon_heartbeat_age_ms', 'Время с последней отметки демона, мс', self.heartbeat_age)
+        m.summary('ws_ts_to_receive_ms', 'ts биржи -> чтение клиентом, мс', self.latency)
+
+    def _get(self, slot):
+        return int(self.header[slot]) if self.header is not None else 0
+
+    @property
+    def last_broker_ts(self):
+        return self._get(H_BROKER_TS) or None
+
+    @property
+    def time_to_populated(self):
+        ms = self._get(H_POPULATED_MS)
+        return ms / 1000 if ms >= 0 else None
+
+    def populated(self):
+        return self._get(H_POPULATED) / 1e6
+
+    def messages(self):
+        return self._get(H_MESSAGES)
+
+    def heartbeat_age(self):
+        return now_ms() - self._get(H_HEARTBEAT)
+
+    def closed(self):
+        # Демон завершился или перестал отмечаться
+        return self.header is None or bool(self.header[H_CLOSED]) or self.heartbeat_age() > DAEMON_TIMEOUT_MS
+
+    def start_thread(self):
+        # Читать нечего заранее: пакеты собираются при take_batches
+        pass
+
+    async def run(self):
+        # Для headless-режима: задача живёт, пока жив демон
+        while not self.closed():
+            await asyncio.sleep(self.publish_interval)
+
+    def stop(self):
+        self.header = self.parts = None
+        if self.shm is not None:
+            self._buf.release()
+            self.shm.close()
+            self.shm = None
+
+    def take_batches(self):
+        # Изменения с прошлого чтения одним пакетом; [] — ничего нового или демон пишет (повтор на следующем кадре)
+        if self.header is None:
+            return []
+        t0 = time.perf_counter()
+        h = self.header
+        for _ in range(SEQLOCK_RETRIES):
+            seq = int(h[H_SEQ])
+            if seq == self.seq:
+                return []
+            if seq & 1:
+                time.sleep(0)
+                continue
+            diffs = [self._read(part, int(h[slot])) for part, slot in zip(self.parts, (H_N_SPOT, H_N_FUT))]
+            broker_ts = int(h[H_BROKER_TS]) or None
+            if int(h[H_SEQ]) != seq:
+                self.retries += 1
+                continue
+            break
+        else:
+            self.retries += 1
+            return []
+        self.seq = seq
+        for part, diff in zip(self.parts, diffs):
+            part.symbols.extend(diff.new_symbols)
+            part.n = len(part.symbols)
+        updates = self._get(H_UPDATES)
+        batch = TickerBatch(diffs[0], diffs[1], broker_ts, max(updates - self._updates, 0))
+        self._updates = updates
+        for diff in diffs:
+            ts = diff.ts_values[(diff.ts_values > 0) & (diff.seen_values > 0)]  # без строк из снимка
+            for value in ts[::max(1, len(ts) // 64)].tolist():
+                self.latency.add_since(value)
+        self.reads += 1
+        self.read_us.observe((time.perf_counter() - t0) * 1e6)
+        return [batch]
+
+    def _read(self, part, n):
+        # StoreDiff ячеек с rev новее прошлого чтения; индексация массивом копирует, сегмент не держится
+        since = self.seq
+        new_symbols = [s.decode() for s in part.names[part.n:n].tolist()]
+        fields = {}
+        for i, field in enumerate(part.fields):
+            rows = np.flatnonzero(part.rev[i, :n] > since)
+            if len(rows):
+                fields[field] = (rows, part.values[i, rows])
+        ts_rows = np.flatnonzero(part.row_rev[:n] > since)
+        decimals = {}
+        dec_rows = np.flatnonzero(part.dec_rev[:n] > since)
+        if len(dec_rows):
+            symbols = part.symbols + new_symbols
+            for row, value in zip(dec_rows.tolist(), part.decimals[dec_rows].tolist()):
+                decimals[symbols[row]] = None if value < 0 else value
+        return StoreDiff(new_symbols, fields, ts_rows, part.ts[ts_rows], part.seen[ts_rows], decimals)
@@ -0,0 +1,112 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from instruments import CACHE_DIR
+
+# Снимок состояния тикеров для тёплого старта: колонки хранилищ одним бинарным файлом.
+# Формат: MAGIC, длина заголовка (uint32), JSON-заголовок, затем колонки с выравниванием 8 байт.
+# При чтении файл отображается в память (mmap), колонки — numpy-представления без разбора.
+SNAPSHOT_PATH = os.path.join(CACHE_DIR, 'tickers.snap')
+SNAPSHOT_INTERVAL = 30.0
+MAGIC = b'WSSNAP1\0'
+_HEADER = struct.Struct('<8sI')
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class StoreSnapshot:
+    # Копия колонок одного хранилища: symbols, {field: float64}, {field: bool}, ts int64
+    def __init__(self, symbols, values, valid, ts):
+        self.symbols = symbols
+        self.values = values
+        self.valid = valid
+        self.ts = ts
+
+
+def capture(store):
+    # Вызывается в потоке-владельце хранилища: только копии массивов, запись — отдельно
+    n = len(store)
+    return StoreSnapshot(
+        list(store.symbols),
+        {f: store.values[f][:n].copy() for f in store.fields},
+        {f: store.valid[f][:n].copy() for f in store.fields},
+        store.ts[:n].copy(),
+    )
+
+
+def write_snapshot(path, snapshots, saved_at=None):
+    # snapshots: name -> StoreSnapshot. Временный файл + fsync + os.replace:
+    # при падении на диске остаётся либо старый снимок, либо новый целиком
+    chunks = []
+    layout = {}
+    offset = 0
+    for name, snap in snapshots.items():
+        columns = {}
+        for kind, arrays in (('values', snap.values), ('valid', snap.valid)):
+            for field, array in arrays.items():
+                columns[f'{kind}:{field}'] = array
+        columns['ts'] = snap.ts
+        entry = {'symbols': snap.symbols, 'columns': {}}
+        for key, array in columns.items():
+            data = np.ascontiguousarray(array).tobytes()
+            entry['columns'][key] = [offset, array.dtype.str, len(array)]
+            chunks.append((offset, data))
+            offset = _align(offset + len(data))
+        layout[name] = entry
+    header = json.dumps({'saved_at': saved_at or time.time(), 'stores': layout}).encode()
+    base = _align(_HEADER.size + len(header))
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tickers-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, len(header)))
+            f.write(header)
+            for chunk_offset, data in chunks:
+                f.seek(base + chunk_offset)
+                f.write(data)
+            f.truncate(base + offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def read_snapshot(path):
+    # -> (saved_at, {name: StoreSnapshot}) с колонками поверх mmap; None — снимка нет или он испорчен
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, header_len = _HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            return None
+        header = json.loads(mapped[_HEADER.size:_HEADER.size + header_len])
+        base = _align(_HEADER.size + header_len)
+        snapshots = {}
+        for name, entry in header['stores'].items():
+            columns = {
+                key: np.frombuffer(mapped, dtype=np.dtype(dtype), count=count, offset=base + offset)
+                for key, (offset, dtype, count) in entry['columns'].items()
+            }
+            values = {k[7:]: a for k, a in columns.items() if k.startswith('values:')}
+            valid = {k[6:]: a for k, a in columns.items() if k.startswith('valid:')}
+            snapshots[name] = StoreSnapshot(entry['symbols'], values, valid, columns['ts'])
+        return header['saved_at'], snapshots
+    except (struct.error, ValueError, KeyError, TypeError):
+        return None
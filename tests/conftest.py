@@ -0,0 +1,5 @@
+# Модули репозитория лежат в корне, как и для benchmarks/
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,110 @@
+# Правила уведомлений: срабатывание по фронту с перевзводом, cooldown, состояние по символам
+# у правил на весь рынок и правила на поля, меняющиеся по часам биржи (отсчёт до фандинга)
+import pytest
+
+from alerts import AlertDispatcher, AlertEngine, AlertRule, rule_from_dict
+from ticker_store import TickerStore, FUT_FIELDS, SPOT_FIELDS, FUNDING_LEFT
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'XRPUSDT']
+COOLDOWN = 60_000
+
+
+@pytest.fixture
+def engine():
+    stores = {'spot': TickerStore(SPOT_FIELDS, 'spot', SYMBOLS), 'fut': TickerStore(FUT_FIELDS, 'futures', SYMBOLS)}
+    return AlertEngine(stores, cooldown_ms=COOLDOWN)
+
+
+def tick(engine, now, market='fut', **prices):
+    # Новые lastPrice по символам -> символы сработавших событий по правилам
+    store = engine.stores[market]
+    for symbol, price in prices.items():
+        store.update(symbol, {'lastPrice': str(price)}, ts=now)
+    alerts = engine.evaluate({market: {symbol: {'lastPrice'} for symbol in prices}}, now)
+    return [(alert.title, alert.symbols) for alert in alerts]
+
+
+def test_fires_once_on_crossing_and_rearms(engine):
+    rule = AlertRule('lastPrice', '>=', 100, symbol='BTCUSDT', name='btc')
+    engine.set_rules([rule])
+    # Первое наблюдение только взводит, даже если условие уже истинно
+    assert tick(engine, 0, BTCUSDT=150) == []
+    assert tick(engine, 1000, BTCUSDT=90) == []
+    assert tick(engine, 2000, BTCUSDT=101) == [('btc', ['BTCUSDT'])]
+    # Условие остаётся истинным — повтора нет
+    assert tick(engine, 3000, BTCUSDT=120) == []
+    assert tick(engine, 4000, BTCUSDT=99) == []
+    assert tick(engine, COOLDOWN + 5000, BTCUSDT=100) == [('btc', ['BTCUSDT'])]
+    assert engine.fired == 2
+
+
+def test_cooldown_suppresses_repeat(engine):
+    engine.set_rules([AlertRule('lastPrice', '<=', 10, symbol='ETHUSDT', name='eth')])
+    tick(engine, 0, ETHUSDT=20)
+    assert tick(engine, 1000, ETHUSDT=5) == [('eth', ['ETHUSDT'])]
+    tick(engine, 2000, ETHUSDT=20)
+    # Новый фронт внутри cooldown подавлен, но перевзвод учтён: после cooldown нужен новый фронт
+    assert tick(engine, 3000, ETHUSDT=5) == []
+    assert tick(engine, COOLDOWN + 2000, ETHUSDT=4) == []
+    tick(engine, COOLDOWN + 3000, ETHUSDT=20)
+    assert tick(engine, COOLDOWN + 4000, ETHUSDT=5) == [('eth', ['ETHUSDT'])]
+
+
+def test_wildcard_rule_keeps_state_per_symbol(engine):
+    engine.set_rules([AlertRule('lastPrice', 'abs>=', 5, name='move')])
+    tick(engine, 0, BTCUSDT=1, ETHUSDT=1)
+    assert tick(engine, 1000, BTCUSDT=-6) == [('move', ['BTCUSDT'])]
+    # ETH ещё не срабатывал: его фронт не подавлен cooldown'ом BTC; XRP наблюдается впервые
+    assert tick(engine, 2000, BTCUSDT=7, ETHUSDT=6, XRPUSDT=9) == [('move', ['ETHUSDT'])]
+    tick(engine, 3000, XRPUSDT=0)
+    assert tick(engine, 4000, XRPUSDT=5) == [('move', ['XRPUSDT'])]
+
+
+def test_rules_are_indexed_by_market_and_symbol(engine):
+    engine.set_rules([
+        AlertRule('lastPrice', '>=', 100, symbol='BTCUSDT', name='fut btc'),
+        AlertRule('lastPrice', '>=', 100, market='spot', name='spot all'),
+    ])
+    tick(engine, 0, BTCUSDT=1, ETHUSDT=1)
+    tick(engine, 0, market='spot', BTCUSDT=1, ETHUSDT=1)
+    assert tick(engine, 1000, ETHUSDT=200) == []
+    assert tick(engine, 1000, market='spot', ETHUSDT=200) == [('spot all', ['ETHUSDT'])]
+    assert tick(engine, 2000, BTCUSDT=200) == [('fut btc', ['BTCUSDT'])]
+
+
+@pytest.mark.parametrize('symbol', [None, 'BTCUSDT'])
+def test_funding_countdown_rule_fires_without_messages(engine, symbol):
+    # Отсчёт до фандинга меняется только по часам (funding_now), грязных ячеек у него не бывает
+    store = engine.stores['fut']
+    funding_at = 10_000_000
+    for s in SYMBOLS:
+        store.update(s, {'nextFundingTime': str(funding_at if s == 'BTCUSDT' else 2 * funding_at)}, ts=0)
+    engine.set_rules([rule_from_dict({'kind': 'rule', 'field': FUNDING_LEFT, 'op': '<=', 'level': 600_000,
+                                      'symbol': symbol, 'name': 'funding'})])
+    fired = []
+    for now in range(funding_at - 1_000_000, funding_at, 100_000):
+        store.funding_now = now
+        fired += [(a.symbols, a.values) for a in engine.evaluate({'spot': {}, 'fut': {}}, now)]
+    assert fired == [(['BTCUSDT'], [600_000])]
+
+
+def test_unknown_field_rejected():
+    with pytest.raises(ValueError, match='lastprice'):
+        rule_from_dict({'kind': 'rule', 'field': 'lastprice', 'level': 1})
+
+
+def test_dispatcher_rate_limits_and_caps_pending():
+    delivered = []
+    dispatcher = AlertDispatcher()
+    sink = dispatcher.add('log', delivered.append, min_interval=1.0)
+    sink.max_pending = 3
+    dispatcher.submit(['a'])
+    assert dispatcher.drain(now=10.0) == 1
+    dispatcher.submit(['b', 'c'])
+    assert dispatcher.drain(now=10.5) == 0  # рано: события копятся
+    dispatcher.submit(['d', 'e'])
+    assert dispatcher.drain(now=11.0) == 3
+    assert delivered == [['a'], ['c', 'd', 'e']]
+    assert dispatcher.dropped() == 1
+    dispatcher.close()
+    assert dispatcher.sinks == {}
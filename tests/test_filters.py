@@ -0,0 +1,101 @@
+# Язык фильтров: приоритет операций, суффиксы чисел, ошибки и пересчёт только изменившихся строк
+import random
+import re
+
+import numpy as np
+import pytest
+
+from filters import FilterError, RowFilter, compile_filter
+from ticker_store import TickerStore, FUT_FIELDS
+
+
+def run(text, **cols):
+    fn, _ = compile_filter(text)
+    cols = {name: np.asarray(values, dtype=float) for name, values in cols.items()}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.asarray(fn(cols), dtype=bool).tolist()
+
+
+@pytest.mark.parametrize('text', [
+    'lastPrice == 1 + 2 * 3',
+    'lastPrice == (1 + 2) * 3 - 2',
+    'lastPrice == 21 - 10 - 4',     # вычитание слева направо
+    'lastPrice == 70 / 5 / 2',      # деление слева направо
+    'lastPrice == -(-7)',
+    'lastPrice == -1 * -7',
+    'abs(lastPrice - 14) == 7',
+])
+def test_arithmetic_precedence(text):
+    assert run(text, lastPrice=[7.0]) == [True]
+
+
+def test_and_binds_tighter_than_or_and_not_tightest():
+    a, b, c = [1, 1, 0, 0], [1, 0, 1, 0], [0, 0, 1, 1]
+    assert run('lastPrice > 0 or markPrice > 0 and indexPrice > 0', lastPrice=a, markPrice=b, indexPrice=c) == \
+        [True, True, True, False]
+    assert run('(lastPrice > 0 or markPrice > 0) and indexPrice > 0', lastPrice=a, markPrice=b, indexPrice=c) == \
+        [False, False, True, False]
+    assert run('not lastPrice > 0 and markPrice > 0', lastPrice=a, markPrice=b) == [False, False, True, False]
+    assert run('!(lastPrice > 0 && markPrice > 0) || indexPrice > 0', lastPrice=a, markPrice=b, indexPrice=c) == \
+        [False, True, True, True]
+
+
+@pytest.mark.parametrize('text, value', [
+    ('2k', 2e3), ('2K', 2e3), ('1.5M', 1.5e6), ('1.5m', 1.5e6), ('3B', 3e9), ('.5b', 5e8),
+    ('5%', 0.05), ('0.05%', 0.0005), ('1e3k', 1e6), ('2.5e-1', 0.25),
+])
+def test_number_suffixes(text, value):
+    assert run(f'turnover24h == {text}', turnover24h=[value]) == [True]
+
+
+def test_empty_field_fails_comparison():
+    nan = float('nan')
+    assert run('fundingRate > -1', fundingRate=[0.0, nan]) == [True, False]
+    assert run('abs(fundingRate) >= 0', fundingRate=[nan]) == [False]
+
+
+def test_used_fields_are_reported():
+    _, fields = compile_filter('turnover24h > 10M and abs(price24hPcnt) > 5% or basis < 0')
+    assert fields == {'turnover24h', 'price24hPcnt', 'basis'}
+
+
+@pytest.mark.parametrize('text, message', [
+    ('lastPrise > 1', "неизвестное поле 'lastPrise' в позиции 1"),
+    ('volume24h > 1 and trnover > 2', "неизвестное поле 'trnover' в позиции 19"),
+    ('1 < lastPrice < 2', 'цепочка сравнений'),
+    ('lastPrice + 1', 'должно быть условием'),
+    ('(lastPrice > 1', "ожидается ')'"),
+    ('lastPrice > 1)', 'лишнее в выражении'),
+    ('lastPrice > 1 and 2', 'ожидается условие'),
+    ('abs(lastPrice > 1) > 0', 'ожидается число'),
+    ('lastPrice > 1 ; 2', 'непонятный символ в позиции 15'),
+    ('lastPrice >', "ожидается число, поле или '('"),
+])
+def test_errors(text, message):
+    with pytest.raises(FilterError, match=re.escape(message)):
+        compile_filter(text)
+
+
+def test_incremental_update_matches_full_evaluation():
+    rnd = random.Random(3)
+    symbols = [f"S{i:03d}USDT" for i in range(80)]
+    store = TickerStore(FUT_FIELDS, 'futures', symbols)
+    index = FUT_FIELDS.index
+
+    def set_row(symbol):
+        raws = [''] * len(FUT_FIELDS)
+        for field in ('turnover24h', 'price24hPcnt', 'fundingRate'):
+            if rnd.random() > 0.1:  # иногда поля нет
+                raws[index(field)] = str(rnd.choice([5e6, 2e7, 1e8]) if field == 'turnover24h' else rnd.uniform(-0.1, 0.1))
+        store.update_values(symbol, raws, snapshot=True)
+        return {'turnover24h', 'price24hPcnt', 'fundingRate'}
+
+    for symbol in symbols:
+        set_row(symbol)
+    row_filter = RowFilter('turnover24h > 10M and abs(price24hPcnt) > 3% or fundingRate < -0.05')
+    row_filter.update(store)
+    for _ in range(50):
+        dirty = {symbol: set_row(symbol) for symbol in rnd.sample(symbols, 5)}
+        row_filter.update(store, dirty)
+        assert row_filter.mask.tolist() == RowFilter(row_filter.text)._evaluate(store).tolist()
+    assert row_filter.select(store, symbols[::-1]) == [s for s in symbols[::-1] if row_filter.mask[store.row_of[s]]]
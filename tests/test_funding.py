@@ -0,0 +1,68 @@
+# FundingScheduler: одно уведомление на группу символов с общим временем фандинга,
+# в том числе после того, как группа уже извлечена из кучи и символы перешли на следующий фандинг
+from funding import FundingScheduler
+
+ALERT_MS = 300_000
+HOUR = 3_600_000
+T1 = 8 * HOUR
+T2 = 16 * HOUR
+
+
+def scheduler(**times):
+    s = FundingScheduler(ALERT_MS)
+    for symbol, t in times.items():
+        s.set(symbol, t)
+    return s
+
+
+def test_group_fires_once_in_its_window():
+    s = scheduler(BTCUSDT=T1, ETHUSDT=T1, XRPUSDT=T2)
+    assert s.next_alert() == T1 - ALERT_MS
+    assert s.due(T1 - ALERT_MS - 1) == []
+    assert s.due(T1 - ALERT_MS + 1000) == [('BTCUSDT', ALERT_MS - 1000), ('ETHUSDT', ALERT_MS - 1000)]
+    assert s.due(T1 - 1000) == []
+    assert s.next_alert() == T2 - ALERT_MS
+
+
+def test_symbols_rebucket_after_their_group_is_popped():
+    s = scheduler(BTCUSDT=T1, ETHUSDT=T1)
+    assert len(s.due(T1 - 1000)) == 2
+    # После фандинга биржа присылает следующее время: символы встают в новую группу
+    s.set('BTCUSDT', T2)
+    s.set('ETHUSDT', T2)
+    assert s.next_alert() == T2 - ALERT_MS
+    assert s.due(T2 - 1000) == [('BTCUSDT', 1000), ('ETHUSDT', 1000)]
+    assert s.next_alert() is None
+
+
+def test_repeated_time_after_pop_does_not_fire_again():
+    s = scheduler(BTCUSDT=T1)
+    assert s.due(T1 - 1000) == [('BTCUSDT', 1000)]
+    # Запоздавшая delta с тем же nextFundingTime
+    s.set('BTCUSDT', T1)
+    assert s.due(T1 - 500) == []
+
+
+def test_late_joiner_to_popped_group_is_alerted_alone():
+    s = scheduler(BTCUSDT=T1)
+    assert s.due(T1 - 2000) == [('BTCUSDT', 2000)]
+    # Новый листинг с тем же временем: группа создаётся заново только с ним
+    s.set('NEWUSDT', T1)
+    assert s.due(T1 - 1000) == [('NEWUSDT', 1000)]
+
+
+def test_moved_and_removed_symbols_leave_their_group():
+    s = scheduler(BTCUSDT=T1, ETHUSDT=T1, XRPUSDT=T1)
+    s.set('ETHUSDT', T2)
+    s.remove('XRPUSDT')
+    assert len(s) == 2
+    assert s.due(T1 - 1000) == [('BTCUSDT', 1000)]
+    assert s.due(T2 - 1000) == [('ETHUSDT', 1000)]
+
+
+def test_emptied_and_past_groups_are_dropped_silently():
+    s = scheduler(BTCUSDT=T1, ETHUSDT=T2)
+    s.set('BTCUSDT', T2)
+    # Группа T1 опустела, группа T2 при запуске после фандинга уже прошла
+    assert s.due(T2 + 1000) == []
+    assert s.next_alert() is None
@@ -0,0 +1,84 @@
+# LiveSortIndex должен давать тот же порядок, что полная пересортировка sorted_keys:
+# равные значения — в порядке строк источника, пустые ячейки — в конце в обоих направлениях
+import random
+
+import pytest
+
+import live_sort
+from live_sort import LiveSortIndex
+from screener_core import sorted_keys
+from ticker_store import TickerStore
+
+FIELD = 'lastPrice'
+
+
+@pytest.fixture(params=['sortedcontainers', 'bisect'])
+def index_backend(request, monkeypatch):
+    if request.param == 'bisect':
+        monkeypatch.setattr(live_sort, 'SortedList', None)
+    elif live_sort.SortedList is None:
+        pytest.skip('sortedcontainers не установлен')
+
+
+def make_store(values):
+    store = TickerStore((FIELD,), 'futures', [f"S{i:03d}USDT" for i in range(len(values))])
+    for symbol, value in zip(store.keys(), values):
+        set_value(store, symbol, value)
+    return store
+
+
+def set_value(store, symbol, value):
+    # None — ячейка пустая (snapshot без поля)
+    store.update_values(symbol, ('' if value is None else repr(value),), snapshot=True)
+
+
+def build(store, descending):
+    return LiveSortIndex(descending).build(store.keys(), *store.column(FIELD))
+
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_build_matches_full_sort_with_ties_and_empty(index_backend, descending):
+    store = make_store([3.0, None, 1.0, 3.0, 2.0, None, 1.0, 3.0])
+    index = build(store, descending)
+    assert index.order() == sorted_keys(store, FIELD, descending)
+    order = index.order()
+    assert order[-2:] == ['S001USDT', 'S005USDT']
+    # Равные тройки — в порядке строк
+    threes = [s for s in order if store.value(s, FIELD) == 3.0]
+    assert threes == ['S000USDT', 'S003USDT', 'S007USDT']
+
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_updates_match_full_sort(index_backend, descending):
+    rnd = random.Random(7)
+    # Мало различных значений — много равных; примерно каждое пятое — пусто
+    choices = [1.0, 2.0, 2.5, 3.0, None]
+    store = make_store([rnd.choice(choices) for _ in range(60)])
+    index = build(store, descending)
+    for _ in range(500):
+        symbol = rnd.choice(store.keys())
+        value = rnd.choice(choices)
+        before = index.order()
+        set_value(store, symbol, value)
+        moved = index.update(symbol, value)
+        after = index.order()
+        assert after == sorted_keys(store, FIELD, descending)
+        if not moved:
+            assert after == before
+
+
+def test_unchanged_value_is_not_a_move(index_backend):
+    store = make_store([1.0, 2.0, None])
+    index = build(store, True)
+    assert not index.update('S000USDT', 1.0)
+    assert not index.update('S002USDT', None)
+    assert not index.update('S002USDT', float('nan'))
+    assert index.update('S000USDT', 5.0)
+    assert index.order() == ['S000USDT', 'S001USDT', 'S002USDT']
+
+
+def test_new_symbol_goes_after_equal_values(index_backend):
+    store = make_store([2.0, 1.0])
+    index = build(store, True)
+    assert index.update('NEWUSDT', 2.0)
+    assert index.order() == ['S000USDT', 'NEWUSDT', 'S001USDT']
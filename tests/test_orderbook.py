@@ -0,0 +1,96 @@
+# Стаканы: разрыв номера u сбрасывает стакан до свежего снапшота, объём 0 удаляет уровень
+import pytest
+
+from orderbook import BookEngine, OrderBook
+from ticker_store import TickerStore, DiffTracker, SPOT_FIELDS, BID1, ASK1, SPREAD, IMBALANCE
+
+SNAPSHOT_BIDS = [['100', '1'], ['99', '2'], ['98', '3']]
+SNAPSHOT_ASKS = [['101', '1'], ['102', '2']]
+
+
+@pytest.fixture
+def engine():
+    tracker = DiffTracker(TickerStore(SPOT_FIELDS, 'spot'))
+    tracker.add_symbols(['BTCUSDT'])
+    gaps = []
+    engine = BookEngine(tracker, depth=50, on_gap=gaps.append)
+    engine.gaps_seen = gaps
+    return engine
+
+
+def levels(book):
+    return [-k for k in book.bid_keys], list(book.ask_keys)
+
+
+def test_zero_size_deletes_level(engine):
+    engine.handle(('BTCUSDT', SNAPSHOT_BIDS, SNAPSHOT_ASKS, 10), snapshot=True)
+    engine.handle(('BTCUSDT', [['99', '0'], ['100', '5']], [['101', '0'], ['101.5', '4']], 11), snapshot=False)
+    book = engine.books['BTCUSDT']
+    assert levels(book) == ([100, 98], [101.5, 102])
+    assert list(book.bid_sizes) == [5, 3]
+    assert list(book.ask_sizes) == [4, 2]
+    # Удаление уровня, которого нет, стакан не меняет
+    engine.handle(('BTCUSDT', [['97', '0']], [], 12), snapshot=False)
+    assert levels(book) == ([100, 98], [101.5, 102])
+    assert book.u == 12
+
+
+def test_gap_resets_until_snapshot(engine):
+    engine.handle(('BTCUSDT', SNAPSHOT_BIDS, SNAPSHOT_ASKS, 10), snapshot=True)
+    engine.handle(('BTCUSDT', [['100', '2']], [], 12), snapshot=False)  # u=11 пропущен
+    book = engine.books['BTCUSDT']
+    assert engine.gaps == 1
+    assert engine.gaps_seen == ['BTCUSDT']
+    assert book.u == -1 and not book.synced
+    assert levels(book) == ([], [])
+    # delta после разрыва отбрасываются, даже если номер подходит
+    engine.handle(('BTCUSDT', [['100', '2']], [], 13), snapshot=False)
+    engine.handle(('BTCUSDT', [['100', '2']], [], 0), snapshot=False)
+    assert levels(book) == ([], []) and engine.gaps == 1
+    engine.handle(('BTCUSDT', [['200', '1']], [['201', '1']], 50), snapshot=True)
+    assert engine.resyncs == 1
+    assert book.synced and book.u == 50
+    assert levels(book) == ([200], [201])
+    engine.handle(('BTCUSDT', [['199', '1']], [], 51), snapshot=False)
+    assert levels(book) == ([200, 199], [201])
+
+
+def test_delta_before_snapshot_dropped(engine):
+    engine.handle(('BTCUSDT', SNAPSHOT_BIDS, SNAPSHOT_ASKS, 10), snapshot=False)
+    assert levels(engine.books['BTCUSDT']) == ([], [])
+    assert engine.gaps == 0 and engine.gaps_seen == []
+    # Символ не из хранилища не заводит стакан
+    engine.handle(('XXXUSDT', SNAPSHOT_BIDS, SNAPSHOT_ASKS, 1), snapshot=True)
+    assert 'XXXUSDT' not in engine.books
+
+
+def test_u1_delta_replaces_book(engine):
+    engine.handle(('BTCUSDT', SNAPSHOT_BIDS, SNAPSHOT_ASKS, 10), snapshot=True)
+    engine.handle(('BTCUSDT', [['50', '1']], [['51', '1']], 1), snapshot=False)
+    book = engine.books['BTCUSDT']
+    assert levels(book) == ([50], [51])
+    assert book.u == 1 and engine.gaps == 0 and engine.resyncs == 0
+
+
+def test_depth_truncates_far_levels():
+    book = OrderBook()
+    book.apply([['100', '1'], ['99', '1'], ['98', '1']], [['101', '1'], ['103', '1']], depth=2)
+    assert levels(book) == ([100, 99], [101, 103])
+    # Уровень глубже depth не вставляется, лучший вытесняет худший
+    book.apply([['97', '1'], ['100.5', '1']], [['104', '1'], ['102', '1']], depth=2)
+    assert levels(book) == ([100.5, 100], [101, 102])
+
+
+def test_flush_writes_top(engine):
+    engine.handle(('BTCUSDT', SNAPSHOT_BIDS, SNAPSHOT_ASKS, 10), snapshot=True)
+    engine.flush()
+    store = engine.tracker.store
+    assert store.value('BTCUSDT', BID1) == 100
+    assert store.value('BTCUSDT', ASK1) == 101
+    assert store.value('BTCUSDT', SPREAD) == pytest.approx(2 / 201)
+    assert store.value('BTCUSDT', IMBALANCE) == pytest.approx((6 - 3) / 9)
+    # Пустая сторона после разрыва — NaN, а не старый верх
+    engine.handle(('BTCUSDT', [], [], 12), snapshot=False)
+    engine.flush()
+    assert not engine.dirty
+    assert [store.value('BTCUSDT', f) for f in (BID1, ASK1, SPREAD, IMBALANCE)] == [None] * 4
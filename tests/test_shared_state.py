@@ -0,0 +1,167 @@
+# Разделяемая память демона: клиент копирует только ячейки, изменившиеся с прошлого чтения,
+# и не принимает чтение, во время которого писатель менял сегмент (seqlock)
+import itertools
+import math
+import os
+from multiprocessing import resource_tracker
+
+import pytest
+
+from ingest import TickerBatch
+from shared_state import SharedStateClient, SharedStateWriter, H_SEQ
+from ticker_store import TickerStore, DiffTracker, apply_diff, SPOT_FIELDS, FUT_FIELDS
+
+ROWS = 64
+_names = itertools.count()
+
+
+class Daemon:
+    # Писатель сегмента и трекеры хранилищ, как у market_daemon.py, без сети
+
+    def __init__(self):
+        self.name = f"test_shm_{os.getpid()}_{next(_names)}"
+        self.writer = SharedStateWriter(self.name, ROWS)
+        self.spot = DiffTracker(TickerStore(SPOT_FIELDS, 'spot'))
+        self.fut = DiffTracker(TickerStore(FUT_FIELDS, 'futures'))
+        self.ts = 1_700_000_000_000
+
+    def set(self, tracker, symbol, **values):
+        self.ts += 100
+        tracker.update(symbol, {k: str(v) if v is not None else None for k, v in values.items()}, self.ts, self.ts,
+                       snapshot=any(v is None for v in values.values()))
+
+    def publish(self):
+        batch = TickerBatch(self.spot.take(), self.fut.take(), self.ts, 1)
+        self.writer.publish([batch])
+
+
+class Client:
+    # Клиент сегмента с хранилищами-копиями, как у ScreenerCore
+
+    def __init__(self, name):
+        self.engine = SharedStateClient(name)
+        self.spot = TickerStore(SPOT_FIELDS, 'spot')
+        self.fut = TickerStore(FUT_FIELDS, 'futures')
+
+    def read(self):
+        # -> [(хранилище, StoreDiff)] прочитанных пакетов
+        diffs = []
+        for batch in self.engine.take_batches():
+            for store, diff in ((self.spot, batch.spot), (self.fut, batch.fut)):
+                apply_diff(store, diff)
+                diffs.append((store, diff))
+        return diffs
+
+
+@pytest.fixture
+def daemon():
+    d = Daemon()
+    yield d
+    d.writer.close()
+
+
+@pytest.fixture
+def client(daemon, monkeypatch):
+    # До 3.13 клиент снимает сегмент с учёта resource_tracker; здесь писатель в том же процессе,
+    # и его учёт должен остаться для unlink
+    with monkeypatch.context() as m:
+        m.setattr(resource_tracker, 'unregister', lambda name, rtype: None)
+        c = Client(daemon.name)
+    yield c
+    c.engine.stop()
+
+
+def test_only_changed_cells_are_copied(daemon, client):
+    daemon.spot.add_symbols(['BTCUSDT', 'ETHUSDT'])
+    daemon.fut.add_symbols(['BTCUSDT', 'ETHUSDT', 'XRPUSDT'])
+    daemon.fut.set_decimals({'BTCUSDT': 1})
+    daemon.set(daemon.spot, 'BTCUSDT', lastPrice=100.5, volume24h=7)
+    daemon.set(daemon.fut, 'ETHUSDT', lastPrice=3000, fundingRate=0.0001)
+    daemon.publish()
+    first = client.read()
+    assert client.spot.keys() == ['BTCUSDT', 'ETHUSDT']
+    assert client.fut.keys() == ['BTCUSDT', 'ETHUSDT', 'XRPUSDT']
+    assert client.spot.value('BTCUSDT', 'lastPrice') == 100.5
+    assert client.fut.value('ETHUSDT', 'fundingRate') == 0.0001
+    assert client.fut.price_decimals('BTCUSDT') == 1
+    assert sum(diff.cells() for _, diff in first) == 4
+    # Без новой записи читать нечего
+    assert client.read() == []
+    # Одна ячейка — одна скопированная ячейка; остальные значения на месте
+    daemon.set(daemon.fut, 'ETHUSDT', lastPrice=3001)
+    daemon.publish()
+    second = client.read()
+    changed = [(store.type_label, {f: rows.tolist() for f, (rows, _) in diff.fields.items()})
+               for store, diff in second if diff.fields]
+    assert changed == [('futures', {'lastPrice': [1]})]
+    assert client.fut.value('ETHUSDT', 'lastPrice') == 3001
+    assert client.fut.value('ETHUSDT', 'fundingRate') == 0.0001
+    assert client.spot.value('BTCUSDT', 'lastPrice') == 100.5
+
+
+def test_cleared_value_reaches_client(daemon, client):
+    daemon.fut.add_symbols(['BTCUSDT'])
+    daemon.set(daemon.fut, 'BTCUSDT', lastPrice=1, markPrice=2)
+    daemon.publish()
+    client.read()
+    # snapshot без markPrice сбрасывает поле
+    daemon.set(daemon.fut, 'BTCUSDT', lastPrice=1, markPrice=None)
+    daemon.publish()
+    client.read()
+    assert client.fut.value('BTCUSDT', 'markPrice') is None
+    assert client.fut.value('BTCUSDT', 'lastPrice') == 1
+
+
+def test_odd_sequence_means_writer_busy(daemon, client):
+    daemon.spot.add_symbols(['BTCUSDT'])
+    daemon.set(daemon.spot, 'BTCUSDT', lastPrice=1)
+    daemon.publish()
+    seq = int(daemon.writer.header[H_SEQ])
+    daemon.writer.header[H_SEQ] = seq + 1  # писатель посреди записи
+    assert client.read() == []
+    assert client.engine.retries == 1
+    daemon.writer.header[H_SEQ] = seq + 2
+    assert client.read()
+    assert client.spot.value('BTCUSDT', 'lastPrice') == 1
+
+
+def test_read_overlapping_a_write_is_retried(daemon, client, monkeypatch):
+    daemon.spot.add_symbols(['BTCUSDT', 'ETHUSDT'])
+    daemon.set(daemon.spot, 'BTCUSDT', lastPrice=1)
+    daemon.set(daemon.spot, 'ETHUSDT', lastPrice=1)
+    daemon.publish()
+    read = client.engine._read
+    calls = []
+
+    def read_then_write(part, n):
+        # Первое чтение спота видит старое, пока оно идёт, писатель меняет обе строки
+        diff = read(part, n)
+        calls.append(part.fields is SPOT_FIELDS)
+        if len(calls) == 1:
+            daemon.set(daemon.spot, 'BTCUSDT', lastPrice=2)
+            daemon.set(daemon.spot, 'ETHUSDT', lastPrice=2)
+            daemon.publish()
+        return diff
+
+    monkeypatch.setattr(client.engine, '_read', read_then_write)
+    client.read()
+    assert client.engine.retries == 1
+    assert client.engine.reads == 1
+    # Принято только согласованное чтение: обе строки из одной записи
+    assert [client.spot.value(s, 'lastPrice') for s in ('BTCUSDT', 'ETHUSDT')] == [2, 2]
+    assert client.engine.seq == int(daemon.writer.header[H_SEQ])
+
+
+def test_symbols_beyond_segment_rows_are_dropped(daemon, client):
+    daemon.fut.add_symbols([f"S{i:03d}USDT" for i in range(ROWS + 5)])
+    daemon.publish()
+    client.read()
+    assert len(client.fut) == ROWS
+    assert daemon.writer.dropped == 5
+
+
+def test_closed_after_daemon_exit(daemon, client):
+    assert not client.engine.closed()
+    daemon.writer.close()
+    assert client.engine.closed()
+    assert not math.isnan(client.engine.heartbeat_age())
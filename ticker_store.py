@@ -0,0 +1,449 @@
+from array import array
+
+import numpy as np
+
+# Поля тикеров Bybit v5 (tickers.*), которые хранит скринер
+SPOT_TICKER_FIELDS = ('lastPrice', 'price24hPcnt', 'volume24h', 'turnover24h', 'highPrice24h', 'lowPrice24h')
+FUT_TICKER_FIELDS = (
+    'lastPrice', 'price24hPcnt', 'volume24h', 'turnover24h', 'markPrice', 'indexPrice',
+    'openInterestValue', 'fundingRate', 'nextFundingTime',
+)
+# Поля, которые движок считает сам по стакану (orderbook.*) и ленте сделок (publicTrade.*).
+# Идут после полей тикера: сообщение тикера их не несёт, и его снапшот их не сбрасывает
+BID1 = 'bid1Price'
+ASK1 = 'ask1Price'
+SPREAD = 'spread'               # (ask - bid) / середина
+IMBALANCE = 'book_imbalance'    # (объём бидов - объём асков) / сумма по верхним уровням, от -1 до 1
+TRADES_1M = 'trades_1m'         # сделок за минуту
+FLOW_1M = 'flow_1m'             # покупки - продажи за минуту, в котируемой валюте
+BOOK_FIELDS = (BID1, ASK1, SPREAD, IMBALANCE)
+TRADE_FIELDS = (TRADES_1M, FLOW_1M)
+SPOT_FIELDS = SPOT_TICKER_FIELDS + BOOK_FIELDS + TRADE_FIELDS
+FUT_FIELDS = FUT_TICKER_FIELDS + BOOK_FIELDS + TRADE_FIELDS
+
+# Цены, которые форматируются с точностью tickSize инструмента
+PRICE_FIELDS = ('lastPrice', 'markPrice', 'indexPrice', 'highPrice24h', 'lowPrice24h', BID1, ASK1)
+
+# Производные поля, которые не хранятся, а вычисляются из колонок
+FUNDING_INFO = 'funding_info'   # (ставка, мс до фандинга)
+FUNDING_LEFT = 'funding_left'   # мс до фандинга по времени последнего сообщения
+BASIS = 'basis'                 # lastPrice фьючерса / lastPrice спота - 1 (PairLink)
+
+# Строка без обновлений дольше этого считается устаревшей и показывается серой
+STALE_AFTER_MS = 60 * 1000
+
+
+class TickerStore:
+    # Колоночное хранилище тикеров: symbol -> номер строки, по массиву float64 на поле
+    # и маска валидности. Строки Bybit разбираются один раз, в update().
+    # Данные лежат в array.array (быстрая запись по одному значению из Python),
+    # а values/valid/ts — numpy-представления тех же буферов для векторных операций.
+
+    def __init__(self, fields, type_label, symbols=()):
+        self.fields = tuple(fields)
+        self.type_label = type_label
+        self.symbols = []   # row -> symbol
+        self.row_of = {}    # symbol -> row
+        self.capacity = 0
+        self._values = {field: array('d') for field in self.fields}
+        self._valid = {field: array('b') for field in self.fields}
+        self._ts = array('q')  # ts биржи последнего сообщения по строке
+        self._seen = array('q')  # локальное время приёма последнего сообщения, мс; 0 — устарело
+        self.stale_cutoff = 0  # строки с seen < stale_cutoff устаревшие (выставляет потребитель)
+        self.decimals = {}  # symbol -> знаков после запятой в цене (по tickSize инструмента)
+        self.derived = {}   # field -> float64 по строкам (NaN — пусто), считается снаружи (PairLink)
+        self.funding_now = 0  # время биржи по общим часам для отсчёта до фандинга; 0 — по ts строки
+        self._make_views()
+        if symbols:
+            self.add_symbols(symbols)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self.row_of
+
+    def keys(self):
+        return self.symbols
+
+    def positions(self, keys):
+        # Номера строк символов в порядке keys()
+        row_of = self.row_of
+        return np.fromiter((row_of[k] for k in keys), dtype=np.int64, count=len(keys))
+
+    def add_symbols(self, symbols):
+        new = [s for s in dict.fromkeys(symbols) if s not in self.row_of]
+        if not new:
+            return
+        size = len(self.symbols) + len(new)
+        if size > self.capacity:
+            self._grow(max(size, self.capacity * 2))
+        for symbol in new:
+            self.row_of[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+
+    def _grow(self, capacity):
+        # Буфер с живыми numpy-представлениями нельзя расширить на месте — копируем
+        extra = capacity - self.capacity
+        self._values = {f: self._values[f] + array('d', bytes(8 * extra)) for f in self.fields}
+        self._valid = {f: self._valid[f] + array('b', bytes(extra)) for f in self.fields}
+        self._ts = self._ts + array('q', bytes(8 * extra))
+        self._seen = self._seen + array('q', bytes(8 * extra))
+        self.capacity = capacity
+        self._make_views()
+
+    def _make_views(self):
+        self.values = {f: np.frombuffer(self._values[f], dtype=np.float64) for f in self.fields}
+        self.valid = {f: np.frombuffer(self._valid[f], dtype=np.bool_) for f in self.fields}
+        self.ts = np.frombuffer(self._ts, dtype=np.int64)
+        self.seen = np.frombuffer(self._seen, dtype=np.int64)
+
+    def update(self, symbol, data, ts=None, received=None, snapshot=False):
+        # Разбирает сообщение-словарь тикера и возвращает список изменившихся полей
+        return self.update_values(symbol, tuple(map(data.get, self.fields)), ts, received, snapshot)
+
+    def update_values(self, symbol, raws, ts=None, received=None, snapshot=False):
+        # raws — сырые значения в порядке self.fields (None/'' — поля нет в сообщении); короче fields —
+        # остальные поля не трогаются (сообщение тикера и поля стакана/сделок).
+        # snapshot: сообщение несёт полное состояние, отсутствующие поля сбрасываются
+        row = self.row_of.get(symbol)
+        if row is None:
+            return ()
+        changed = []
+        for field, raw in zip(self.fields, raws):
+            if raw is None or raw == '':
+                if snapshot and self._valid[field][row]:
+                    self._valid[field][row] = 0
+                    changed.append(field)
+                continue
+            try:
+                value = float(raw)
+            except (TypeError, ValueError):
+                continue
+            valid = self._valid[field]
+            column = self._values[field]
+            if valid[row] and column[row] == value:
+                continue
+            column[row] = value
+            valid[row] = 1
+            changed.append(field)
+        if ts:
+            self._ts[row] = ts
+        if received:
+            self._seen[row] = received
+        return changed
+
+    def mark_stale(self, symbols):
+        # Поток по символам прервался: строки устаревшие до следующего сообщения
+        rows = [self.row_of[s] for s in symbols if s in self.row_of]
+        for row in rows:
+            self._seen[row] = 0
+        return rows
+
+    def price_decimals(self, symbol):
+        return self.decimals.get(symbol)
+
+    def is_stale(self, symbol):
+        return self._seen[self.row_of[symbol]] < self.stale_cutoff
+
+    def stale_mask(self, cutoff=None):
+        cutoff = self.stale_cutoff if cutoff is None else cutoff
+        return self.seen[:len(self.symbols)] < cutoff
+
+    def get(self, row, field):
+        valid = self._valid.get(field)
+        if valid is None or not valid[row]:
+            return None
+        return self._values[field][row]
+
+    def funding_left(self, row):
+        now = self.funding_now or self._ts[row]
+        if 'nextFundingTime' not in self._valid or not self._valid['nextFundingTime'][row] or not now:
+            return None
+        return max(int(self._values['nextFundingTime'][row]) - now, 0)
+
+    def value(self, symbol, field):
+        # Типизированное значение ячейки для отображения; None — значения нет
+        if field == 'symbol':
+            return symbol
+        if field == 'type':
+            return self.type_label
+        row = self.row_of[symbol]
+        if field == FUNDING_INFO:
+            return (self.get(row, 'fundingRate'), self.funding_left(row))
+        if field == FUNDING_LEFT:
+            return self.funding_left(row)
+        if field in self.derived:
+            column = self.derived[field]
+            if row >= len(column) or column[row] != column[row]:
+                return None
+            return float(column[row])
+        return self.get(row, field)
+
+    def column(self, field):
+        # (значения, маска валидности) в порядке keys(); None для строковых полей
+        n = len(self.symbols)
+        if field == FUNDING_INFO:
+            field = 'fundingRate'
+        if field == FUNDING_LEFT:
+            if 'nextFundingTime' not in self.values:
+                return np.zeros(n), np.zeros(n, dtype=bool)
+            if self.funding_now:
+                return np.maximum(self.values['nextFundingTime'][:n] - self.funding_now, 0), self.valid['nextFundingTime'][:n]
+            valid = self.valid['nextFundingTime'][:n] & (self.ts[:n] > 0)
+            left = np.maximum(self.values['nextFundingTime'][:n] - self.ts[:n], 0)
+            return left, valid
+        if field in self.derived and len(self.derived[field]) == n:
+            values = self.derived[field]
+            return values, ~np.isnan(values)
+        if field not in self.values:
+            if field in ('symbol', 'type'):
+                return None
+            return np.zeros(n), np.zeros(n, dtype=bool)
+        return self.values[field][:n], self.valid[field][:n]
+
+    def memory_bytes(self):
+        return sum(a.nbytes for a in self.values.values()) + sum(a.nbytes for a in self.valid.values()) + self.ts.nbytes
+
+
+class JoinedStores:
+    # Несколько хранилищ как один источник строк, без копирования строк в словари:
+    # ключ — symbol + суффикс хранилища, колонки — склейка колонок хранилищ по порядку
+
+    def __init__(self, parts):
+        self.parts = list(parts)  # [(TickerStore, суффикс)]
+        self._sizes = None
+        self._keys = []
+        self._where = {}  # key -> (store, symbol)
+        self._pos = {}    # key -> номер строки
+
+    def _sync(self):
+        # Набор ключей пересобирается только при появлении новых символов
+        sizes = [len(store) for store, _ in self.parts]
+        if sizes == self._sizes:
+            return
+        self._sizes = sizes
+        self._keys = []
+        self._where = {}
+        for store, suffix in self.parts:
+            for symbol in store.symbols:
+                key = symbol + suffix
+                self._keys.append(key)
+                self._where[key] = (store, symbol)
+        self._pos = {key: i for i, key in enumerate(self._keys)}
+
+    def __len__(self):
+        return sum(len(store) for store, _ in self.parts)
+
+    def __contains__(self, key):
+        self._sync()
+        return key in self._where
+
+    def keys(self):
+        self._sync()
+        return self._keys
+
+    def positions(self, keys):
+        # Номера строк ключей в порядке keys()
+        self._sync()
+        pos = self._pos
+        return np.fromiter((pos[k] for k in keys), dtype=np.int64, count=len(keys))
+
+    def value(self, key, field):
+        store, symbol = self._where[key]
+        return store.value(symbol, field)
+
+    def is_stale(self, key):
+        store, symbol = self._where[key]
+        return store.is_stale(symbol)
+
+    def price_decimals(self, key):
+        store, symbol = self._where[key]
+        return store.price_decimals(symbol)
+
+    def column(self, field):
+        columns = [store.column(field) for store, _ in self.parts]
+        if any(c is None for c in columns):
+            return None
+        return np.concatenate([c[0] for c in columns]), np.concatenate([c[1] for c in columns])
+
+
+class PairLink:
+    # Пары спот / бессрочный контракт с одинаковым символом (BTCUSDT и BTCUSDT):
+    # номера строк пары в обоих хранилищах и базис, считаемый векторно по колонкам lastPrice.
+    # Контракты с множителем (1000PEPEUSDT) пары не получают
+
+    def __init__(self, spot, fut):
+        self.spot = spot
+        self.fut = fut
+        self.fut_to_spot = np.zeros(0, dtype=np.int64)  # строка фьючерса -> строка спота или -1
+        self._sizes = (0, 0)
+
+    def _link(self):
+        sizes = (len(self.spot), len(self.fut))
+        if sizes == self._sizes:
+            return
+        self._sizes = sizes
+        row_of = self.spot.row_of
+        self.fut_to_spot = np.fromiter((row_of.get(s, -1) for s in self.fut.symbols), dtype=np.int64, count=sizes[1])
+
+    def pairs(self):
+        return int((self.fut_to_spot >= 0).sum())
+
+    def update(self):
+        # Пересчитывает базис в derived обоих хранилищ; -> (строки спота, строки фьючерсов) с изменениями
+        self._link()
+        spot_price, spot_ok = self.spot.column('lastPrice')
+        fut_price, fut_ok = self.fut.column('lastPrice')
+        fut_rows = np.flatnonzero(self.fut_to_spot >= 0)
+        spot_rows = self.fut_to_spot[fut_rows]
+        ok = fut_ok[fut_rows] & spot_ok[spot_rows] & (spot_price[spot_rows] > 0)
+        fut_basis = np.full(len(self.fut), np.nan)
+        fut_basis[fut_rows[ok]] = fut_price[fut_rows[ok]] / spot_price[spot_rows[ok]] - 1
+        spot_basis = np.full(len(self.spot), np.nan)
+        spot_basis[spot_rows] = fut_basis[fut_rows]
+        return tuple(replace_derived(store, BASIS, basis) for store, basis in ((self.spot, spot_basis), (self.fut, fut_basis)))
+
+
+def replace_derived(store, field, values):
+    # Номера строк, где значение изменилось (NaN == NaN)
+    old = store.derived.get(field)
+    store.derived[field] = values
+    if old is None or len(old) != len(values):
+        return np.flatnonzero(~np.isnan(values))
+    return np.flatnonzero((old != values) & ~(np.isnan(old) & np.isnan(values)))
+
+
+class StoreDiff:
+    # Изменения одного хранилища за кадр: новые символы (в порядке строк),
+    # по каждому полю — номера строк и последние значения (NaN — значение сброшено),
+    # плюс ts биржи и время приёма затронутых строк и изменившаяся точность цен
+
+    def __init__(self, new_symbols=(), fields=None, ts_rows=None, ts_values=None, seen_values=None, decimals=None):
+        self.new_symbols = list(new_symbols)
+        self.decimals = decimals or {}  # symbol -> знаков в цене
+        self.fields = fields or {}  # field -> (rows int64, values float64)
+        self.ts_rows = ts_rows if ts_rows is not None else np.zeros(0, dtype=np.int64)
+        self.ts_values = ts_values if ts_values is not None else np.zeros(0, dtype=np.int64)
+        self.seen_values = seen_values if seen_values is not None else np.zeros(len(self.ts_rows), dtype=np.int64)
+
+    def __bool__(self):
+        return bool(self.new_symbols or self.fields or len(self.ts_rows) or self.decimals)
+
+    def cells(self):
+        return sum(len(rows) for rows, _ in self.fields.values())
+
+
+class DiffTracker:
+    # Копит изменённые строки хранилища между публикациями (последнее значение побеждает)
+
+    def __init__(self, store):
+        self.store = store
+        self.new_symbols = []
+        self.rows = {}        # field -> set(row)
+        self.touched = set()  # строки, по которым пришло сообщение
+        self.updates = 0      # сообщений с изменениями с прошлой публикации
+        self.decimals = {}
+
+    def add_symbols(self, symbols):
+        before = len(self.store)
+        self.store.add_symbols(symbols)
+        self.new_symbols.extend(self.store.symbols[before:])
+
+    def update(self, symbol, data, ts=None, received=None, snapshot=False):
+        return self.update_values(symbol, tuple(map(data.get, self.store.fields)), ts, received, snapshot)
+
+    def restore(self, snapshot):
+        # Значения из снимка прошлого запуска: только для известных символов и строк без живых данных.
+        # Время приёма не ставится (seen = 0), поэтому строки устаревшие до первого сообщения
+        store = self.store
+        pairs = [(i, store.row_of[s]) for i, s in enumerate(snapshot.symbols) if s in store.row_of]
+        if not pairs:
+            return 0
+        src, dst = (np.array(x, dtype=np.int64) for x in zip(*pairs))
+        fresh = store.seen[dst] == 0
+        src, dst = src[fresh], dst[fresh]
+        for field in store.fields:
+            if field not in snapshot.values:
+                continue
+            valid = snapshot.valid[field][src]
+            store.values[field][dst] = snapshot.values[field][src]
+            store.valid[field][dst] = valid
+            self.rows.setdefault(field, set()).update(dst[valid].tolist())
+        store.ts[dst] = snapshot.ts[src]
+        self.touched.update(dst.tolist())
+        return len(dst)
+
+    def set_decimals(self, decimals):
+        # Передаём потребителю только изменившуюся точность
+        changed = {s: d for s, d in decimals.items() if s in self.store and self.store.decimals.get(s) != d}
+        self.store.decimals.update(changed)
+        self.decimals.update(changed)
+
+    def mark_stale(self, symbols):
+        self.touched.update(self.store.mark_stale(symbols))
+
+    def update_values(self, symbol, raws, ts=None, received=None, snapshot=False):
+        changed = self.store.update_values(symbol, raws, ts, received, snapshot)
+        row = self.store.row_of.get(symbol)
+        if row is None:
+            return changed
+        self.touched.add(row)
+        if changed:
+            self.updates += 1
+        for field in changed:
+            self.rows.setdefault(field, set()).add(row)
+        return changed
+
+    def set_column(self, field, rows, values):
+        # Числовое поле, которое считает сам движок (стакан, сделки): values по строкам rows, NaN — значения нет.
+        # -> строки, где значение изменилось
+        store = self.store
+        valid = ~np.isnan(values)
+        changed = (valid != store.valid[field][rows]) | (valid & (values != store.values[field][rows]))
+        rows = rows[changed]
+        store.values[field][rows] = values[changed]
+        store.valid[field][rows] = valid[changed]
+        if len(rows):
+            self.rows.setdefault(field, set()).update(rows.tolist())
+        return rows
+
+    def take(self):
+        # Собирает StoreDiff из накопленного и очищает трекер
+        store = self.store
+        fields = {}
+        for field, rows in self.rows.items():
+            rows = np.fromiter(rows, dtype=np.int64, count=len(rows))
+            rows.sort()
+            fields[field] = (rows, np.where(store.valid[field][rows], store.values[field][rows], np.nan))
+        ts_rows = np.fromiter(self.touched, dtype=np.int64, count=len(self.touched))
+        ts_rows.sort()
+        diff = StoreDiff(self.new_symbols, fields, ts_rows, store.ts[ts_rows], store.seen[ts_rows], self.decimals)
+        self.new_symbols = []
+        self.decimals = {}
+        self.rows = {}
+        self.touched = set()
+        self.updates = 0
+        return diff
+
+
+def apply_diff(store, diff):
+    # Применяет StoreDiff к хранилищу-копии. Возвращает symbol -> set(полей) для перерисовки
+    if diff.new_symbols:
+        store.add_symbols(diff.new_symbols)
+    dirty = {}
+    symbols = store.symbols
+    for field, (rows, values) in diff.fields.items():
+        store.values[field][rows] = values
+        store.valid[field][rows] = ~np.isnan(values)
+        for row in rows.tolist():
+            dirty.setdefault(symbols[row], set()).add(field)
+    if len(diff.ts_rows):
+        store.ts[diff.ts_rows] = diff.ts_values
+        store.seen[diff.ts_rows] = diff.seen_values
+    if diff.decimals:
+        store.decimals.update(diff.decimals)
+        prices = [f for f in PRICE_FIELDS if f in store.values]
+        for symbol in diff.decimals:
+            dirty.setdefault(symbol, set()).update(prices)
+    return dirty
@@ -0,0 +1,88 @@
+from array import array
+
+import numpy as np
+
+from ticker_store import TRADES_1M, FLOW_1M
+
+# Лента сделок Bybit v5 (publicTrade.{symbol}) в скользящем окне по часам биржи (T сделки):
+# по символу — кольцо посекундных корзин с числом сделок и разностью покупок и продаж
+# в котируемой валюте. Сделка — два сложения в array('d'); суммы окна считаются векторно
+# по всем символам раз в публикацию движка, и только если были сделки или сменилась секунда
+TRADE_WINDOW_S = 60
+
+
+class TradeFlow:
+    # Корзины одной категории: строка хранилища x секунда окна, построчно в плоских array('d')
+
+    def __init__(self, tracker, window_s=TRADE_WINDOW_S):
+        self.tracker = tracker
+        self.slots = window_s
+        self.rows = 0
+        self._counts = array('d')
+        self._flow = array('d')
+        self.head = None  # последняя секунда окна (ts биржи // 1000)
+        self.changed = False
+        self.trades = 0
+        self.late = 0  # сделки старше окна
+
+    def _ensure_rows(self):
+        # Строки добавляются в конец, поэтому буферы лишь удлиняются
+        rows = self.tracker.store.capacity
+        if rows <= self.rows:
+            return
+        extra = bytes(8 * (rows - self.rows) * self.slots)
+        self._counts = self._counts + array('d', extra)
+        self._flow = self._flow + array('d', extra)
+        self.rows = rows
+
+    def _views(self):
+        return (np.frombuffer(self._counts, dtype=np.float64).reshape(-1, self.slots),
+                np.frombuffer(self._flow, dtype=np.float64).reshape(-1, self.slots))
+
+    def _advance(self, second):
+        # Новые секунды окна: их корзины обнуляются у всех символов (не больше оборота кольца)
+        self._ensure_rows()
+        if self.head is not None:
+            counts, flow = self._views()
+            for s in range(self.head + 1, min(second, self.head + self.slots) + 1):
+                counts[:, s % self.slots] = 0
+                flow[:, s % self.slots] = 0
+        self.head = second
+        self.changed = True
+
+    def add(self, trades):
+        # trades — [(symbol, T, сторона, объём, цена)] от декодера
+        row_of = self.tracker.store.row_of
+        slots = self.slots
+        for symbol, ts, side, size, price in trades:
+            row = row_of.get(symbol)
+            if row is None or not ts:
+                continue
+            second = ts // 1000
+            if self.head is None or second > self.head:
+                self._advance(second)
+            elif second <= self.head - slots:
+                self.late += 1
+                continue
+            if row >= self.rows:
+                self._ensure_rows()
+            i = row * slots + second % slots
+            value = float(size) * float(price)
+            self._counts[i] += 1
+            self._flow[i] += value if side == 'Buy' else -value
+            self.trades += 1
+            self.changed = True
+
+    def flush(self, now=None):
+        # now — время биржи, мс: окно сдвигается и без сделок, старые корзины уходят из сумм
+        if now and self.head is not None and now // 1000 > self.head:
+            self._advance(now // 1000)
+        if not self.changed:
+            return
+        self.changed = False
+        self._ensure_rows()
+        n = len(self.tracker.store)
+        counts, flow = self._views()
+        rows = np.arange(n)
+        self.tracker.set_column(TRADES_1M, rows, counts[:n].sum(axis=1))
+        self.tracker.set_column(FLOW_1M, rows, flow[:n].sum(axis=1))
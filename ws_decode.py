@@ -0,0 +1,175 @@
+import json
+from operator import attrgetter
+from typing import List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+from ticker_store import SPOT_TICKER_FIELDS, FUT_TICKER_FIELDS
+
+# Категории Bybit v5 и поля тикеров, которые из них читаются
+TICKER_FIELDS = {
+    'spot': SPOT_TICKER_FIELDS,
+    'linear': FUT_TICKER_FIELDS,
+}
+
+
+def _dict_ticker_getter(fields):
+    # (symbol, значения полей в порядке fields); отсутствующие поля — None
+    keys = ('symbol',) + tuple(fields)
+    return lambda data: tuple(map(data.get, keys))
+
+
+DICT_TICKER_GETTERS = {category: _dict_ticker_getter(fields) for category, fields in TICKER_FIELDS.items()}
+
+
+def dict_book(data):
+    # orderbook.{depth}.{symbol}: (symbol, биды, аски, u); уровни — пары строк [цена, объём], объём "0" — удалить
+    return data.get('s'), data.get('b') or (), data.get('a') or (), data.get('u') or 0
+
+
+def dict_trades(data):
+    # publicTrade.{symbol}: [(symbol, T, сторона, объём, цена)] — строки как пришли
+    return [(t.get('s'), t.get('T'), t.get('S'), t.get('v'), t.get('p')) for t in data]
+
+
+class JsonDecoder:
+    # Кадр -> (topic, ts, type, data, frame). data — то, что потом разбирает обработчик темы
+    name = 'json'
+
+    def __init__(self):
+        self._loads = json.loads
+
+    def frame(self, raw):
+        f = self._loads(raw)
+        return f.get('topic'), f.get('ts'), f.get('type'), f.get('data'), f
+
+    def ticker_getter(self, category):
+        return DICT_TICKER_GETTERS[category]
+
+    def book_getter(self, category):
+        return dict_book
+
+    def trades_getter(self, category):
+        return dict_trades
+
+    def op(self, frame):
+        # Ответ на операцию (subscribe/ping): (op, success, req_id, ret_msg)
+        return frame.get('op'), frame.get('success'), frame.get('req_id'), frame.get('ret_msg')
+
+
+class OrjsonDecoder(JsonDecoder):
+    name = 'orjson'
+
+    def __init__(self):
+        self._loads = orjson.loads
+
+
+if msgspec is not None:
+    class Frame(msgspec.Struct):
+        # Общая оболочка кадра; data остаётся сырым и разбирается схемой темы.
+        # Raw не бывает Optional: кадр без data — пустой Raw, frame() отдаёт вместо него None
+        topic: Optional[str] = None
+        ts: int = 0
+        type: str = ''
+        data: msgspec.Raw = msgspec.Raw()
+        op: Optional[str] = None
+        success: Optional[bool] = None
+        req_id: Optional[str] = None
+        ret_msg: str = ''
+
+    class SpotTicker(msgspec.Struct):
+        # tickers.{symbol}, category=spot; null в поле — как отсутствующее поле
+        symbol: str
+        lastPrice: Optional[str] = None
+        price24hPcnt: Optional[str] = None
+        volume24h: Optional[str] = None
+        turnover24h: Optional[str] = None
+        highPrice24h: Optional[str] = None
+        lowPrice24h: Optional[str] = None
+
+    class LinearTicker(msgspec.Struct):
+        # tickers.{symbol}, category=linear; в delta приходят только изменившиеся поля
+        symbol: str
+        lastPrice: Optional[str] = None
+        price24hPcnt: Optional[str] = None
+        volume24h: Optional[str] = None
+        turnover24h: Optional[str] = None
+        markPrice: Optional[str] = None
+        indexPrice: Optional[str] = None
+        openInterestValue: Optional[str] = None
+        fundingRate: Optional[str] = None
+        nextFundingTime: Optional[str] = None
+
+    TICKER_SCHEMAS = {'spot': SpotTicker, 'linear': LinearTicker}
+
+    class BookData(msgspec.Struct):
+        # orderbook.{depth}.{symbol}; seq, cts и прочее пропускаются
+        s: str
+        b: List[Tuple[str, str]] = msgspec.field(default_factory=list)
+        a: List[Tuple[str, str]] = msgspec.field(default_factory=list)
+        u: int = 0
+
+    class Trade(msgspec.Struct):
+        # Элемент data в publicTrade.{symbol}
+        s: str
+        S: str
+        v: str
+        p: str
+        T: int = 0
+
+    class MsgspecDecoder:
+        # Типизированные схемы: лишние поля кадра пропускаются без создания объектов
+        name = 'msgspec'
+
+        def __init__(self):
+            self._frame = msgspec.json.Decoder(Frame).decode
+
+        def frame(self, raw):
+            f = self._frame(raw)
+            return f.topic, f.ts, f.type, f.data or None, f
+
+        def ticker_getter(self, category):
+            decode = msgspec.json.Decoder(TICKER_SCHEMAS[category]).decode
+            get = attrgetter('symbol', *TICKER_FIELDS[category])
+            return lambda data: get(decode(data))
+
+        def book_getter(self, category):
+            decode = msgspec.json.Decoder(BookData).decode
+            get = attrgetter('s', 'b', 'a', 'u')
+            return lambda data: get(decode(data))
+
+        def trades_getter(self, category):
+            decode = msgspec.json.Decoder(List[Trade]).decode
+            return lambda data: [(t.s, t.T, t.S, t.v, t.p) for t in decode(data)]
+
+        def op(self, frame):
+            return frame.op, frame.success, frame.req_id, frame.ret_msg
+
+
+# Ошибки разбора одного кадра (битый JSON, null или не тот тип в поле): кадр пропускается, соединение живёт
+MALFORMED_ERRORS = (ValueError, TypeError, KeyError, AttributeError)
+if msgspec is not None:
+    MALFORMED_ERRORS += (msgspec.DecodeError,)
+
+DECODERS = {'json': JsonDecoder}
+if orjson is not None:
+    DECODERS['orjson'] = OrjsonDecoder
+if msgspec is not None:
+    DECODERS['msgspec'] = MsgspecDecoder
+
+
+def get_decoder(name=None):
+    # Самый быстрый из установленных: msgspec, затем orjson, затем stdlib json
+    if name is not None:
+        return DECODERS[name]()
+    for name in ('msgspec', 'orjson', 'json'):
+        if name in DECODERS:
+            return DECODERS[name]()
@@ -1,564 +1,931 @@
-import sys
-import asyncio
-import aiohttp
-from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget, QLabel, QHBoxLayout, QTabWidget, QHeaderView, QPushButton, QCheckBox
-)
-from PyQt5.QtCore import QTimer, Qt, QUrl
-from datetime import datetime
-from PyQt5.QtGui import QColor, QPalette
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5.QtWidgets import QDialog
-import os
-import webbrowser
-
-SPOT_WS_URL = "wss://stream.bybit.com/v5/public/spot"
-SPOT_SYMBOLS_URL = "https://api.bybit.com/v5/market/instruments-info?category=spot"
-FUT_WS_URL = "wss://stream.bybit.com/v5/public/linear"
-FUT_SYMBOLS_URL = "https://api.bybit.com/v5/market/instruments-info?category=linear"
-
-# Индексы колонок с числами для сортировки
-NUMERIC_COLS_ALL = {2, 3, 4, 5, 6, 7, 8, 9}
-NUMERIC_COLS_SPOT = {1, 2, 3, 4}
-NUMERIC_COLS_FUT = {1, 2, 3, 4, 5, 6, 7, 8}
-
-COLUMNS_ALL = [
-    "Тикер", "Тип", "Последняя цена", "% за 24ч", "Объём 24ч", "Оборот 24ч", "Mark Price", "Index Price", "Открытый интерес", "Ставка / Отсчет до"
-]
-COLUMNS_SPOT = [
-    "Тикер", "Последняя цена", "% за 24ч", "Объём 24ч", "Оборот 24ч", "Ставка / Отсчет до"
-]
-COLUMNS_FUT = [
-    "Тикер", "Последняя цена", "% за 24ч", "Объём 24ч", "Оборот 24ч", "Mark Price", "Index Price", "Открытый интерес", "Ставка / Отсчет до"
-]
-
-COLUMN_KEYS_ALL = [
-    'symbol', 'type', 'lastPrice', 'price24hPcnt', 'volume24h', 'turnover24h', 'markPrice', 'indexPrice', 'openInterestValue', 'funding_info'
-]
-COLUMN_KEYS_SPOT = [
-    'symbol', 'lastPrice', 'price24hPcnt', 'volume24h', 'turnover24h', 'funding_info'
-]
-COLUMN_KEYS_FUT = [
-    'symbol', 'lastPrice', 'price24hPcnt', 'volume24h', 'turnover24h', 'markPrice', 'indexPrice', 'openInterestValue', 'funding_info'
-]
-
-def format_ts(ts):
-    return datetime.utcfromtimestamp(ts / 1000).strftime('%H:%M:%S') if ts else ''
-
-def format_percent(val):
-    try:
-        return f"{float(val) * 100:.2f}%"
-    except Exception:
-        return val
-
-def format_money(val):
-    try:
-        return f"{float(val):,.2f}".replace(",", " ")
-    except Exception:
-        return val
-
-def get_tradingview_symbol(symbol, type_):
-    if type_ == 'futures':
-        return f"BYBIT:{symbol}.P"
-    else:
-        return f"BYBIT:{symbol}"
-
-class CustomHeader(QHeaderView):
-    def __init__(self, orientation, parent=None):
-        super().__init__(orientation, parent)
-        self.setSectionsClickable(True)
-        self.setHighlightSections(False)
-    def paintSection(self, painter, rect, logicalIndex):
-        from PyQt5.QtGui import QBrush
-        from PyQt5.QtCore import QRect
-        painter.save()
-        painter.fillRect(rect, QBrush(QColor(35, 38, 41)))
-        painter.setPen(QColor(224, 224, 224))
-        text = self.model().headerData(logicalIndex, self.orientation(), Qt.DisplayRole)
-        painter.drawText(rect, Qt.AlignCenter, str(text))
-        painter.restore()
-
-class FundingAlertDialog(QDialog):
-    def __init__(self, ticker, time_left, parent=None):
-        super().__init__(parent)
-        self.setWindowFlags(self.windowFlags() | Qt.FramelessWindowHint | Qt.Tool)
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        self.setStyleSheet("background: #232629; color: #fff; border-radius: 8px; padding: 16px;")
-        self.setFixedSize(320, 80)
-        layout = QVBoxLayout(self)
-        label = QLabel(f"<b>{ticker}</b>: до фандинга осталось <b>{time_left}</b>")
-        label.setStyleSheet("font-size: 18px;")
-        layout.addWidget(label)
-        self.timer = QTimer(self)
-        self.timer.setSingleShot(True)
-        self.timer.timeout.connect(self.accept)
-        self.timer.start(5000)  # 5 секунд показываем
-
-    def showEvent(self, event):
-        super().showEvent(event)
-        # Позиционируем в левый нижний угол
-        parent = self.parentWidget() or self.window()
-        if parent:
-            geo = parent.geometry()
-            self.move(geo.x() + 20, geo.y() + geo.height() - self.height() - 20)
-
-class ScreenerTab(QWidget):
-    def __init__(self, columns, column_keys, numeric_cols, parent=None, funding_alerts_enabled_ref=None):
-        super().__init__(parent)
-        self.table = QTableWidget(0, len(columns))
-        # Заменяем стандартный заголовок на кастомный
-        self.table.setHorizontalHeader(CustomHeader(Qt.Horizontal, self.table))
-        self.table.setHorizontalHeaderLabels(columns)
-        self.table.setSortingEnabled(False)  # Отключаем сортировку Qt полностью
-        self.table.setSelectionMode(QTableWidget.NoSelection)  # Полностью убираем выделение
-        self.table.verticalHeader().setVisible(False)  # Скрываем нумерацию строк
-        layout = QVBoxLayout()
-        # --- Добавляем чекбокс в заголовок колонки 'Фандинг / До списания' ---
-        self.funding_alerts_enabled_ref = funding_alerts_enabled_ref
-        header_layout = QHBoxLayout()
-        header_layout.addStretch(1)
-        if self.funding_alerts_enabled_ref is not None:
-            self.alert_checkbox = QCheckBox("Уведомлять о фандинге")
-            self.alert_checkbox.setChecked(self.funding_alerts_enabled_ref[0])
-            self.alert_checkbox.stateChanged.connect(self.on_alert_checkbox_changed)
-            header_layout.addWidget(self.alert_checkbox)
-        layout.addLayout(header_layout)
-        layout.addWidget(self.table)
-        self.setLayout(layout)
-        self.column_keys = column_keys
-        self.numeric_cols = numeric_cols
-        self.current_sort_col = None  # None — сортировки нет
-        self.current_sort_order = Qt.DescendingOrder
-        self.sorted_symbols = []  # Фиксируется только по клику
-        self.data_cache = {}  # symbol -> data dict
-        self.table.horizontalHeader().sectionClicked.connect(self.handle_sort)
-        self._last_symbols = []  # для сохранения порядка без сортировки
-        self.table.horizontalHeader().setFocusPolicy(Qt.NoFocus)  # Отключаем фокус у заголовка
-        self.table.cellClicked.connect(self.handle_cell_click)
-        self._alerted_symbols = set()
-
-    def on_alert_checkbox_changed(self, state):
-        if self.funding_alerts_enabled_ref is not None:
-            self.funding_alerts_enabled_ref[0] = bool(state)
-
-    def handle_cell_click(self, row, col):
-        if self.column_keys[col] == 'symbol':
-            symbol = self.table.item(row, col).text()
-            # Определяем тип тикера (spot/futures) из строки
-            type_col = self.column_keys.index('type') if 'type' in self.column_keys else None
-            type_ = self.table.item(row, type_col).text() if type_col is not None else 'spot'
-            tv_symbol = get_tradingview_symbol(symbol, type_)
-            dlg = ChartDialog(tv_symbol, self)
-            dlg.exec_()
-
-    def update_data(self, data_cache):
-        # Только обновляем значения, не сбрасываем порядок строк
-        self.data_cache = data_cache.copy()
-        self.refresh_table()
-
-    def refresh_table(self):
-        # Если сортировка выбрана — фиксируем порядок только по клику
-        if self.current_sort_col is not None and self.sorted_symbols:
-            pass
-        else:
-            # Добавляем новые тикеры в конец
-            for k in self.data_cache.keys():
-                if k not in self._last_symbols:
-                    self._last_symbols.append(k)
-            # Удаляем исчезнувшие тикеры
-            self._last_symbols = [k for k in self._last_symbols if k in self.data_cache]
-            self.sorted_symbols = self._last_symbols.copy()
-        self.table.setRowCount(len(self.sorted_symbols))
-        for row, symbol in enumerate(self.sorted_symbols):
-            d = self.data_cache.get(symbol, {})
-            for col, key in enumerate(self.column_keys):
-                value = d.get(key, '')
-                # Форматируем только для отображения
-                if key == 'funding_info':
-                    value = d.get('funding_info', '')
-                if key == 'price24hPcnt' and value not in ('', None):
-                    try:
-                        percent = float(value) * 100
-                        value = f"{percent:.2f}%"
-                    except Exception:
-                        pass
-                elif key == 'turnover24h' and value not in ('', None):
-                    try:
-                        value = f"{float(value):,.2f}".replace(",", " ")
-                    except Exception:
-                        pass
-                elif key in ('markPrice', 'indexPrice', 'lastPrice') and value not in ('', None):
-                    try:
-                        value = f"{float(value):.6f}" if float(value) < 100 else f"{float(value):.2f}"
-                    except Exception:
-                        pass
-                elif key == 'openInterestValue' and value not in ('', None):
-                    try:
-                        value = f"{float(value):,.2f}".replace(",", " ")
-                    except Exception:
-                        pass
-                item = QTableWidgetItem(str(value))
-                if col in self.numeric_cols:
-                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                # Цвет процентов
-                if key == 'price24hPcnt' and d.get(key, '') not in ('', None):
-                    try:
-                        percent = float(d.get(key, '')) * 100
-                        if percent > 0:
-                            item.setForeground(QColor(0, 200, 0))
-                        elif percent < 0:
-                            item.setForeground(QColor(220, 40, 40))
-                    except Exception:
-                        pass
-                self.table.setItem(row, col, item)
-        # После обновления таблицы проверяем условия для уведомлений
-        self.check_funding_alerts()
-
-    def handle_sort(self, col):
-        if self.current_sort_col == col:
-            self.current_sort_order = Qt.AscendingOrder if self.current_sort_order == Qt.DescendingOrder else Qt.DescendingOrder
-        else:
-            self.current_sort_col = col
-            self.current_sort_order = Qt.DescendingOrder
-        # Фиксируем порядок строк только по клику
-        self.sorted_symbols = self.get_sorted_symbols(self.current_sort_col, self.current_sort_order)
-        self.refresh_table()
-        self.table.horizontalHeader().clearFocus()  # Сброс фокуса с заголовка
-        self.table.clearFocus()  # Сброс фокуса с таблицы
-
-    def get_sorted_symbols(self, col, order):
-        key = self.column_keys[col]
-        def sort_key(symbol):
-            d = self.data_cache.get(symbol, {})
-            val = d.get(key, '')
-            # Сортируем только по "сырым" числовым значениям (без форматирования)
-            if col in self.numeric_cols:
-                try:
-                    val = str(val).replace('%', '').replace(' ', '')
-                    return float(val)
-                except Exception:
-                    return float('-inf') if order == Qt.DescendingOrder else float('inf')
-            return val
-        # После сортировки фиксируем порядок до следующего клика
-        return sorted(self.data_cache.keys(), key=sort_key, reverse=(order == Qt.DescendingOrder))
-
-    def check_funding_alerts(self):
-        if not self.funding_alerts_enabled_ref or not self.funding_alerts_enabled_ref[0]:
-            self._alerted_symbols.clear()
-            return
-        for symbol, d in self.data_cache.items():
-            # Только для фьючерсов
-            if d.get('type', 'futures') != 'futures':
-                continue
-            funding_info = d.get('funding_info', '')
-            if not funding_info or '/' not in funding_info:
-                continue
-            try:
-                time_str = funding_info.split('/')[-1].strip()
-                h, m, s = map(int, time_str.split(':'))
-                total_sec = h * 3600 + m * 60 + s
-            except Exception:
-                continue
-            if 0 < total_sec <= 300 and symbol not in self._alerted_symbols:
-                dlg = FundingAlertDialog(d.get('symbol', symbol), time_str, self)
-                dlg.show()
-                self._alerted_symbols.add(symbol)
-            elif total_sec > 300 and symbol in self._alerted_symbols:
-                self._alerted_symbols.remove(symbol)
-
-class ChartDialog(QDialog):
-    def __init__(self, tv_symbol, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle(f"График {tv_symbol}")
-        self.resize(400, 150)
-        layout = QVBoxLayout(self)
-        label = QLabel(f"График будет открыт во внешнем браузере:\n{tv_symbol}")
-        layout.addWidget(label)
-        btn = QPushButton("Открыть график в браузере")
-        btn.setStyleSheet("""
-            QPushButton {
-                background-color: #444;
-                color: #fff;
-                font-weight: bold;
-                font-size: 16px;
-                border-radius: 6px;
-                padding: 10px 20px;
-                margin-top: 20px;
-            }
-            QPushButton:hover {
-                background-color: #666;
-            }
-        """)
-        layout.addWidget(btn)
-        url = f"https://www.tradingview.com/chart/?symbol={tv_symbol}"
-        btn.clicked.connect(lambda: webbrowser.open(url))
-
-class SpotFuturesScreener(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("Bybit Скринер (Спот и Фьючерсы, WebSocket, Mainnet)")
-        self.setGeometry(100, 100, 1600, 800)
-        self.funding_alerts_enabled = [True]  # Используем список для передачи по ссылке
-        self.tabs = QTabWidget()
-        self.tab_all = ScreenerTab(COLUMNS_ALL, COLUMN_KEYS_ALL, NUMERIC_COLS_ALL, parent=self, funding_alerts_enabled_ref=self.funding_alerts_enabled)
-        self.tab_spot = ScreenerTab(COLUMNS_SPOT, COLUMN_KEYS_SPOT, NUMERIC_COLS_SPOT, parent=self, funding_alerts_enabled_ref=self.funding_alerts_enabled)
-        self.tab_fut = ScreenerTab(COLUMNS_FUT, COLUMN_KEYS_FUT, NUMERIC_COLS_FUT, parent=self, funding_alerts_enabled_ref=self.funding_alerts_enabled)
-        self.tabs.addTab(self.tab_all, "Все")
-        self.tabs.addTab(self.tab_spot, "Спот")
-        self.tabs.addTab(self.tab_fut, "Фьючерсы")
-        self.time_label = QLabel("Время брокера: --:--:--")
-        self.time_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        top_layout = QHBoxLayout()
-        top_layout.addStretch(1)
-        top_layout.addWidget(self.time_label)
-        main_layout = QVBoxLayout()
-        main_layout.addLayout(top_layout)
-        main_layout.addWidget(self.tabs)
-        container = QWidget()
-        container.setLayout(main_layout)
-        self.setCentralWidget(container)
-        self.loop = asyncio.get_event_loop()
-        self.ws_timer = QTimer()
-        self.ws_timer.timeout.connect(self.process_events)
-        self.ws_timer.start(100)
-        self.refresh_timer = QTimer()
-        self.refresh_timer.timeout.connect(self.refresh_tables)
-        self.refresh_timer.start(1000)
-        self.loop.create_task(self.start_ws())
-        self.last_broker_ts = None
-        self.data_spot = {}  # symbol -> dict
-        self.data_fut = {}   # symbol -> dict
-        self.spot_symbols = []
-        self.fut_symbols = []
-
-    def process_events(self):
-        self.loop.call_soon(self.loop.stop)
-        self.loop.run_forever()
-
-    async def get_symbols(self, url):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                data = await resp.json()
-                return [x['symbol'] for x in data['result']['list']]
-
-    async def start_ws(self):
-        self.spot_symbols = await self.get_symbols(SPOT_SYMBOLS_URL)
-        self.fut_symbols = await self.get_symbols(FUT_SYMBOLS_URL)
-        # Инициализация data_spot для всех тикеров с пустыми значениями
-        for symbol in self.spot_symbols:
-            self.data_spot[symbol] = {
-                'symbol': symbol,
-                'lastPrice': '',
-                'price24hPcnt': '',
-                'volume24h': '',
-                'turnover24h': '',
-                'highPrice24h': '',
-                'lowPrice24h': '',
-            }
-        # Инициализация data_fut для всех тикеров с пустыми значениями
-        for symbol in self.fut_symbols:
-            self.data_fut[symbol] = {
-                'symbol': symbol,
-                'lastPrice': '',
-                'price24hPcnt': '',
-                'volume24h': '',
-                'turnover24h': '',
-                'markPrice': '',
-                'indexPrice': '',
-                'openInterestValue': '',
-                'fundingRate': '',
-                'nextFundingTime': '',
-                'funding_info': '',
-            }
-        self.loop.create_task(self.ws_spot(self.spot_symbols))
-        self.loop.create_task(self.ws_fut(self.fut_symbols))
-
-    async def ws_spot(self, symbols):
-        batch_size = 10
-        async with aiohttp.ClientSession() as session:
-            async with session.ws_connect(SPOT_WS_URL) as ws:
-                for i in range(0, len(symbols), batch_size):
-                    sub_msg = {
-                        "op": "subscribe",
-                        "args": [f"tickers.{s}" for s in symbols[i:i+batch_size]]
-                    }
-                    await ws.send_json(sub_msg)
-                async for msg in ws:
-                    if msg.type == aiohttp.WSMsgType.TEXT:
-                        self.handle_ws_msg(msg.json(), is_spot=True)
-                    elif msg.type == aiohttp.WSMsgType.ERROR:
-                        break
-
-    async def ws_fut(self, symbols):
-        batch_size = 10
-        async with aiohttp.ClientSession() as session:
-            async with session.ws_connect(FUT_WS_URL) as ws:
-                for i in range(0, len(symbols), batch_size):
-                    sub_msg = {
-                        "op": "subscribe",
-                        "args": [f"tickers.{s}" for s in symbols[i:i+batch_size]]
-                    }
-                    await ws.send_json(sub_msg)
-                async for msg in ws:
-                    if msg.type == aiohttp.WSMsgType.TEXT:
-                        self.handle_ws_msg(msg.json(), is_spot=False)
-                    elif msg.type == aiohttp.WSMsgType.ERROR:
-                        break
-
-    def handle_ws_msg(self, msg, is_spot):
-        if 'data' not in msg or 'topic' not in msg:
-            return
-        data = msg['data']
-        symbol = data.get('symbol')
-        if not symbol:
-            return
-        if is_spot:
-            spot = self.data_spot.get(symbol)
-            if spot is not None:
-                for key in ['lastPrice', 'price24hPcnt', 'volume24h', 'turnover24h', 'highPrice24h', 'lowPrice24h']:
-                    new_val = data.get(key)
-                    if new_val not in (None, ''):
-                        spot[key] = new_val
-        else:
-            fut = self.data_fut.get(symbol)
-            if fut is not None:
-                for key in ['lastPrice', 'price24hPcnt', 'volume24h', 'turnover24h', 'markPrice', 'indexPrice', 'openInterestValue', 'fundingRate', 'nextFundingTime']:
-                    new_val = data.get(key)
-                    if new_val not in (None, ''):
-                        fut[key] = new_val
-                # Формируем строку для funding_info
-                try:
-                    rate = float(fut.get('fundingRate', 0))
-                    rate_str = f"{rate * 100:.4f}%"
-                except Exception:
-                    rate_str = ''
-                try:
-                    ts = int(fut.get('nextFundingTime', 0))
-                    if ts:
-                        # Используем ts из текущего сообщения, если есть, иначе self.last_broker_ts, иначе локальное время
-                        now = data.get('ts', self.last_broker_ts or int(datetime.utcnow().timestamp() * 1000))
-                        delta = ts - now
-                        if delta > 0:
-                            hours = delta // 3600000
-                            minutes = (delta % 3600000) // 60000
-                            seconds = (delta % 60000) // 1000
-                            time_str = f"{hours:02}:{minutes:02}:{seconds:02}"
-                        else:
-                            time_str = "00:00:00"
-                    else:
-                        time_str = ''
-                except Exception:
-                    time_str = ''
-                fut['funding_info'] = f"{rate_str} / {time_str}" if rate_str or time_str else ''
-        if 'ts' in msg:
-            self.last_broker_ts = msg['ts']
-            self.time_label.setText(f"Время брокера: {format_ts(self.last_broker_ts)}")
-
-    def refresh_tables(self):
-        # Объединяем оба словаря для вкладки 'Все', добавляем поле 'type', всегда все тикеры
-        all_data = {}
-        for symbol in self.spot_symbols:
-            d = self.data_spot.get(symbol, {})
-            all_data[symbol + '_spot'] = {
-                'symbol': d.get('symbol', symbol),
-                'type': 'spot',
-                'lastPrice': d.get('lastPrice', ''),
-                'price24hPcnt': d.get('price24hPcnt', ''),
-                'volume24h': d.get('volume24h', ''),
-                'turnover24h': d.get('turnover24h', ''),
-                'highPrice24h': '',
-                'lowPrice24h': '',
-                'markPrice': '',
-                'indexPrice': '',
-                'openInterestValue': '',
-                'funding_info': '',
-            }
-        for symbol in self.fut_symbols:
-            d = self.data_fut.get(symbol, {})
-            all_data[symbol + '_fut'] = {
-                'symbol': d.get('symbol', symbol),
-                'type': 'futures',
-                'lastPrice': d.get('lastPrice', ''),
-                'price24hPcnt': d.get('price24hPcnt', ''),
-                'volume24h': d.get('volume24h', ''),
-                'turnover24h': d.get('turnover24h', ''),
-                'highPrice24h': '',
-                'lowPrice24h': '',
-                'markPrice': d.get('markPrice', ''),
-                'indexPrice': d.get('indexPrice', ''),
-                'openInterestValue': d.get('openInterestValue', ''),
-                'funding_info': d.get('funding_info', ''),
-            }
-        self.tab_all.update_data(all_data)
-        self.tab_spot.update_data(self.data_spot)
-        self.tab_fut.update_data(self.data_fut)
-
-def set_dark_theme(app):
-    dark_palette = QPalette()
-    dark_palette.setColor(QPalette.Window, QColor(35, 38, 41))
-    dark_palette.setColor(QPalette.WindowText, QColor(224, 224, 224))
-    dark_palette.setColor(QPalette.Base, QColor(35, 38, 41))
-    dark_palette.setColor(QPalette.AlternateBase, QColor(44, 47, 51))
-    dark_palette.setColor(QPalette.ToolTipBase, QColor(224, 224, 224))
-    dark_palette.setColor(QPalette.ToolTipText, QColor(224, 224, 224))
-    dark_palette.setColor(QPalette.Text, QColor(224, 224, 224))
-    dark_palette.setColor(QPalette.Button, QColor(44, 47, 51))
-    dark_palette.setColor(QPalette.ButtonText, QColor(224, 224, 224))
-    dark_palette.setColor(QPalette.BrightText, QColor(255, 0, 0))
-    dark_palette.setColor(QPalette.Highlight, QColor(35, 38, 41))  # тот же цвет, что и фон
-    dark_palette.setColor(QPalette.HighlightedText, QColor(224, 224, 224))
-    app.setPalette(dark_palette)
-    # Глобальный стиль для всех виджетов, вкладок и рамок
-    app.setStyleSheet("""
-        QWidget, QMainWindow, QTabWidget, QTabBar, QTableWidget, QScrollArea {
-            background-color: #232629;
-            color: #e0e0e0;
-            border: none;
-        }
-        QHeaderView::section:checked,
-        QHeaderView::section:pressed,
-        QHeaderView::section:focus,
-        QHeaderView::section:!active,
-        QHeaderView::section {
-            background: #232629;
-            color: #e0e0e0;
-            border: none;
-        }
-        QTabBar::tab {
-            background: #232629;
-            color: #e0e0e0;
-            border: 1px solid #444;
-            padding: 6px 16px;
-        }
-        QTabBar::tab:selected {
-            background: #444;
-            color: #fff;
-        }
-        QTabBar::tab:!selected {
-            background: #232629;
-            color: #b0b0b0;
-        }
-        QTabWidget::pane {
-            border: none;
-            background: #232629;
-        }
-        QScrollBar:vertical, QScrollBar:horizontal {
-            background: #232629;
-            border: none;
-        }
-        QTableCornerButton::section {
-            background: #232629;
-            border: none;
-        }
-        QTableWidget::item:selected, QTableView::item:selected {
-            background: transparent;
-            color: inherit;
-        }
-    """)
-
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    set_dark_theme(app)
-    window = SpotFuturesScreener()
-    window.show()
-    sys.exit(app.exec_()) 
+import argparse
+import json
+import sys
+import time
+from PyQt5.QtWidgets import (
+    QApplication, QMainWindow, QTableView, QVBoxLayout, QWidget, QLabel, QHBoxLayout, QTabWidget, QHeaderView, QPushButton, QCheckBox,
+    QLineEdit, QComboBox, QInputDialog, QPlainTextEdit, QDialogButtonBox
+)
+from PyQt5.QtCore import QTimer, Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QColor, QPalette
+from PyQt5.QtWidgets import QDialog
+import numpy as np
+
+from alerts import AlertDispatcher, ALERTS_PATH, save_alert_config
+from filters import RowFilter, FilterError, FILTER_FIELDS, load_saved_filters, save_saved_filters
+from history import HISTORY_BUDGET_MB, CHANGE_1M, CHANGE_5M, CHANGE_15M
+from ingest import IngestEngine
+from live_sort import LiveSortIndex
+from metrics import Histogram, MS_BUCKETS
+from shared_state import SharedStateError
+from screener_core import (
+    ScreenerCore, RefreshScheduler, DERIVED_INTERVAL, add_engine_args, make_engine, start_metrics_server, load_alerts, log_alerts, format_symbols,
+    COLUMN_KEYS_ALL, COLUMN_KEYS_SPOT, COLUMN_KEYS_FUT, format_ts, format_cell, sort_value, sorted_keys,
+)
+from ticker_store import FUNDING_INFO, IMBALANCE, FLOW_1M
+
+# Приём в отдельном потоке; False — в главном потоке через QtAsyncioBridge (ключ --ingest qt)
+INGEST_IN_THREAD = True
+
+# Индексы колонок с числами для сортировки
+NUMERIC_COLS_ALL = {2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19}
+NUMERIC_COLS_SPOT = {1, 2, 3, 4, 6, 7, 8, 9, 10, 11, 12, 13}
+NUMERIC_COLS_FUT = {1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18}
+
+# Колонки, окрашенные по знаку изменения
+COLORED_KEYS = ('price24hPcnt', CHANGE_1M, CHANGE_5M, CHANGE_15M, IMBALANCE, FLOW_1M)
+
+COLUMNS_ALL = [
+    "Тикер", "Тип", "Последняя цена", "% за 24ч", "Объём 24ч", "Оборот 24ч", "Mark Price", "Index Price", "Открытый интерес", "Ставка / Отсчет до", "Базис",
+    "% за 1м", "% за 5м", "% за 15м", "Волатильность 15м", "OI за 15м",
+    "Спред", "Дисбаланс стакана", "Сделок за 1м", "Поток 1м"
+]
+COLUMNS_SPOT = [
+    "Тикер", "Последняя цена", "% за 24ч", "Объём 24ч", "Оборот 24ч", "Ставка / Отсчет до",
+    "% за 1м", "% за 5м", "% за 15м", "Волатильность 15м",
+    "Спред", "Дисбаланс стакана", "Сделок за 1м", "Поток 1м"
+]
+COLUMNS_FUT = [
+    "Тикер", "Последняя цена", "% за 24ч", "Объём 24ч", "Оборот 24ч", "Mark Price", "Index Price", "Открытый интерес", "Ставка / Отсчет до", "Базис",
+    "% за 1м", "% за 5м", "% за 15м", "Волатильность 15м", "OI за 15м",
+    "Спред", "Дисбаланс стакана", "Сделок за 1м", "Поток 1м"
+]
+
+def get_tradingview_symbol(symbol, type_):
+    if type_ == 'futures':
+        return f"BYBIT:{symbol}.P"
+    else:
+        return f"BYBIT:{symbol}"
+
+class CustomHeader(QHeaderView):
+    def __init__(self, orientation, parent=None):
+        super().__init__(orientation, parent)
+        self.setSectionsClickable(True)
+        self.setHighlightSections(False)
+    def paintSection(self, painter, rect, logicalIndex):
+        from PyQt5.QtGui import QBrush
+        from PyQt5.QtCore import QRect
+        painter.save()
+        painter.fillRect(rect, QBrush(QColor(35, 38, 41)))
+        painter.setPen(QColor(224, 224, 224))
+        text = self.model().headerData(logicalIndex, self.orientation(), Qt.DisplayRole)
+        painter.drawText(rect, Qt.AlignCenter, str(text))
+        painter.restore()
+
+# Всплывающее окно показывает столько событий, остальные — одной строкой
+ALERT_POPUP_LINES = 5
+# Не чаще одного окна (и звука) за столько секунд; события между ними собираются в следующее окно
+ALERT_POPUP_INTERVAL = 5.0
+
+class AlertDialog(QDialog):
+    def __init__(self, alerts, parent=None):
+        super().__init__(parent)
+        self.setWindowFlags(self.windowFlags() | Qt.FramelessWindowHint | Qt.Tool)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setStyleSheet("background: #232629; color: #fff; border-radius: 8px; padding: 16px;")
+        self.setFixedWidth(420)
+        layout = QVBoxLayout(self)
+        lines = [f"<b>{alert.title}</b>: {format_symbols(alert.symbols)}" for alert in alerts[:ALERT_POPUP_LINES]]
+        if len(alerts) > ALERT_POPUP_LINES:
+            lines.append(f"и ещё {len(alerts) - ALERT_POPUP_LINES}")
+        label = QLabel("<br>".join(lines))
+        label.setWordWrap(True)
+        label.setStyleSheet("font-size: 16px;")
+        layout.addWidget(label)
+        self.adjustSize()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.accept)
+        self.timer.start(5000)  # 5 секунд показываем
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Позиционируем в левый нижний угол
+        parent = self.parentWidget() or self.window()
+        if parent:
+            geo = parent.geometry()
+            self.move(geo.x() + 20, geo.y() + geo.height() - self.height() - 20)
+
+# Максимум отдельных dataChanged за тик; при большем числе диапазонов шлём один охватывающий
+MAX_DIRTY_RANGES = 32
+# Живая сортировка: до стольких перемещённых строк за тик — beginMoveRows по каждой, больше — один layoutChanged
+MAX_ROW_MOVES = 32
+# Если за тик изменилось больше 1/N строк, индекс живой сортировки строится заново
+LIVE_SORT_REBUILD_DIVISOR = 16
+
+COLOR_UP = QColor(0, 200, 0)
+COLOR_DOWN = QColor(220, 40, 40)
+COLOR_STALE = QColor(110, 110, 110)  # строка без обновлений дольше STALE_AFTER_MS
+
+
+def coalesce_rows(rows):
+    # Отсортированные номера строк -> список непрерывных диапазонов (first, last)
+    ranges = []
+    for row in rows:
+        if ranges and row == ranges[-1][1] + 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return ranges
+
+
+class ScreenerTableModel(QAbstractTableModel):
+    def __init__(self, columns, column_keys, numeric_cols, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.column_keys = column_keys
+        self.numeric_cols = numeric_cols
+        self.col_of = {key: col for col, key in enumerate(column_keys)}
+        self.source = None    # TickerStore или JoinedStores (ссылка, без копирования)
+        self.symbols = []     # порядок строк
+        self.row_of = {}      # symbol -> row
+        self._dirty = {}      # col -> set(row)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.symbols)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.column_keys)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        key = self.column_keys[index.column()]
+        if role == Qt.DisplayRole:
+            symbol = self.symbols[index.row()]
+            return format_cell(key, self.source.value(symbol, key), self.source.price_decimals(symbol))
+        if role == Qt.TextAlignmentRole:
+            if index.column() in self.numeric_cols:
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+            return None
+        if role == Qt.ForegroundRole:
+            symbol = self.symbols[index.row()]
+            if self.source.is_stale(symbol):
+                return COLOR_STALE
+            if key not in COLORED_KEYS:
+                return None
+            percent = self.source.value(symbol, key)
+            if percent is None:
+                return None
+            if percent > 0:
+                return COLOR_UP
+            if percent < 0:
+                return COLOR_DOWN
+        return None
+
+    def symbol_at(self, row):
+        return self.symbols[row]
+
+    def set_source(self, source):
+        self.source = source
+
+    def set_symbols(self, symbols):
+        # Новый порядок строк: полный сброс только при смене набора, иначе перестановка
+        if symbols == self.symbols:
+            return
+        if len(symbols) != len(self.symbols) or set(symbols) != set(self.row_of):
+            self.beginResetModel()
+            self.symbols = list(symbols)
+            self.row_of = {s: i for i, s in enumerate(self.symbols)}
+            self._dirty.clear()
+            self.endResetModel()
+            return
+        self.layoutAboutToBeChanged.emit()
+        old_rows = self.persistentIndexList()
+        old_symbols = [self.symbols[i.row()] for i in old_rows]
+        self.symbols = list(symbols)
+        self.row_of = {s: i for i, s in enumerate(self.symbols)}
+        self.changePersistentIndexList(
+            old_rows, [self.index(self.row_of[s], i.column()) for s, i in zip(old_symbols, old_rows)]
+        )
+        self._dirty.clear()
+        self.layoutChanged.emit()
+
+    def move_symbols(self, symbols, moved):
+        # Новый порядок отличается от текущего только местами символов из moved:
+        # каждый из них ставится сразу за своим соседом в новом порядке
+        if len(moved) > MAX_ROW_MOVES or len(symbols) != len(self.symbols):
+            self.set_symbols(symbols)
+            return
+        n = len(symbols)
+        position = dict(zip(symbols, range(n)))
+        current = self.symbols
+        # row[p] — текущая строка символа с позицией p в новом порядке; сдвиги диапазонов векторные
+        row = np.empty(n, dtype=np.int64)
+        row[np.fromiter(map(position.__getitem__, current), dtype=np.int64, count=n)] = np.arange(n)
+        for target in sorted(map(position.__getitem__, moved)):
+            src = int(row[target])
+            dst = int(row[target - 1]) + 1 if target else 0
+            if dst == src or dst == src + 1:
+                continue
+            self.beginMoveRows(QModelIndex(), src, src, QModelIndex(), dst)
+            if dst < src:
+                row[(row >= dst) & (row < src)] += 1
+                row[target] = dst
+            else:
+                row[(row > src) & (row < dst)] -= 1
+                row[target] = dst - 1
+            current.insert(int(row[target]), current.pop(src))
+            self.endMoveRows()
+        self.row_of = dict(zip(current, range(n)))
+
+    def mark_dirty(self, symbol, keys):
+        # keys == '*' — вся строка (например, сменилась устарелость)
+        row = self.row_of.get(symbol)
+        if row is None:
+            return
+        if keys == '*':
+            keys = self.column_keys
+        for key in keys:
+            col = self.col_of.get(key)
+            if col is not None:
+                self._dirty.setdefault(col, set()).add(row)
+
+    def mark_column_dirty(self, key):
+        col = self.col_of.get(key)
+        if col is not None:
+            self._dirty[col] = None
+
+    def mark_all_dirty(self):
+        self._dirty = {col: None for col in range(len(self.column_keys))}
+
+    def flush_dirty(self):
+        # Объединяем грязные ячейки в диапазоны и отправляем dataChanged
+        if not self._dirty or not self.symbols:
+            self._dirty.clear()
+            return 0
+        ranges = []
+        last_row = len(self.symbols) - 1
+        for col in sorted(self._dirty):
+            rows = self._dirty[col]
+            if rows is None:
+                ranges.append((0, last_row, col))
+                continue
+            for first, last in coalesce_rows(sorted(rows)):
+                ranges.append((first, last, col))
+        self._dirty.clear()
+        if len(ranges) > MAX_DIRTY_RANGES:
+            ranges = [(
+                min(r[0] for r in ranges), max(r[1] for r in ranges),
+                min(r[2] for r in ranges), max(r[2] for r in ranges),
+            )]
+        else:
+            ranges = [(first, last, col, col) for first, last, col in ranges]
+        for first, last, col0, col1 in ranges:
+            self.dataChanged.emit(self.index(first, col0), self.index(last, col1))
+        return len(ranges)
+
+
+class TimedTableView(QTableView):
+    # Копит время отрисовки: стоимость кадра для RefreshScheduler — обновление модели плюс отрисовка
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.paint_s = 0.0
+
+    def paintEvent(self, event):
+        started = time.perf_counter()
+        super().paintEvent(event)
+        self.paint_s += time.perf_counter() - started
+
+    def take_paint_time(self):
+        paint_s, self.paint_s = self.paint_s, 0.0
+        return paint_s
+
+
+class ScreenerTab(QWidget):
+    def __init__(self, columns, column_keys, numeric_cols, parent=None, funding_alerts_enabled_ref=None, name=None):
+        super().__init__(parent)
+        self.name = name  # ключ вкладки для сохранённых фильтров
+        self.model = ScreenerTableModel(columns, column_keys, numeric_cols, self)
+        self.table = TimedTableView()
+        self.table.setModel(self.model)
+        # Заменяем стандартный заголовок на кастомный
+        self.table.setHorizontalHeader(CustomHeader(Qt.Horizontal, self.table))
+        self.table.setSortingEnabled(False)  # Отключаем сортировку Qt полностью
+        self.table.setSelectionMode(QTableView.NoSelection)  # Полностью убираем выделение
+        self.table.verticalHeader().setVisible(False)  # Скрываем нумерацию строк
+        layout = QVBoxLayout()
+        # --- Добавляем чекбокс в заголовок колонки 'Фандинг / До списания' ---
+        self.funding_alerts_enabled_ref = funding_alerts_enabled_ref
+        header_layout = QHBoxLayout()
+        header_layout.addStretch(1)
+        # Живая сортировка: порядок обновляется с каждым тиком, а не только по клику
+        self.live_sort_checkbox = QCheckBox("Живая сортировка")
+        self.live_sort_checkbox.stateChanged.connect(self.on_live_sort_changed)
+        header_layout.addWidget(self.live_sort_checkbox)
+        if self.funding_alerts_enabled_ref is not None:
+            self.alert_checkbox = QCheckBox("Уведомлять о фандинге")
+            self.alert_checkbox.setChecked(self.funding_alerts_enabled_ref[0])
+            self.alert_checkbox.stateChanged.connect(self.on_alert_checkbox_changed)
+            header_layout.addWidget(self.alert_checkbox)
+        layout.addLayout(header_layout)
+        layout.addLayout(self.make_filter_bar())
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+        self.column_keys = column_keys
+        self.numeric_cols = numeric_cols
+        self.current_sort_col = None  # None — сортировки нет
+        self.current_sort_order = Qt.DescendingOrder
+        self.sorted_symbols = []  # Фиксируется только по клику (или ведётся live_index)
+        self.live_sort = False
+        self.live_index = None  # LiveSortIndex по колонке сортировки; строится лениво на спокойном тике
+        self.source = None  # TickerStore или JoinedStores
+        self.table.horizontalHeader().sectionClicked.connect(self.handle_sort)
+        self._last_symbols = []  # для сохранения порядка без сортировки
+        self._known_symbols = set()
+        self.table.horizontalHeader().setFocusPolicy(Qt.NoFocus)  # Отключаем фокус у заголовка
+        self.table.clicked.connect(self.handle_cell_click)
+        self._needs_full_refresh = True  # вкладка была скрыта — при показе перерисовать всё
+        self.refresh_ms = Histogram(MS_BUCKETS)  # длительность update_data (порядок строк и пометка ячеек)
+        self.row_filter = None  # RowFilter из строки фильтра; None — показываются все строки
+        self._filter_changed = False  # на этом тике сменился состав прошедших фильтр строк
+        self.skipped = False  # пропущены кадры (фоновая вкладка): на следующем — всё, а не только грязное
+
+    def make_filter_bar(self):
+        # Строка фильтра: выражение над полями тикеров и сохранённые фильтры вкладки
+        bar = QHBoxLayout()
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Фильтр, например: turnover24h > 10M and abs(price24hPcnt) > 5%")
+        self.filter_edit.setToolTip("Поля: " + ", ".join(FILTER_FIELDS))
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.returnPressed.connect(self.apply_filter)
+        # Очистка крестиком сразу снимает фильтр
+        self.filter_edit.textChanged.connect(lambda text: text or self.apply_filter())
+        self.saved_combo = QComboBox()
+        self.saved_combo.setMinimumWidth(160)
+        self.saved_combo.activated.connect(self.on_saved_filter_selected)
+        save_button = QPushButton("Сохранить")
+        save_button.clicked.connect(self.save_filter)
+        delete_button = QPushButton("Удалить")
+        delete_button.clicked.connect(self.delete_filter)
+        self.filter_count_label = QLabel()
+        bar.addWidget(self.filter_edit, 1)
+        bar.addWidget(self.filter_count_label)
+        bar.addWidget(self.saved_combo)
+        bar.addWidget(save_button)
+        bar.addWidget(delete_button)
+        self.saved_filters = load_saved_filters().get(self.name, {}) if self.name else {}
+        self.fill_saved_combo()
+        return bar
+
+    def fill_saved_combo(self, current=None):
+        self.saved_combo.clear()
+        self.saved_combo.addItem("Сохранённые фильтры")
+        for name in sorted(self.saved_filters):
+            self.saved_combo.addItem(name)
+        if current is not None:
+            self.saved_combo.setCurrentText(current)
+
+    def on_saved_filter_selected(self, index):
+        if index <= 0:
+            return
+        self.filter_edit.setText(self.saved_filters[self.saved_combo.itemText(index)])
+        self.apply_filter()
+
+    def save_filter(self):
+        text = self.filter_edit.text().strip()
+        if not text or not self.apply_filter():
+            return
+        current = self.saved_combo.currentText() if self.saved_combo.currentIndex() > 0 else ""
+        name, ok = QInputDialog.getText(self, "Сохранить фильтр", "Название:", text=current)
+        name = name.strip()
+        if not ok or not name:
+            return
+        self.saved_filters[name] = text
+        self.store_saved_filters()
+        self.fill_saved_combo(name)
+
+    def delete_filter(self):
+        if self.saved_combo.currentIndex() <= 0:
+            return
+        self.saved_filters.pop(self.saved_combo.currentText(), None)
+        self.store_saved_filters()
+        self.fill_saved_combo()
+
+    def store_saved_filters(self):
+        if not self.name:
+            return
+        # Файл общий для вкладок: перечитываем, чтобы не затереть чужие изменения
+        saved = load_saved_filters()
+        saved[self.name] = self.saved_filters
+        try:
+            save_saved_filters(saved)
+        except OSError as e:
+            self.filter_edit.setToolTip(f"Не удалось сохранить фильтры: {e}")
+
+    def apply_filter(self):
+        # -> False, если выражение с ошибкой (действующий фильтр тогда не меняется)
+        text = self.filter_edit.text().strip()
+        try:
+            row_filter = RowFilter(text) if text else None
+        except FilterError as e:
+            self.filter_edit.setStyleSheet("QLineEdit { border: 1px solid #e53935; }")
+            self.filter_edit.setToolTip(str(e))
+            return False
+        self.filter_edit.setStyleSheet("")
+        self.filter_edit.setToolTip("Поля: " + ", ".join(FILTER_FIELDS))
+        self.row_filter = row_filter
+        if row_filter is not None and self.source is not None:
+            row_filter.update(self.source)
+        self.update_filter_count()
+        self._needs_full_refresh = True
+        self.refresh_table()
+        return True
+
+    def update_filter_count(self):
+        if self.row_filter is None or self.source is None:
+            self.filter_count_label.setText("")
+            return
+        self.filter_count_label.setText(f"{self.row_filter.count()} из {len(self.source)}")
+
+    def visible(self, symbols):
+        # Строки в порядке symbols, прошедшие фильтр
+        if self.row_filter is None:
+            return symbols
+        return self.row_filter.select(self.source, symbols)
+
+    def on_alert_checkbox_changed(self, state):
+        if self.funding_alerts_enabled_ref is not None:
+            self.funding_alerts_enabled_ref[0] = bool(state)
+
+    def on_live_sort_changed(self, state):
+        self.live_sort = bool(state)
+        self.live_index = None
+        if self.current_sort_col is not None and self.source is not None:
+            self.sorted_symbols = self.get_sorted_symbols(self.current_sort_col, self.current_sort_order)
+            self.refresh_table()
+
+    def handle_cell_click(self, index):
+        row, col = index.row(), index.column()
+        if self.column_keys[col] == 'symbol':
+            key = self.model.symbol_at(row)
+            symbol = self.source.value(key, 'symbol')
+            # Определяем тип тикера (spot/futures) из строки
+            type_ = self.source.value(key, 'type') if 'type' in self.column_keys else 'spot'
+            tv_symbol = get_tradingview_symbol(symbol, type_)
+            dlg = ChartDialog(tv_symbol, self)
+            dlg.exec_()
+
+    def update_data(self, source, dirty=None, clock_tick=True):
+        # Только обновляем значения, не сбрасываем порядок строк.
+        # dirty: symbol -> set(keys), изменившиеся с прошлого тика; None — всё.
+        # clock_tick: прошла секунда по часам — отсчёт до фандинга сдвинулся
+        started = time.perf_counter()
+        if self.skipped:
+            dirty = None
+            self.skipped = False
+        self.source = source
+        self.model.set_source(source)
+        self._filter_changed = False
+        if self.row_filter is not None:
+            # Маска пересчитывается только по изменившимся строкам; новый состав строк применит refresh_table
+            self._filter_changed = self.row_filter.update(source, dirty)
+            self.update_filter_count()
+        if dirty is None:
+            self._needs_full_refresh = True
+        elif not self._needs_full_refresh and self.isVisible():
+            # Сначала перестановки строк, затем пометка ячеек по их новым номерам
+            if self.is_live_sorted() and len(self.sorted_symbols) == len(source):
+                self.resort(dirty)
+            for symbol, keys in dirty.items():
+                self.model.mark_dirty(symbol, keys)
+            # Отсчёт до фандинга идёт по общим часам — колонка меняется каждую секунду целиком
+            if clock_tick:
+                self.model.mark_column_dirty(FUNDING_INFO)
+        else:
+            # Скрытая вкладка не отслеживает ячейки: при показе перерисуется целиком
+            self._needs_full_refresh = True
+        self.refresh_table()
+        self.refresh_ms.observe((time.perf_counter() - started) * 1000)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh_table()
+
+    def refresh_table(self):
+        if not self.isVisible() or self.source is None:
+            return
+        # Если сортировка выбрана — фиксируем порядок только по клику
+        if self.is_live_sorted() and (self._needs_full_refresh or len(self.sorted_symbols) != len(self.source)):
+            # Вкладка была скрыта или сменился набор тикеров — полная пересортировка
+            self.sorted_symbols = self.get_sorted_symbols(self.current_sort_col, self.current_sort_order)
+        elif self.current_sort_col is not None and self.sorted_symbols:
+            pass
+        elif len(self._known_symbols) != len(self.source) or self._needs_full_refresh:
+            # Добавляем новые тикеры в конец
+            for k in self.source.keys():
+                if k not in self._known_symbols:
+                    self._last_symbols.append(k)
+            # Удаляем исчезнувшие тикеры
+            self._last_symbols = [k for k in self._last_symbols if k in self.source]
+            self._known_symbols = set(self._last_symbols)
+            self.sorted_symbols = self._last_symbols.copy()
+        self.model.set_symbols(self.visible(self.sorted_symbols))
+        if self._needs_full_refresh:
+            self.model.mark_all_dirty()
+            self._needs_full_refresh = False
+        self.model.flush_dirty()
+
+    def handle_sort(self, col):
+        if self.current_sort_col == col:
+            self.current_sort_order = Qt.AscendingOrder if self.current_sort_order == Qt.DescendingOrder else Qt.DescendingOrder
+        else:
+            self.current_sort_col = col
+            self.current_sort_order = Qt.DescendingOrder
+        # Фиксируем порядок строк только по клику
+        self.sorted_symbols = self.get_sorted_symbols(self.current_sort_col, self.current_sort_order)
+        self.refresh_table()
+        self.table.horizontalHeader().clearFocus()  # Сброс фокуса с заголовка
+        self.table.clearFocus()  # Сброс фокуса с таблицы
+
+    def is_live_sorted(self):
+        return self.live_sort and self.current_sort_col in self.numeric_cols
+
+    def resort(self, dirty):
+        # Переставляем только символы, у которых изменилось значение колонки сортировки
+        key = self.column_keys[self.current_sort_col]
+        changed = [symbol for symbol, keys in dirty.items() if keys == '*' or key in keys]
+        if not changed:
+            return
+        if len(changed) > len(self.source) // LIVE_SORT_REBUILD_DIVISOR:
+            # Массовое обновление: argsort дешевле перестановок по одному; индекс построим позже
+            self.sorted_symbols = self.get_sorted_symbols(self.current_sort_col, self.current_sort_order)
+            self.model.set_symbols(self.visible(self.sorted_symbols))
+            return
+        if self.live_index is None:
+            column = self.source.column(key)
+            self.live_index = LiveSortIndex(self.current_sort_order == Qt.DescendingOrder).build(self.source.keys(), *column)
+            self.sorted_symbols = self.live_index.order()
+            self.model.set_symbols(self.visible(self.sorted_symbols))
+            return
+        moved = [symbol for symbol in changed if self.live_index.update(symbol, sort_value(self.source, symbol, key))]
+        if moved:
+            self.sorted_symbols = self.live_index.order()
+            if self._filter_changed:
+                self.model.set_symbols(self.visible(self.sorted_symbols))
+            else:
+                # Скрытые фильтром символы в таблице не двигаются
+                self.model.move_symbols(self.visible(self.sorted_symbols), [s for s in moved if s in self.model.row_of])
+
+    def get_sorted_symbols(self, col, order):
+        key = self.column_keys[col]
+        descending = order == Qt.DescendingOrder
+        self.live_index = None
+        if col not in self.numeric_cols:
+            keys = self.source.keys()
+            return sorted(keys, key=lambda symbol: self.source.value(symbol, key) or '', reverse=descending)
+        # Сортируем по типизированным значениям; пустые ячейки всегда в конце.
+        # После сортировки фиксируем порядок до следующего клика
+        return sorted_keys(self.source, key, descending)
+
+def open_in_browser(url):
+    import webbrowser  # нужен только по клику
+    webbrowser.open(url)
+
+class ChartDialog(QDialog):
+    def __init__(self, tv_symbol, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"График {tv_symbol}")
+        self.resize(400, 150)
+        layout = QVBoxLayout(self)
+        label = QLabel(f"График будет открыт во внешнем браузере:\n{tv_symbol}")
+        layout.addWidget(label)
+        btn = QPushButton("Открыть график в браузере")
+        btn.setStyleSheet("""
+            QPushButton {
+                background-color: #444;
+                color: #fff;
+                font-weight: bold;
+                font-size: 16px;
+                border-radius: 6px;
+                padding: 10px 20px;
+                margin-top: 20px;
+            }
+            QPushButton:hover {
+                background-color: #666;
+            }
+        """)
+        layout.addWidget(btn)
+        url = f"https://www.tradingview.com/chart/?symbol={tv_symbol}"
+        btn.clicked.connect(lambda: open_in_browser(url))
+
+class AlertRulesDialog(QDialog):
+    # Правила уведомлений как JSON: проверяются перед сохранением, ошибка показывается под текстом
+    EXAMPLE = {
+        'rules': [
+            {'kind': 'above', 'market': 'fut', 'symbol': 'BTCUSDT', 'level': 100000},
+            {'kind': 'move', 'window': '5m', 'pct': 3},
+            {'kind': 'funding', 'rate': 0.1},
+            {'kind': 'oi_spike', 'pct': 10},
+        ],
+        'delivery': {'popup': True, 'sound': False, 'log': False, 'webhook': None},
+    }
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.setWindowTitle("Правила уведомлений")
+        self.resize(560, 420)
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(
+            "Виды: above/below (level), move (window 1m|5m|15m, pct), funding (rate, %), oi_spike (pct), "
+            "rule (field, op >=|<=|abs>=, level). market: spot|fut, symbol — без него весь рынок."
+        ))
+        self.editor = QPlainTextEdit()
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.editor.setPlainText(f.read())
+        except OSError:
+            self.editor.setPlainText(json.dumps(self.EXAMPLE, ensure_ascii=False, indent=1))
+        layout.addWidget(self.editor)
+        self.error_label = QLabel()
+        self.error_label.setStyleSheet("color: #e53935;")
+        self.error_label.setWordWrap(True)
+        layout.addWidget(self.error_label)
+        buttons = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.save)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def save(self):
+        try:
+            save_alert_config(json.loads(self.editor.toPlainText()), self.path)
+        except (ValueError, OSError) as e:
+            self.error_label.setText(str(e))
+            return
+        self.accept()
+
+class SpotFuturesScreener(QMainWindow):
+    def __init__(self, engine=None, history_mb=HISTORY_BUDGET_MB, alerts_path=ALERTS_PATH, ingest_in_thread=None):
+        super().__init__()
+        self.setWindowTitle("Bybit Скринер (Спот и Фьючерсы, WebSocket, Mainnet)")
+        self.setGeometry(100, 100, 1600, 800)
+        self.funding_alerts_enabled = [True]  # Используем список для передачи по ссылке
+        self.tabs = QTabWidget()
+        self.tab_all = ScreenerTab(COLUMNS_ALL, COLUMN_KEYS_ALL, NUMERIC_COLS_ALL, parent=self, funding_alerts_enabled_ref=self.funding_alerts_enabled, name='all')
+        self.tab_spot = ScreenerTab(COLUMNS_SPOT, COLUMN_KEYS_SPOT, NUMERIC_COLS_SPOT, parent=self, funding_alerts_enabled_ref=self.funding_alerts_enabled, name='spot')
+        self.tab_fut = ScreenerTab(COLUMNS_FUT, COLUMN_KEYS_FUT, NUMERIC_COLS_FUT, parent=self, funding_alerts_enabled_ref=self.funding_alerts_enabled, name='fut')
+        self.tabs.addTab(self.tab_all, "Все")
+        self.tabs.addTab(self.tab_spot, "Спот")
+        self.tabs.addTab(self.tab_fut, "Фьючерсы")
+        self.time_label = QLabel("Время брокера: --:--:--")
+        self.time_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.latency_label = QLabel("Задержка: --")
+        self.latency_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        # Строка состояния с метриками приёма и отрисовки; по умолчанию скрыта
+        self.metrics_checkbox = QCheckBox("Метрики")
+        self.metrics_checkbox.stateChanged.connect(lambda state: self.statusBar().setVisible(bool(state)))
+        self.metrics_label = QLabel()
+        self.statusBar().addWidget(self.metrics_label)
+        self.statusBar().setVisible(False)
+        self.alerts_button = QPushButton("Уведомления…")
+        self.alerts_button.clicked.connect(self.edit_alert_rules)
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(self.metrics_checkbox)
+        top_layout.addWidget(self.alerts_button)
+        top_layout.addStretch(1)
+        top_layout.addWidget(self.latency_label)
+        top_layout.addWidget(self.time_label)
+        main_layout = QVBoxLayout()
+        main_layout.addLayout(top_layout)
+        main_layout.addWidget(self.tabs)
+        container = QWidget()
+        container.setLayout(main_layout)
+        self.setCentralWidget(container)
+        # Приём данных идёт в IngestEngine; состояние и производные колонки ведёт ScreenerCore,
+        # GUI раз в кадр применяет готовые пакеты изменений и перерисовывает грязные ячейки
+        self.core = ScreenerCore(engine if engine is not None else IngestEngine(), history_mb)
+        self.engine = self.core.engine
+        self.alerts_path = alerts_path
+        self.dispatcher = None
+        self.load_alert_rules()
+        for name, tab in (('all', self.tab_all), ('spot', self.tab_spot), ('fut', self.tab_fut)):
+            self.engine.metrics.histogram('gui_refresh_table_ms', 'Обновление вкладки, мс', tab.refresh_ms, {'tab': name})
+        self.batch_timer = QTimer()
+        self.batch_timer.timeout.connect(self.apply_batches)
+        self.batch_timer.start(int(self.engine.publish_interval * 1000))
+        # Кадры таблиц с переменным интервалом: таймер однократный, перезапускается после кадра
+        self.scheduler = RefreshScheduler()
+        self.scheduler.register_metrics(self.engine.metrics)
+        self.next_derived = 0.0
+        self.refresh_timer = QTimer()
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.on_frame)
+        self.refresh_timer.start(int(self.scheduler.interval * 1000))
+        if INGEST_IN_THREAD if ingest_in_thread is None else ingest_in_thread:
+            self.asyncio_bridge = None
+            self.engine.start_thread()
+        else:
+            # asyncio внутри цикла Qt: сообщения обрабатываются, как только сокет стал читаемым
+            from qt_asyncio import QtAsyncioBridge
+            self.asyncio_bridge = QtAsyncioBridge(self)
+            self.asyncio_bridge.create_task(self.engine.run())
+
+    def closeEvent(self, event):
+        self.engine.stop()
+        super().closeEvent(event)
+
+    def apply_batches(self):
+        if self.core.apply_batches() and self.core.last_broker_ts:
+            self.time_label.setText(f"Время брокера: {format_ts(self.core.last_broker_ts)}")
+
+    def on_frame(self):
+        # Кадр таблиц: раз в DERIVED_INTERVAL — с производными колонками, между ними — только если
+        # что-то пришло. Стоимость кадра (с отрисовкой прошлого) задаёт интервал до следующего
+        started = time.perf_counter()
+        derived = started >= self.next_derived
+        if derived:
+            self.next_derived = started + DERIVED_INTERVAL
+        if derived or self.core.has_dirty():
+            self.refresh_tables(derived)
+            paint = self.tabs.currentWidget().table.take_paint_time()
+            self.scheduler.frame_done(time.perf_counter() - started + paint)
+        else:
+            self.scheduler.skip()
+        self.refresh_timer.start(int(self.scheduler.interval * 1000))
+
+    def refresh_tables(self, derived=True):
+        core = self.core
+        source_lost = derived and core.check_source()
+        now = core.update_derived() if derived else core.clock.now()
+        # Правила проверяются по тем же грязным ячейкам, что уйдут в таблицы
+        self.dispatcher.submit(core.check_alerts(now))
+        dirty_spot, dirty_fut = core.take_dirty()
+        active = self.tabs.currentWidget()
+        # Фоновые вкладки обновляются только с производными колонками, пропуск — полный пересчёт потом
+        for tab, source, dirty in self.tab_sources(dirty_spot, dirty_fut):
+            if derived or tab is active:
+                tab.update_data(source, dirty, derived)
+            else:
+                tab.skipped = True
+        core.observe_delivery()
+        if not derived:
+            self.dispatcher.drain()
+            return
+        if self.statusBar().isVisible():
+            self.update_metrics_overlay()
+        if now is not None:
+            self.check_funding_alerts(now)
+        self.dispatcher.drain()
+        p50, p99 = self.engine.latency.percentiles((50, 99))
+        if source_lost:
+            self.latency_label.setStyleSheet("color: #e53935;")
+            self.latency_label.setText("Демон market_daemon.py отключён: данные не обновляются")
+        elif p50 is not None:
+            if self.engine.time_to_populated is not None:
+                populated = f"все тикеры за {self.engine.time_to_populated:.1f} с"
+            else:
+                populated = f"заполнено {self.engine.populated():.0%}"
+            self.latency_label.setText(f"Задержка ts→обработка: p50 {p50:.0f} мс, p99 {p99:.0f} мс | {populated}")
+
+    def tab_sources(self, dirty_spot, dirty_fut):
+        # -> [(вкладка, источник, грязные ячейки в её ключах)]; для вкладки 'Все' ключи с суффиксом
+        core = self.core
+        dirty_all = {symbol + '_spot': keys for symbol, keys in dirty_spot.items()}
+        dirty_all.update((symbol + '_fut', keys) for symbol, keys in dirty_fut.items())
+        return [
+            (self.tab_all, core.all_view, dirty_all),
+            (self.tab_spot, core.data_spot, dirty_spot),
+            (self.tab_fut, core.data_fut, dirty_fut),
+        ]
+
+    def update_metrics_overlay(self):
+        engine, core = self.engine, self.core
+        tab = self.tabs.currentWidget()
+
+        def show(value, spec='.0f'):
+            return '--' if value is None else format(value, spec)
+
+        _, receive_p99 = engine.latency.percentiles((50, 99))
+        _, screen_p99 = core.receive_latency.percentiles((50, 99))
+        self.metrics_label.setText(
+            f"кадров/с {core.message_rate():.0f} | разбор p50 {show(engine.decode_us.quantile(0.5))} мкс, "
+            f"обработка p50 {show(engine.handle_us.quantile(0.5))} мкс | ts→приём p99 {show(receive_p99)} мс, "
+            f"приём→таблица p99 {show(screen_p99)} мс | вкладка p50 {show(tab.refresh_ms.quantile(0.5), 'g')} мс, "
+            f"p99 {show(tab.refresh_ms.quantile(0.99), 'g')} мс | кадры {self.scheduler.rate():.1f} Гц, "
+            f"стоимость кадра {show(self.scheduler.cost and self.scheduler.cost * 1000, '.1f')} мс | "
+            f"пакетов за кадр {core.last_queue_depth}, слито обновлений {core.conflated} + {core.frame_conflated} до кадра"
+        )
+
+    def check_funding_alerts(self, now):
+        # Планировщик отдаёт только группы, у которых наступило окно уведомления; одно событие на группу.
+        # Выключенные уведомления кучу не трогают: после включения придут группы, чьё окно ещё идёт
+        if self.funding_alerts_enabled[0]:
+            self.dispatcher.submit(self.core.funding_alerts(now))
+
+    def load_alert_rules(self):
+        # Доставка: окно и звук не чаще ALERT_POPUP_INTERVAL, журнал в stderr, webhook на localhost.
+        # При перезагрузке прежние приёмники закрываются: у webhook свой поток
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+        self.dispatcher = AlertDispatcher()
+        try:
+            delivery = load_alerts(self.core, self.alerts_path, self.dispatcher)
+        except ValueError as e:
+            # Ошибка — как у строки фильтра: красная рамка и текст в подсказке кнопки
+            self.alerts_button.setStyleSheet("QPushButton { border: 1px solid #e53935; }")
+            self.alerts_button.setToolTip(f"Правила уведомлений не загружены: {e}")
+            self.core.alerts.set_rules([])
+            delivery = {}
+        else:
+            self.alerts_button.setStyleSheet("")
+            self.alerts_button.setToolTip(f"Правил: {len(self.core.alerts.rules)}")
+        if delivery.get('popup', True):
+            self.dispatcher.add('popup', self.show_alerts, ALERT_POPUP_INTERVAL)
+        if delivery.get('sound'):
+            self.dispatcher.add('sound', lambda alerts: QApplication.beep(), ALERT_POPUP_INTERVAL)
+        if delivery.get('log'):
+            self.dispatcher.add('log', log_alerts)
+
+    def show_alerts(self, alerts):
+        AlertDialog(alerts, self).show()
+
+    def edit_alert_rules(self):
+        if AlertRulesDialog(self.alerts_path, self).exec_():
+            self.load_alert_rules()
+
+def set_dark_theme(app):
+    dark_palette = QPalette()
+    dark_palette.setColor(QPalette.Window, QColor(35, 38, 41))
+    dark_palette.setColor(QPalette.WindowText, QColor(224, 224, 224))
+    dark_palette.setColor(QPalette.Base, QColor(35, 38, 41))
+    dark_palette.setColor(QPalette.AlternateBase, QColor(44, 47, 51))
+    dark_palette.setColor(QPalette.ToolTipBase, QColor(224, 224, 224))
+    dark_palette.setColor(QPalette.ToolTipText, QColor(224, 224, 224))
+    dark_palette.setColor(QPalette.Text, QColor(224, 224, 224))
+    dark_palette.setColor(QPalette.Button, QColor(44, 47, 51))
+    dark_palette.setColor(QPalette.ButtonText, QColor(224, 224, 224))
+    dark_palette.setColor(QPalette.BrightText, QColor(255, 0, 0))
+    dark_palette.setColor(QPalette.Highlight, QColor(35, 38, 41))  # тот же цвет, что и фон
+    dark_palette.setColor(QPalette.HighlightedText, QColor(224, 224, 224))
+    app.setPalette(dark_palette)
+    # Глобальный стиль для всех виджетов, вкладок и рамок
+    app.setStyleSheet("""
+        QWidget, QMainWindow, QTabWidget, QTabBar, QTableView, QScrollArea {
+            background-color: #232629;
+            color: #e0e0e0;
+            border: none;
+        }
+        QHeaderView::section:checked,
+        QHeaderView::section:pressed,
+        QHeaderView::section:focus,
+        QHeaderView::section:!active,
+        QHeaderView::section {
+            background: #232629;
+            color: #e0e0e0;
+            border: none;
+        }
+        QTabBar::tab {
+            background: #232629;
+            color: #e0e0e0;
+            border: 1px solid #444;
+            padding: 6px 16px;
+        }
+        QTabBar::tab:selected {
+            background: #444;
+            color: #fff;
+        }
+        QTabBar::tab:!selected {
+            background: #232629;
+            color: #b0b0b0;
+        }
+        QTabWidget::pane {
+            border: none;
+            background: #232629;
+        }
+        QScrollBar:vertical, QScrollBar:horizontal {
+            background: #232629;
+            border: none;
+        }
+        QTableCornerButton::section {
+            background: #232629;
+            border: none;
+        }
+        QTableWidget::item:selected, QTableView::item:selected {
+            background: transparent;
+            color: inherit;
+        }
+    """)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_engine_args(parser, gui=True)
+    parser.add_argument('--alerts', metavar='FILE', default=ALERTS_PATH, help='правила уведомлений (JSON)')
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
+    set_dark_theme(app)
+    try:
+        engine = make_engine(args)
+    except SharedStateError as e:
+        parser.error(f"--shm: {e}")
+    except ValueError as e:
+        parser.error(str(e))
+    window = SpotFuturesScreener(engine, args.history_mb, args.alerts, args.ingest == 'thread')
+    start_metrics_server(window.engine, args)
+    window.show()
+    sys.exit(app.exec_()) 